@@ -1,16 +1,24 @@
 import mysql.connector
+from mysql.connector import pooling
 from datetime import datetime
 
 
+_pool = None
+
 def conectar():
+    # Las conexiones se reutilizan: conexion.close() la devuelve al pool en lugar de cerrarla
+    global _pool
     try:
-        conexion = mysql.connector.connect(
-            host="localhost",
-            user="root",  
-            password="",  
-            database="parqueadero"
-        )
-        return conexion
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(
+                pool_name="parqueadero",
+                pool_size=4,
+                host="localhost",
+                user="root",  
+                password="",  
+                database="parqueadero"
+            )
+        return _pool.get_connection()
     except mysql.connector.Error as err:
         print(f"Error: {err}")
         return None
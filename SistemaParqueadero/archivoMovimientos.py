@@ -0,0 +1,159 @@
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+
+# ******************** ARCHIVO DE MOVIMIENTOS ********************
+ARCHIVO_DIAS_DEFECTO = 90  # días que un movimiento cerrado se queda en la tabla principal
+ARCHIVO_LOTE = 1000  # filas movidas por transacción, para no frenar las puertas
+PREFIJO_ARCHIVO = 'movimientos_'
+MES_VALIDO = re.compile(r'^\d{4}-\d{2}$')
+
+
+def tabla_archivo(mes):
+    """'2024-01' -> 'movimientos_2024_01'"""
+    if not MES_VALIDO.match(mes or ''):
+        raise ValueError(f"Mes inválido para el archivo: {mes!r}")
+    return PREFIJO_ARCHIVO + mes.replace('-', '_')
+
+
+class MovementArchive:
+    """Movimientos cerrados hace más de `dias` pasan a una tabla por mes de hora_entrada.
+
+    Las tablas de archivo viven en la misma base (así los respaldos y la restauración las
+    incluyen) y el catálogo archivo_meses dice cuáles existen. No importa si la fila ya llegó
+    al servidor central: el outbox guarda la fila completa de cada cambio pendiente, así que
+    una puerta offline también archiva. La tabla principal queda con los activos y lo
+    reciente, y las consultas por fecha leen la unión de lo que cubra el rango.
+    """
+    def __init__(self, db, dias=ARCHIVO_DIAS_DEFECTO, lote=ARCHIVO_LOTE):
+        self.db = db
+        self.dias = dias
+        self.lote = lote
+
+    def columnas(self, cursor):
+        cursor.execute("PRAGMA table_info(movimientos)")
+        return [fila[1] for fila in cursor.fetchall()]
+
+    def meses(self, cursor):
+        cursor.execute("SELECT mes FROM archivo_meses ORDER BY mes")
+        return [fila[0] for fila in cursor.fetchall()]
+
+    def _preparar_tabla(self, cursor, mes, columnas):
+        tabla = tabla_archivo(mes)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {tabla} AS SELECT * FROM movimientos WHERE 0")
+        # Una columna que una migración agregó a movimientos también tiene que estar aquí
+        cursor.execute(f"PRAGMA table_info({tabla})")
+        existentes = {fila[1] for fila in cursor.fetchall()}
+        for columna in columnas:
+            if columna not in existentes:
+                cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna}")
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabla}_uid ON {tabla}(uid)")
+        # (hora_entrada, id) cubre el orden del historial sin leer las filas: en la tabla
+        # principal id es el rowid, aquí es una columna más
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{tabla}_hora_entrada")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_entrada_id ON {tabla}(hora_entrada, id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_placa ON {tabla}(placa)")
+        cursor.execute("INSERT OR IGNORE INTO archivo_meses (mes, tabla) VALUES (?, ?)", (mes, tabla))
+        return tabla
+
+    def preparar(self):
+        """Alinea las columnas de las tablas de archivo con movimientos (después de migrar)"""
+        with self.db.escritura() as cursor:
+            columnas = self.columnas(cursor)
+            for mes in self.meses(cursor):
+                self._preparar_tabla(cursor, mes, columnas)
+
+    def archivar(self, ahora=None):
+        """Mueve los movimientos cerrados antes del corte; devuelve cuántas filas movió"""
+        if self.dias <= 0:
+            return 0
+        ahora = ahora or datetime.now()
+        corte = (ahora - timedelta(days=self.dias)).strftime('%Y-%m-%d %H:%M:%S')
+        inicio = time.perf_counter()
+        movidas = 0
+        # Se avanza por id: las filas recientes que quedan no se vuelven a recorrer en cada lote
+        ultimo_id = 0
+        preparadas = set()
+        while True:
+            # Un lote por transacción: entre lotes las puertas pueden registrar sin esperar
+            with self.db.escritura() as cursor:
+                # Sin hora_entrada (o con una mal formada) no hay mes donde buscarla después:
+                # queda en la tabla principal en vez de hacer fallar tabla_archivo en cada lote
+                cursor.execute(
+                    "SELECT id, substr(hora_entrada, 1, 7) FROM movimientos "
+                    "WHERE id > ? AND estado <> 'activo' "
+                    "AND hora_entrada GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*' "
+                    "AND COALESCE(hora_salida, hora_entrada) < ? ORDER BY id LIMIT ?",
+                    (ultimo_id, corte, self.lote)
+                )
+                filas = cursor.fetchall()
+                if not filas:
+                    break
+                ultimo_id = filas[-1][0]
+                columnas = self.columnas(cursor)
+                lista = ", ".join(columnas)
+                por_mes = {}
+                for movimiento_id, mes in filas:
+                    por_mes.setdefault(mes, []).append(movimiento_id)
+                for mes, ids in por_mes.items():
+                    tabla = tabla_archivo(mes)
+                    if mes not in preparadas:
+                        self._preparar_tabla(cursor, mes, columnas)
+                        preparadas.add(mes)
+                    marcas = ", ".join("?" * len(ids))
+                    cursor.execute(f"DELETE FROM {tabla} WHERE uid IN (SELECT uid FROM movimientos WHERE id IN ({marcas}))", ids)
+                    cursor.execute(
+                        "UPDATE archivo_meses SET filas = filas - ? WHERE mes = ?", (cursor.rowcount, mes)
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {tabla} ({lista}) SELECT {lista} FROM movimientos WHERE id IN ({marcas})", ids
+                    )
+                    cursor.execute(
+                        "UPDATE archivo_meses SET filas = filas + ? WHERE mes = ?", (cursor.rowcount, mes)
+                    )
+                    cursor.execute(f"DELETE FROM movimientos WHERE id IN ({marcas})", ids)
+                movidas += len(filas)
+        if movidas:
+            logging.info(
+                f"Archivo: {movidas} movimientos anteriores a {corte} movidos "
+                f"en {time.perf_counter() - inicio:.2f}s"
+            )
+        return movidas
+
+    def tablas(self, cursor, inicio=None, fin=None):
+        """La tabla principal y las de los meses archivados que tocan [inicio, fin]; None es sin límite"""
+        archivados = [
+            mes for mes in self.meses(cursor)
+            if (inicio is None or mes >= inicio[:7]) and (fin is None or mes <= fin[:7])
+        ]
+        return ["movimientos"] + [tabla_archivo(mes) for mes in archivados]
+
+    def fuente(self, cursor, inicio=None, fin=None):
+        """FROM para consultar movimientos en [inicio, fin]: la tabla principal y los meses archivados del rango.
+
+        Las condiciones del WHERE exterior bajan a cada parte de la unión, así que cada tabla
+        de archivo usa sus propios índices.
+        """
+        tablas = self.tablas(cursor, inicio, fin)
+        if len(tablas) == 1:
+            return "movimientos"
+        columnas = ", ".join(self.columnas(cursor))
+        return "(" + " UNION ALL ".join(f"SELECT {columnas} FROM {tabla}" for tabla in tablas) + ")"
+
+    def buscar(self, cursor, uid, hora_entrada):
+        """(mes, fila) de un movimiento archivado, o None; hora_entrada indica en qué mes buscar"""
+        if not hora_entrada:
+            return None
+        mes = hora_entrada[:7]
+        if mes not in self.meses(cursor):
+            return None
+        cursor.execute(f"SELECT * FROM {tabla_archivo(mes)} WHERE uid = ?", (uid,))
+        fila = cursor.fetchone()
+        return (mes, fila) if fila is not None else None
+
+    def desarchivar(self, cursor, mes, uid):
+        """Saca una fila del archivo para que la tabla principal reciba su nueva versión"""
+        tabla = tabla_archivo(mes)
+        cursor.execute(f"DELETE FROM {tabla} WHERE uid = ?", (uid,))
+        cursor.execute("UPDATE archivo_meses SET filas = filas - ? WHERE mes = ?", (cursor.rowcount, mes))
@@ -0,0 +1,1032 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sistemaParking import (
+    Config, DatabaseManager, PERFILES_SQLITE, CLAVES_SERVIDOR, CONSUMIDOR_MYSQL,
+    sentencia_upsert_mysql, valores_sync
+)
+from replicacion import Replicador, RegistroCambiosSQLite
+from historialVirtual import HISTORIAL_BLOQUE
+from panelEstado import RefreshScheduler, PANEL_REFRESCOS_DEFECTO
+
+# ******************** CÓDIGO ANTERIOR ********************
+def registrar_ingreso_legado(db, placa, tipo_vehiculo, conductor=None):
+    """registrar_ingreso anterior: cada sentencia pasa por execute_query y hace su propio commit"""
+    cursor = db.execute_query(
+        "SELECT * FROM movimientos WHERE placa = ? AND estado = 'activo'", (placa,), local_only=True
+    )
+    if cursor.fetchone():
+        return False, "El vehículo ya está ingresado."
+
+    cursor = db.execute_query("SELECT * FROM espacios WHERE ocupado = 0 LIMIT 1", local_only=True)
+    espacio = cursor.fetchone()
+    if not espacio:
+        return False, "No hay espacios disponibles."
+
+    espacio_id = espacio[0]
+    db.execute_query("UPDATE espacios SET ocupado = 1 WHERE id = ?", (espacio_id,), local_only=True)
+
+    hora_ingreso = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    db.execute_query(
+        "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, espacio_asignado, conductor) VALUES (?, ?, ?, ?, ?)",
+        (placa, tipo_vehiculo, hora_ingreso, espacio_id, conductor),
+        local_only=True
+    )
+
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    cursor = db.execute_query("SELECT * FROM reportes WHERE fecha = ?", (fecha,), local_only=True)
+    if not cursor.fetchone():
+        db.execute_query("INSERT INTO reportes (fecha, ingresos) VALUES (?, 1)", (fecha,), local_only=True)
+    else:
+        db.execute_query("UPDATE reportes SET ingresos = ingresos + 1 WHERE fecha = ?", (fecha,), local_only=True)
+    return True, f"Vehículo {placa} registrado con éxito. Espacio: {espacio[1]}"
+
+def registrar_salida_legado(db, placa):
+    """registrar_salida anterior, con un commit por sentencia"""
+    cursor = db.execute_query(
+        "SELECT * FROM movimientos WHERE placa = ? AND estado = 'activo'", (placa,), local_only=True
+    )
+    vehiculo = cursor.fetchone()
+    if not vehiculo:
+        return False, f"El vehículo con placa {placa} no está registrado."
+
+    hora_salida = datetime.now()
+    hora_ingreso = datetime.strptime(vehiculo[3], '%Y-%m-%d %H:%M:%S')
+    tiempo_estacionado = (hora_salida - hora_ingreso).total_seconds() / 60
+    espacio_id = vehiculo[5]
+    tarifa_por_hora = db.config.get_tarifas().get(vehiculo[2].lower(), 2.00)
+    total_cobrado = max(tiempo_estacionado / 60, 1) * tarifa_por_hora
+
+    db.execute_query(
+        "UPDATE movimientos SET hora_salida = ?, tiempo_estacionado = ?, estado = 'salido', tarifa = ?, total_cobrado = ? WHERE id = ?",
+        (hora_salida.strftime('%Y-%m-%d %H:%M:%S'), tiempo_estacionado, tarifa_por_hora, total_cobrado, vehiculo[0]),
+        local_only=True
+    )
+    db.execute_query("UPDATE espacios SET ocupado = 0 WHERE id = ?", (espacio_id,), local_only=True)
+
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    cursor = db.execute_query("SELECT * FROM reportes WHERE fecha = ?", (fecha,), local_only=True)
+    if not cursor.fetchone():
+        db.execute_query(
+            "INSERT INTO reportes (fecha, egresos, total_cobrado) VALUES (?, 1, ?)",
+            (fecha, total_cobrado), local_only=True
+        )
+    else:
+        db.execute_query(
+            "UPDATE reportes SET egresos = egresos + 1, total_cobrado = total_cobrado + ? WHERE fecha = ?",
+            (total_cobrado, fecha), local_only=True
+        )
+    return True, {"placa": placa}
+
+def sincronizar_por_fila_legado(db, lote=200):
+    """Vaciado del outbox anterior: un execute (un viaje al servidor) por entrada"""
+    while True:
+        with db.lectura() as cursor:
+            cursor.execute(
+                "SELECT seq, tabla, payload FROM outbox WHERE seq > "
+                "(SELECT ultimo_seq FROM outbox_consumidores WHERE nombre = ?) ORDER BY seq LIMIT ?",
+                (CONSUMIDOR_MYSQL, lote)
+            )
+            entradas = cursor.fetchall()
+        if not entradas:
+            return True
+        with db.pool_mysql.conexion() as conn:
+            cursor_mysql = conn.cursor()
+            for _, tabla, payload in entradas:
+                cursor_mysql.execute(sentencia_upsert_mysql(tabla), valores_sync(tabla, json.loads(payload), db.nodo_id))
+            conn.commit()
+        db.confirmar_outbox(entradas[-1][0])
+
+# legado es el código de antes del outbox: no encola cambios ni actualiza resúmenes ni la lista
+# de activos. Con journal_mode=DELETE y synchronous=FULL cada commit espera al disco y juntar
+# todo en una transacción gana; con WAL y synchronous=NORMAL un commit es casi gratis y el
+# trabajo extra por evento hace que transaccional quede por debajo.
+VARIANTES = {
+    "legado": (registrar_ingreso_legado, registrar_salida_legado),
+    "transaccional": (
+        lambda db, placa, tipo: db.registrar_ingreso(placa, tipo),
+        lambda db, placa: db.registrar_salida(placa),
+    ),
+}
+
+# ******************** MEDICIÓN ********************
+def crear_config(espacios, perfil=None):
+    config = Config()
+    # Sólo en memoria: no se guarda en configs.ini
+    config.config['SETTINGS']['max_espacios'] = str(espacios)
+    config.config['SETTINGS']['nodo_id'] = 'benchmark'
+    config.config['SETTINGS']['modo_offline'] = 'False'
+    if perfil is not None:
+        config.config['SQLITE'] = dict(PERFILES_SQLITE[perfil])
+    return config
+
+def crear_base(ruta, espacios, perfil=None):
+    """Base local nueva en un archivo con la configuración de la app (sólo se usa SQLite)"""
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    return DatabaseManager(crear_config(espacios, perfil), db_path=ruta)
+
+def medir_eventos(db, ingreso, salida, eventos, espacios):
+    """Llena el estacionamiento y lo vacía en ciclos; devuelve (eventos, segundos)"""
+    hechos = 0
+    ciclo = 0
+    inicio = time.perf_counter()
+    while hechos < eventos:
+        lote = min(espacios, (eventos - hechos + 1) // 2)
+        placas = [f"B{ciclo:03d}-{i:03d}" for i in range(lote)]
+        for placa in placas:
+            ok, mensaje = ingreso(db, placa, "Auto")
+            if not ok:
+                raise RuntimeError(mensaje)
+        for placa in placas:
+            ok, mensaje = salida(db, placa)
+            if not ok:
+                raise RuntimeError(mensaje)
+        hechos += 2 * lote
+        ciclo += 1
+    return hechos, time.perf_counter() - inicio
+
+def describir_perfil(perfil):
+    pragmas = PERFILES_SQLITE[perfil]
+    return f"journal_mode={pragmas['journal_mode']}, synchronous={pragmas['synchronous']}"
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+def medir_concurrencia(ruta, perfil, puertas, lectores, segundos, espacios):
+    """Varias puertas registrando entradas/salidas mientras otras conexiones leen reportes.
+
+    Cada hilo abre su propio DatabaseManager, como lo harían dos cajas y una pantalla de
+    reportes sobre la misma base: así se mide el bloqueo entre conexiones y no el de la app.
+    """
+    crear_base(ruta, espacios, perfil).cerrar()
+    fin = time.perf_counter() + segundos
+    resultados = {"escrituras": [], "lecturas": [], "bloqueos": 0, "errores": 0}
+    lock = threading.Lock()
+    hoy = datetime.now().strftime('%Y-%m-%d')
+
+    def registrar(tipo, latencia=None, error=None):
+        with lock:
+            if error is None:
+                resultados[tipo].append(latencia)
+            elif "locked" in str(error) or "busy" in str(error):
+                resultados["bloqueos"] += 1
+            else:
+                resultados["errores"] += 1
+
+    def puerta(indice):
+        db = DatabaseManager(crear_config(espacios, perfil), db_path=ruta)
+        n = 0
+        try:
+            while time.perf_counter() < fin:
+                placa = f"P{indice:02d}-{n:05d}"
+                for operacion in (lambda: db.registrar_ingreso(placa, "Auto"), lambda: db.registrar_salida(placa)):
+                    inicio = time.perf_counter()
+                    try:
+                        operacion()
+                        registrar("escrituras", (time.perf_counter() - inicio) * 1000)
+                    except sqlite3.Error as e:
+                        registrar("escrituras", error=e)
+                n += 1
+        finally:
+            db.cerrar()
+
+    def lector():
+        db = DatabaseManager(crear_config(espacios, perfil), db_path=ruta)
+        try:
+            while time.perf_counter() < fin:
+                inicio = time.perf_counter()
+                try:
+                    db.get_reporte_rango(hoy, hoy)
+                    db.get_vehiculos_por_fecha(hoy)
+                    db.get_espacios_disponibles()
+                    registrar("lecturas", (time.perf_counter() - inicio) * 1000)
+                except sqlite3.Error as e:
+                    registrar("lecturas", error=e)
+        finally:
+            db.cerrar()
+
+    hilos = [threading.Thread(target=puerta, args=(i,)) for i in range(puertas)]
+    hilos += [threading.Thread(target=lector) for _ in range(lectores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+def comparar_perfiles(carpeta, perfiles, puertas, lectores, segundos, espacios):
+    print(f"{puertas} puertas y {lectores} lectores durante {segundos}s por perfil\n")
+    print(f"{'perfil':<15}{'escrit/s':>10}{'p95 esc ms':>12}{'lect/s':>10}{'p95 lect ms':>13}{'bloqueos':>10}{'errores':>9}")
+    for perfil in perfiles:
+        r = medir_concurrencia(os.path.join(carpeta, f"concurrencia_{perfil}.db"), perfil, puertas, lectores, segundos, espacios)
+        print(
+            f"{perfil:<15}{len(r['escrituras']) / segundos:>10.1f}{percentil(r['escrituras'], 95):>12.2f}"
+            f"{len(r['lecturas']) / segundos:>10.1f}{percentil(r['lecturas'], 95):>13.2f}"
+            f"{r['bloqueos']:>10}{r['errores']:>9}"
+        )
+
+def prueba_estres(ruta, perfil, puertas, lectores, segundos, espacios):
+    """Un solo DatabaseManager compartido por puertas, reportes y un hilo de sincronización.
+
+    Es el caso de la app: todos los hilos usan el mismo pool. Al final se verifica que la base
+    quedó consistente (espacios ocupados = vehículos activos, reportes = movimientos).
+    """
+    db = crear_base(ruta, espacios, perfil)
+    fin = time.perf_counter() + segundos
+    resultados = {"escrituras": 0, "lecturas": 0, "sincronizaciones": 0, "bloqueos": 0, "errores": []}
+    lock = threading.Lock()
+    hoy = datetime.now().strftime('%Y-%m-%d')
+
+    def contar(tipo, error=None):
+        with lock:
+            if error is None:
+                resultados[tipo] += 1
+            elif "locked" in str(error) or "busy" in str(error):
+                resultados["bloqueos"] += 1
+            else:
+                resultados["errores"].append(f"{tipo}: {error}")
+
+    def puerta(indice):
+        n = 0
+        while time.perf_counter() < fin:
+            placa = f"E{indice:02d}-{n:05d}"
+            try:
+                ok, mensaje = db.registrar_ingreso(placa, "Auto")
+                # Con todos los espacios ocupados el rechazo es correcto, no un error
+                if ok:
+                    ok, mensaje = db.registrar_salida(placa)
+                    if not ok:
+                        raise RuntimeError(mensaje)
+                contar("escrituras")
+            except Exception as e:
+                contar("escrituras", e)
+            n += 1
+
+    def lector():
+        while time.perf_counter() < fin:
+            try:
+                db.get_reporte_rango(hoy, hoy)
+                db.get_vehiculos_por_fecha(hoy)
+                db.get_espacios_disponibles()
+                db.get_vehiculos_activos()
+                contar("lecturas")
+            except Exception as e:
+                contar("lecturas", e)
+
+    def sincronizacion():
+        while time.perf_counter() < fin:
+            try:
+                db.execute_query("UPDATE movimientos SET pendiente_sync = 0 WHERE pendiente_sync = 1", local_only=True)
+                db.execute_query("UPDATE reportes SET pendiente_sync = 0 WHERE pendiente_sync = 1", local_only=True)
+                contar("sincronizaciones")
+            except Exception as e:
+                contar("sincronizaciones", e)
+            time.sleep(0.01)
+
+    hilos = [threading.Thread(target=puerta, args=(i,)) for i in range(puertas)]
+    hilos += [threading.Thread(target=lector) for _ in range(lectores)]
+    hilos.append(threading.Thread(target=sincronizacion))
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    with db.lectura() as cursor:
+        ocupados = cursor.execute("SELECT COUNT(*) FROM espacios WHERE ocupado = 1").fetchone()[0]
+        activos = cursor.execute("SELECT COUNT(*) FROM movimientos WHERE estado = 'activo'").fetchone()[0]
+        movimientos, salidos = cursor.execute(
+            "SELECT COUNT(*), SUM(estado = 'salido') FROM movimientos"
+        ).fetchone()
+        ingresos, egresos = cursor.execute("SELECT SUM(ingresos), SUM(egresos) FROM reportes").fetchone()
+    desfasados = db.reconciliar_ocupacion()
+    db.cerrar()
+    if desfasados:
+        resultados["errores"].append(f"índice de ocupación desfasado en {desfasados} espacios")
+    if ocupados != activos:
+        resultados["errores"].append(f"{ocupados} espacios ocupados y {activos} vehículos activos")
+    if (ingresos or 0) != movimientos or (egresos or 0) != (salidos or 0):
+        resultados["errores"].append(
+            f"reportes con {ingresos} ingresos/{egresos} egresos y {movimientos} movimientos/{salidos} salidas"
+        )
+    return resultados
+
+def ejecutar_estres(carpeta, perfiles, puertas, lectores, segundos, espacios):
+    print(f"{puertas} puertas, {lectores} lectores y 1 sincronización sobre un DatabaseManager compartido, {segundos}s por perfil\n")
+    print(f"{'perfil':<15}{'puerta/s':>10}{'lect/s':>10}{'sinc/s':>10}{'bloqueos':>10}{'errores':>9}")
+    fallas = 0
+    for perfil in perfiles:
+        r = prueba_estres(os.path.join(carpeta, f"estres_{perfil}.db"), perfil, puertas, lectores, segundos, espacios)
+        print(
+            f"{perfil:<15}{r['escrituras'] / segundos:>10.1f}{r['lecturas'] / segundos:>10.1f}"
+            f"{r['sincronizaciones'] / segundos:>10.1f}{r['bloqueos']:>10}{len(r['errores']):>9}"
+        )
+        for error in r["errores"][:5]:
+            print(f"    {error}")
+        fallas += r["bloqueos"] + len(r["errores"])
+    return 1 if fallas else 0
+
+# ******************** SERVIDOR MYSQL SIMULADO ********************
+class ServidorSimulado:
+    """Sustituto en memoria del servidor central con la semántica de los upserts de la sincronización.
+
+    Cada execute/executemany/commit cuesta `latencia` segundos, como un viaje de ida y vuelta
+    por la red; executemany de un INSERT es un solo viaje porque mysql.connector lo reescribe
+    como un INSERT multi-fila.
+    """
+    def __init__(self, latencia=0.001):
+        self.latencia = latencia
+        self.tablas = {}
+        self.viajes = 0
+        self.lock = threading.Lock()
+
+    def conectar(self):
+        return ConexionSimulada(self)
+
+    def instantanea(self):
+        with self.lock:
+            return {tabla: sorted(map(repr, datos.values())) for tabla, datos in self.tablas.items()}
+
+    def ejecutar(self, consulta, filas):
+        time.sleep(self.latencia)
+        with self.lock:
+            self.viajes += 1
+            encontrado = re.match(r"\s*INSERT INTO (\w+) \(([^)]*)\)", consulta)
+            if not encontrado:
+                return  # CREATE TABLE y demás
+            tabla, columnas = encontrado.group(1), [c.strip() for c in encontrado.group(2).split(",")]
+            datos = self.tablas.setdefault(tabla, {})
+            for valores in filas:
+                fila = dict(zip(columnas, valores))
+                clave = tuple(fila[c] for c in CLAVES_SERVIDOR[tabla])
+                actual = datos.get(clave)
+                if actual is None:
+                    datos[clave] = fila
+                elif tabla == 'movimientos':
+                    if fila['sync_version'] >= actual['sync_version']:
+                        datos[clave] = fila
+                else:
+                    datos[clave] = {c: max(actual[c], fila[c]) if c not in CLAVES_SERVIDOR[tabla] else fila[c] for c in fila}
+
+
+class CursorSimulado:
+    def __init__(self, servidor):
+        self.servidor = servidor
+
+    def execute(self, consulta, params=()):
+        self.servidor.ejecutar(consulta, [params])
+
+    def executemany(self, consulta, filas):
+        self.servidor.ejecutar(consulta, list(filas))
+
+
+class ConexionSimulada:
+    def __init__(self, servidor):
+        self.servidor = servidor
+
+    def cursor(self, buffered=False):
+        return CursorSimulado(self.servidor)
+
+    def commit(self):
+        time.sleep(self.servidor.latencia)
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def medir_sincronizacion(carpeta, movimientos, latencia, espacios):
+    """Acumula un atraso offline y mide cuánto tarda en vaciarse por fila y por lotes"""
+    print(f"{movimientos} vehículos (entrada + salida) acumulados offline, {latencia * 1000:.1f} ms por viaje al servidor\n")
+    print(f"{'variante':<14}{'entradas':>10}{'filas':>8}{'viajes':>8}{'segundos':>10}{'filas/s':>10}")
+    resultados = {}
+    for nombre, vaciar in (("por_fila", sincronizar_por_fila_legado), ("lotes", lambda db: db.sincronizar_datos())):
+        servidor = ServidorSimulado(latencia)
+        config = crear_config(espacios)
+        ruta = os.path.join(carpeta, f"sync_{nombre}.db")
+        for sufijo in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+        db = DatabaseManager(config, db_path=ruta, conectar_mysql=servidor.conectar)
+        try:
+            hechos = 0
+            while hechos < movimientos:
+                placas = [f"S{hechos + i:06d}" for i in range(min(espacios, movimientos - hechos))]
+                for placa in placas:
+                    db.registrar_ingreso(placa, "Auto")
+                for placa in placas:
+                    db.registrar_salida(placa)
+                hechos += len(placas)
+            entradas = db.pendientes_sync()
+            with db.lectura() as cursor:
+                outbox = cursor.execute("SELECT tabla, clave, payload, creado FROM outbox ORDER BY seq").fetchall()
+            inicio = time.perf_counter()
+            if not vaciar(db):
+                raise RuntimeError("La sincronización no terminó")
+            segundos = time.perf_counter() - inicio
+            filas_servidor = sum(len(t) for t in servidor.tablas.values())
+            viajes = servidor.viajes
+            # Reenviar todo el atraso, versiones viejas incluidas (como tras una caída antes del
+            # checkpoint), no debe cambiar nada en el servidor
+            antes = servidor.instantanea()
+            with db.escritura() as cursor:
+                cursor.executemany("INSERT INTO outbox (tabla, clave, payload, creado) VALUES (?, ?, ?, ?)", outbox)
+            vaciar(db)
+            if servidor.instantanea() != antes:
+                raise RuntimeError("Reenviar el outbox cambió los datos del servidor")
+        finally:
+            db.cerrar()
+        resultados[nombre] = filas_servidor / segundos
+        print(
+            f"{nombre:<14}{entradas:>10}{filas_servidor:>8}{viajes:>8}{segundos:>10.2f}"
+            f"{filas_servidor / segundos:>10.1f}"
+        )
+    print(f"\nMejora: {resultados['lotes'] / resultados['por_fila']:.1f}x")
+
+# ******************** ÍNDICE DE OCUPACIÓN ********************
+def medir_ocupacion(carpeta, espacios, consultas, ocupacion=0.9):
+    """Siguiente libre y libres totales: consulta SQL contra el índice en memoria"""
+    db = crear_base(os.path.join(carpeta, "ocupacion.db"), espacios)
+    try:
+        azar = random.Random(1)
+        ocupados = azar.sample(range(1, espacios + 1), int(espacios * ocupacion))
+        with db.escritura() as cursor:
+            cursor.executemany("UPDATE espacios SET ocupado = 1 WHERE id = ?", [(i,) for i in ocupados])
+        db.recargar_ocupacion()
+
+        def sql():
+            with db.lectura() as cursor:
+                cursor.execute("SELECT id, numero FROM espacios WHERE ocupado = 0 ORDER BY numero LIMIT 1").fetchone()
+                cursor.execute("SELECT COUNT(*) FROM espacios WHERE ocupado = 0").fetchone()
+
+        def indice():
+            db.ocupacion.siguiente_libre()
+            db.ocupacion.libres()
+
+        print(f"{espacios} espacios, {ocupacion:.0%} ocupados, {consultas} consultas (siguiente libre + libres)\n")
+        tiempos = {}
+        for nombre, funcion in (("sql", sql), ("indice", indice)):
+            inicio = time.perf_counter()
+            for _ in range(consultas):
+                funcion()
+            tiempos[nombre] = (time.perf_counter() - inicio) / consultas * 1e6
+            print(f"{nombre:<8}{tiempos[nombre]:>10.1f} µs por consulta")
+        print(f"\nMejora: {tiempos['sql'] / tiempos['indice']:.0f}x")
+    finally:
+        db.cerrar()
+
+# ******************** ARCHIVO DE MOVIMIENTOS ********************
+def medir_archivo(carpeta, movimientos, espacios, clientes=200, meses=24):
+    """Consultas sobre la tabla principal con `meses` de historia, antes y después de archivarla"""
+    db = crear_base(os.path.join(carpeta, "archivo.db"), espacios)
+    try:
+        azar = random.Random(1)
+        ahora = datetime.now()
+        historia = []
+        for _ in range(movimientos):
+            # Los mismos clientes vuelven una y otra vez: cada placa acumula muchas salidas
+            entrada = ahora - timedelta(minutes=azar.randrange(60, meses * 30 * 24 * 60))
+            historia.append((
+                f"H{azar.randrange(clientes):04d}", "auto", entrada.strftime('%Y-%m-%d %H:%M:%S'),
+                (entrada + timedelta(minutes=50)).strftime('%Y-%m-%d %H:%M:%S'), 1, 2.0, 50.0, 2.0,
+                'salido', 0, uuid.uuid4().hex, db.nodo_id
+            ))
+        with db.escritura() as cursor:
+            cursor.executemany(
+                "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, hora_salida, espacio_asignado, "
+                "tarifa, tiempo_estacionado, total_cobrado, estado, pendiente_sync, uid, nodo) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", historia
+            )
+        for i in range(min(clientes, espacios) // 2):
+            db.registrar_ingreso(f"H{i:04d}", "auto")
+        dias = sorted({fila[2][:10] for fila in historia[:20]})
+
+        def medir():
+            inicio = time.perf_counter()
+            for i in range(clientes):
+                db.execute_query(
+                    "SELECT * FROM movimientos WHERE placa = ? AND estado = 'activo'", (f"H{i:04d}",), local_only=True
+                ).fetchone()
+            por_placa = (time.perf_counter() - inicio) / clientes * 1e6
+            inicio = time.perf_counter()
+            activos = db.get_vehiculos_activos()
+            listado = (time.perf_counter() - inicio) * 1e3
+            inicio = time.perf_counter()
+            detalle = [db.get_vehiculos_por_fecha(dia) for dia in dias]
+            por_dia = (time.perf_counter() - inicio) / len(dias) * 1e3
+            return por_placa, listado, por_dia, activos, detalle
+
+        print(f"{movimientos} movimientos cerrados en {meses} meses, {clientes} placas\n")
+        print(f"{'':<10}{'filas':>8}{'placa µs':>10}{'activos ms':>12}{'día ms':>9}")
+        antes = medir()
+        filas = db.execute_query("SELECT COUNT(*) FROM movimientos", local_only=True).fetchone()[0]
+        print(f"{'antes':<10}{filas:>8}{antes[0]:>10.1f}{antes[1]:>12.2f}{antes[2]:>9.2f}")
+        inicio = time.perf_counter()
+        archivados = db.archivar_movimientos()
+        segundos = time.perf_counter() - inicio
+        despues = medir()
+        filas = db.execute_query("SELECT COUNT(*) FROM movimientos", local_only=True).fetchone()[0]
+        print(f"{'después':<10}{filas:>8}{despues[0]:>10.1f}{despues[1]:>12.2f}{despues[2]:>9.2f}")
+        print(f"\n{archivados} movimientos archivados en {segundos:.2f}s; búsqueda por placa {antes[0] / despues[0]:.1f}x")
+        if antes[3:] != despues[3:]:
+            print("    Los activos o el detalle por día cambiaron al archivar")
+            return 1
+        return 0
+    finally:
+        db.cerrar()
+
+# ******************** REPLICACIÓN ENTRE PUERTAS ********************
+def puerta_replicada(indice, carpeta, espacios, placas, segundos, rondas_finales, barrera, salida):
+    """Un proceso = una puerta con su propia base, que comparte el registro de cambios con las demás"""
+    config = crear_config(espacios)
+    config.config['SETTINGS']['nodo_id'] = f"puerta{indice}"
+    ruta = os.path.join(carpeta, f"puerta{indice}.db")
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    db = DatabaseManager(config, db_path=ruta)
+    replicador = Replicador(db, RegistroCambiosSQLite(os.path.join(carpeta, "cambios.db")))
+    azar = random.Random(indice)
+    eventos = rechazados = 0
+    barrera.wait()
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        # Pocas placas para todas las puertas: la misma placa entra por dos puertas a menudo
+        placa = f"R{azar.randrange(placas):03d}"
+        if azar.random() < 0.5:
+            ok, _ = db.registrar_ingreso(placa, "Auto")
+        else:
+            ok, _ = db.registrar_salida(placa)
+        eventos += 1
+        rechazados += not ok
+        if azar.random() < 0.2:
+            replicador.sincronizar()
+    # Sin tráfico, unas vueltas más para que todos vean lo de todos
+    for _ in range(rondas_finales):
+        barrera.wait()
+        replicador.sincronizar()
+    barrera.wait()
+    with db.lectura() as cursor:
+        movimientos = cursor.execute(
+            "SELECT uid, placa, estado, espacio_asignado, sync_version FROM movimientos ORDER BY uid"
+        ).fetchall()
+        ocupados = cursor.execute("SELECT id FROM espacios WHERE ocupado = 1 ORDER BY id").fetchall()
+        duplicados = cursor.execute("SELECT COUNT(*) FROM movimientos WHERE estado = 'duplicado'").fetchone()[0]
+    desfase = len(comparar_resumenes(db))
+    db.cerrar()
+    salida.put((indice, eventos, rechazados, duplicados, movimientos, ocupados, desfase))
+
+def probar_replicacion(carpeta, nodos, espacios, placas, segundos):
+    ruta = os.path.join(carpeta, "cambios.db")
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    RegistroCambiosSQLite(ruta)
+    barrera = multiprocessing.Barrier(nodos)
+    salida = multiprocessing.Queue()
+    procesos = [
+        multiprocessing.Process(
+            target=puerta_replicada, args=(i, carpeta, espacios, placas, segundos, 6, barrera, salida)
+        )
+        for i in range(nodos)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    resultados = sorted(salida.get() for _ in procesos)
+    for proceso in procesos:
+        proceso.join()
+
+    print(f"{nodos} puertas, {placas} placas, {espacios} espacios, {segundos}s de tráfico\n")
+    print(f"{'puerta':<10}{'eventos':>9}{'rechazos':>10}{'movimientos':>13}{'duplicados':>12}{'ocupados':>10}")
+    for indice, eventos, rechazados, duplicados, movimientos, ocupados, _ in resultados:
+        print(f"puerta{indice:<4}{eventos:>9}{rechazados:>10}{len(movimientos):>13}{duplicados:>12}{len(ocupados):>10}")
+
+    errores = []
+    referencia = resultados[0]
+    for indice, _, _, _, movimientos, ocupados, _ in resultados[1:]:
+        if movimientos != referencia[4] or ocupados != referencia[5]:
+            errores.append(f"puerta{indice} no coincide con puerta{referencia[0]}")
+    for indice, *_, desfase in resultados:
+        if desfase:
+            errores.append(f"puerta{indice}: {desfase} filas de resúmenes no coinciden con reconstruirlos")
+    activos = [m for m in referencia[4] if m[2] == 'activo']
+    if len({m[1] for m in activos}) != len(activos):
+        errores.append("hay una placa activa dos veces")
+    if len({m[3] for m in activos}) != len(activos):
+        errores.append("hay un espacio asignado dos veces")
+    if len(activos) != len(referencia[5]):
+        errores.append(f"{len(activos)} vehículos activos y {len(referencia[5])} espacios ocupados")
+    for error in errores:
+        print(f"    {error}")
+    print("\nTodas las puertas convergieron al mismo estado" if not errores else "")
+    return 1 if errores else 0
+
+# ******************** RESÚMENES DE REPORTES ********************
+def comparar_resumenes(db):
+    """Claves del resumen incremental que no coinciden con reconstruirlo desde los movimientos"""
+    def instantanea():
+        with db.lectura() as cursor:
+            return {
+                fila[:4]: fila[4:]
+                for fila in cursor.execute("SELECT * FROM resumenes")
+                if fila[4] or fila[5] or abs(fila[6]) > 1e-6 or abs(fila[7]) > 1e-6
+            }
+    incremental = instantanea()
+    db.reconstruir_resumenes()
+    reconstruido = instantanea()
+    cero = (0, 0, 0.0, 0.0)
+    return [
+        clave for clave in set(incremental) | set(reconstruido)
+        if not all(
+            math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+            for a, b in zip(incremental.get(clave, cero), reconstruido.get(clave, cero))
+        )
+    ]
+
+def medir_resumenes(carpeta, eventos, espacios, historia=100000, dias=365):
+    """Reporte de un año desde los resúmenes contra GROUP BY sobre los movimientos"""
+    ruta = os.path.join(carpeta, "resumenes.db")
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    config = crear_config(espacios)
+    config.config['ZONAS'] = {'norte': str(espacios // 2), 'sur': str(espacios - espacios // 2)}
+    db = DatabaseManager(config, db_path=ruta)
+    try:
+        azar = random.Random(1)
+        ahora = datetime.now()
+        tipos = ("auto", "moto", "camioneta")
+        filas = []
+        for _ in range(historia):
+            entrada = ahora - timedelta(minutes=azar.randrange(60, dias * 24 * 60))
+            minutos = azar.randrange(10, 600)
+            filas.append((
+                f"H{azar.randrange(5000):04d}", azar.choice(tipos), entrada.strftime('%Y-%m-%d %H:%M:%S'),
+                (entrada + timedelta(minutes=minutos)).strftime('%Y-%m-%d %H:%M:%S'),
+                azar.randrange(1, espacios + 1), float(minutos), minutos / 30, 'salido', 0, uuid.uuid4().hex, db.nodo_id
+            ))
+        with db.escritura() as cursor:
+            cursor.executemany(
+                "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, hora_salida, espacio_asignado, "
+                "tiempo_estacionado, total_cobrado, estado, pendiente_sync, uid, nodo) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas
+            )
+        inicio = time.perf_counter()
+        db.reconstruir_resumenes()
+        reconstruir = time.perf_counter() - inicio
+
+        # Tráfico real encima de la historia: el resumen se mantiene con cada ingreso y salida
+        dentro = []
+        inicio = time.perf_counter()
+        for i in range(eventos):
+            if dentro and (len(dentro) >= espacios or azar.random() < 0.5):
+                db.registrar_salida(dentro.pop(azar.randrange(len(dentro))))
+            else:
+                placa = f"V{i:05d}"
+                if db.registrar_ingreso(placa, azar.choice(tipos), zona=azar.choice(("norte", "sur")))[0]:
+                    dentro.append(placa)
+        por_evento = (time.perf_counter() - inicio) / eventos * 1e3
+        desfase = comparar_resumenes(db)
+
+        desde = (ahora - timedelta(days=dias)).strftime('%Y-%m-%d')
+        hasta = ahora.strftime('%Y-%m-%d')
+
+        def escaneo():
+            with db.lectura() as cursor:
+                cursor.execute(
+                    "SELECT DATE(hora_entrada), COUNT(*) FROM movimientos WHERE estado IN ('activo', 'salido') "
+                    "AND hora_entrada BETWEEN ? AND ? GROUP BY 1", (desde, hasta + ' 23:59:59')
+                ).fetchall()
+                cursor.execute(
+                    "SELECT DATE(hora_salida), tipo_vehiculo, COUNT(*), SUM(total_cobrado), AVG(tiempo_estacionado) "
+                    "FROM movimientos WHERE estado = 'salido' AND hora_salida BETWEEN ? AND ? GROUP BY 1, 2",
+                    (desde, hasta + ' 23:59:59')
+                ).fetchall()
+
+        def resumen():
+            db.get_reporte_rango(desde, hasta)
+            db.get_resumen_rango(desde, hasta)
+
+        print(f"{historia} movimientos en {dias} días, reconstrucción {reconstruir:.2f}s, "
+              f"{eventos} eventos a {por_evento:.2f} ms\n")
+        tiempos = {}
+        for nombre, funcion in (("escaneo", escaneo), ("resumen", resumen)):
+            inicio = time.perf_counter()
+            for _ in range(5):
+                funcion()
+            tiempos[nombre] = (time.perf_counter() - inicio) / 5 * 1e3
+            print(f"{nombre:<10}{tiempos[nombre]:>10.1f} ms por reporte anual")
+        print(f"\nMejora: {tiempos['escaneo'] / tiempos['resumen']:.0f}x")
+        if desfase:
+            print(f"    {len(desfase)} filas del resumen incremental no coinciden con reconstruirlo")
+            return 1
+        print("El resumen incremental coincide con la reconstrucción")
+        return 0
+    finally:
+        db.cerrar()
+
+# ******************** HISTORIAL ********************
+def medir_historial(carpeta, espacios, historia=200000, meses=24, saltos=50):
+    """Abrir el historial leyendo todo contra la primera página y saltos por keyset"""
+    db = crear_base(os.path.join(carpeta, "historial.db"), espacios)
+    try:
+        azar = random.Random(1)
+        ahora = datetime.now()
+        filas = []
+        for _ in range(historia):
+            entrada = ahora - timedelta(minutes=azar.randrange(60, meses * 30 * 24 * 60))
+            filas.append((
+                f"H{azar.randrange(20000):05d}", azar.choice(("Auto", "Moto", "Camioneta")),
+                entrada.strftime('%Y-%m-%d %H:%M:%S'), (entrada + timedelta(minutes=50)).strftime('%Y-%m-%d %H:%M:%S'),
+                azar.randrange(1, espacios + 1), 2.0, 'salido', 0, uuid.uuid4().hex, db.nodo_id
+            ))
+        with db.escritura() as cursor:
+            cursor.executemany(
+                "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, hora_salida, espacio_asignado, "
+                "total_cobrado, estado, pendiente_sync, uid, nodo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas
+            )
+        del filas
+        archivados = db.archivar_movimientos()
+        print(f"{historia} movimientos en {meses} meses, {archivados} archivados\n")
+
+        inicio = time.perf_counter()
+        with db.lectura() as cursor:
+            # Lo que hacía la ventana antes: todas las filas en memoria antes de mostrar la primera
+            cursor.execute(f"SELECT * FROM {db.archivo.fuente(cursor)} ORDER BY hora_entrada DESC, id DESC")
+            todo = len(cursor.fetchall())
+        leer_todo = (time.perf_counter() - inicio) * 1e3
+
+        inicio = time.perf_counter()
+        primera = db.historial_pagina({})
+        pagina = (time.perf_counter() - inicio) * 1e3
+        inicio = time.perf_counter()
+        total, claves = db.historial_indice({})
+        indice = time.perf_counter() - inicio
+        tiempos = []
+        for _ in range(saltos):
+            clave = azar.choice(claves)
+            inicio = time.perf_counter()
+            db.historial_pagina({}, clave)
+            tiempos.append((time.perf_counter() - inicio) * 1e3)
+        inicio = time.perf_counter()
+        db.historial_pagina({'placa': 'H001', 'tipo': 'Moto'})
+        filtrada = (time.perf_counter() - inicio) * 1e3
+
+        print(f"{'leer todo':<22}{leer_todo:>10.1f} ms ({todo} filas)")
+        print(f"{'primera página':<22}{pagina:>10.1f} ms ({len(primera)} filas)")
+        print(f"{'índice (segundo plano)':<22}{indice * 1e3:>10.1f} ms ({len(claves)} claves)")
+        print(f"{'salto con la barra':<22}{sum(tiempos) / len(tiempos):>10.1f} ms promedio, "
+              f"{percentil(tiempos, 99):.1f} ms p99")
+        print(f"{'página filtrada':<22}{filtrada:>10.1f} ms")
+
+        # Recorrer un filtro bloque a bloque por keyset da las mismas filas que dice el índice
+        filtros = {'placa': 'H00'}
+        total_filtro, claves_filtro = db.historial_indice(filtros)
+        recorridas, despues, bloque = 0, None, 0
+        while True:
+            filas = db.historial_pagina(filtros, despues)
+            recorridas += len(filas)
+            if len(filas) < HISTORIAL_BLOQUE:
+                break
+            despues = (filas[-1][3], filas[-1][0])
+            if bloque < len(claves_filtro) and despues != claves_filtro[bloque]:
+                print(f"    El bloque {bloque} no termina en la clave del índice")
+                return 1
+            bloque += 1
+        if total != todo or recorridas != total_filtro:
+            print(f"    Totales distintos: {total} contra {todo}, {recorridas} contra {total_filtro}")
+            return 1
+        print(f"\nPrimera página {leer_todo / pagina:.0f}x antes que leer todo; el recorrido por keyset coincide con el índice")
+        return 0
+    finally:
+        db.cerrar()
+
+# ******************** PANEL DE ESTADO ********************
+class TemporizadorSinTk:
+    """Lo mínimo de un widget de Tk para correr RefreshScheduler sin ventana"""
+    def __init__(self):
+        self.pendiente = None
+
+    def after(self, ms, funcion):
+        self.pendiente = (ms, funcion)
+        return funcion
+
+    def after_cancel(self, _):
+        self.pendiente = None
+
+    def correr(self, segundos):
+        fin = time.perf_counter() + segundos
+        while self.pendiente is not None and time.perf_counter() < fin:
+            ms, funcion = self.pendiente
+            self.pendiente = None
+            time.sleep(ms / 1000)
+            funcion()
+
+def medir_panel(carpeta, espacios, historia=100000, segundos=5.0, por_segundo=PANEL_REFRESCOS_DEFECTO):
+    """Vuelta ociosa, redibujo completo y cuántos redibujos hace el panel con una puerta trabajando"""
+    db = crear_base(os.path.join(carpeta, "panel.db"), espacios)
+    try:
+        azar = random.Random(1)
+        ahora = datetime.now()
+        filas = []
+        for _ in range(historia):
+            # Un mes de historia en la tabla principal, con movimientos de los últimos minutos
+            entrada = ahora - timedelta(minutes=azar.randrange(60, 30 * 24 * 60))
+            filas.append((
+                f"P{azar.randrange(20000):05d}", "Auto", entrada.strftime('%Y-%m-%d %H:%M:%S'),
+                (entrada + timedelta(minutes=50)).strftime('%Y-%m-%d %H:%M:%S'),
+                azar.randrange(1, espacios + 1), 2.0, 'salido', 0, uuid.uuid4().hex, db.nodo_id
+            ))
+        with db.escritura() as cursor:
+            cursor.executemany(
+                "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, hora_salida, espacio_asignado, "
+                "total_cobrado, estado, pendiente_sync, uid, nodo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas
+            )
+        del filas
+        db.reconstruir_resumenes()
+
+        inicio = time.perf_counter()
+        for _ in range(20):
+            db.estado_panel()
+        redibujo = (time.perf_counter() - inicio) / 20
+        inicio = time.perf_counter()
+        for _ in range(1000):
+            db.version_datos()
+            db.modo_offline()
+        vuelta = (time.perf_counter() - inicio) / 1000
+
+        reloj = TemporizadorSinTk()
+        programador = RefreshScheduler(
+            reloj, db.estado_panel, lambda: (db.version_datos(), db.modo_offline()), por_segundo
+        )
+        eventos = [0]
+        fin = time.perf_counter() + segundos
+
+        def puerta():
+            n = 0
+            while time.perf_counter() < fin:
+                placa = f"Q{n % espacios:05d}"
+                db.registrar_ingreso(placa, "Auto")
+                db.registrar_salida(placa)
+                eventos[0] += 2
+                n += 1
+
+        hilo = threading.Thread(target=puerta)
+        hilo.start()
+        reloj.correr(segundos)
+        hilo.join()
+        con_eventos = programador.redibujos
+        reloj.correr(2.0)
+        ociosos = programador.redibujos - con_eventos
+
+        print(f"{historia} movimientos de historia, {por_segundo} redibujos/s como máximo\n")
+        print(f"{'vuelta sin cambios':<24}{vuelta * 1e6:>10.1f} µs (data_version y modo)")
+        print(f"{'redibujo completo':<24}{redibujo * 1e3:>10.2f} ms")
+        print(f"{'eventos de la puerta':<24}{eventos[0]:>10} en {segundos:.0f}s")
+        print(f"{'redibujos':<24}{con_eventos:>10} (uno por evento serían {eventos[0]})")
+        print(f"{'redibujos sin eventos':<24}{ociosos:>10} en 2s")
+        print(f"\nPanel: {con_eventos * redibujo * 1e3:.0f} ms de consultas contra "
+              f"{eventos[0] * redibujo * 1e3:.0f} ms redibujando en cada evento")
+        if con_eventos > segundos * por_segundo + 1 or ociosos:
+            print("    El panel redibujó más de lo permitido")
+            return 1
+        return 0
+    finally:
+        db.cerrar()
+
+# ******************** PLANES DE CONSULTA ********************
+def verificar_planes(carpeta, espacios):
+    """Las consultas frecuentes siguen usando sus índices; 1 si alguna recorre la tabla"""
+    db = crear_base(os.path.join(carpeta, "planes.db"), espacios)
+    try:
+        print(f"Esquema local versión {db.version_esquema()}")
+        problemas = db.verificar_planes_consulta()
+    finally:
+        db.cerrar()
+    for problema in problemas:
+        print(f"    {problema}")
+    print("\nTodas las consultas usan su índice" if not problemas else "")
+    return 1 if problemas else 0
+
+def contar_reportes(db):
+    cursor = db.execute_query("SELECT SUM(ingresos), SUM(egresos) FROM reportes", local_only=True)
+    return cursor.fetchone()
+
+# ******************** PROGRAMA PRINCIPAL ********************
+def main():
+    parser = argparse.ArgumentParser(
+        description="Eventos de entrada/salida por segundo sobre una base SQLite en archivo"
+    )
+    parser.add_argument("--eventos", type=int, default=1000, help="Entradas + salidas por variante")
+    parser.add_argument("--espacios", type=int, default=100)
+    parser.add_argument("--carpeta", default=None, help="Dónde crear las bases de prueba (por defecto un directorio temporal)")
+    parser.add_argument("--variantes", nargs="+", default=list(VARIANTES), choices=list(VARIANTES))
+    parser.add_argument("--concurrencia", action="store_true",
+                        help="Compara los perfiles SQLite con puertas escribiendo y lectores de reportes a la vez")
+    parser.add_argument("--estres", action="store_true",
+                        help="Muchos hilos sobre un DatabaseManager compartido; falla si hay bloqueos o la base queda inconsistente")
+    parser.add_argument("--sync", action="store_true",
+                        help="Filas/s al vaciar un atraso offline hacia un servidor MySQL simulado")
+    parser.add_argument("--latencia", type=float, default=1.0, help="Milisegundos por viaje al servidor simulado")
+    parser.add_argument("--replicacion", action="store_true",
+                        help="Varios procesos-puerta con un registro de cambios compartido; verifica que converjan")
+    parser.add_argument("--nodos", type=int, default=3, help="Puertas (procesos) para --replicacion")
+    parser.add_argument("--placas", type=int, default=30, help="Placas distintas que circulan en --replicacion")
+    parser.add_argument("--ocupacion", action="store_true",
+                        help="Siguiente espacio libre y libres totales: SQL contra el índice en memoria")
+    parser.add_argument("--archivo", action="store_true",
+                        help="Consultas con años de historia antes y después de archivarla; falla si los resultados cambian")
+    parser.add_argument("--resumenes", action="store_true",
+                        help="Reporte anual desde los resúmenes contra GROUP BY; falla si el incremental no coincide con reconstruirlo")
+    parser.add_argument("--historial", action="store_true",
+                        help="Historial por páginas con keyset contra leerlo completo; falla si el recorrido no coincide con el índice")
+    parser.add_argument("--panel", action="store_true",
+                        help="Redibujos del panel de estado con una puerta trabajando; falla si pasa del máximo por segundo")
+    parser.add_argument("--planes", action="store_true",
+                        help="EXPLAIN QUERY PLAN de las consultas frecuentes; falla si alguna dejó de usar su índice")
+    parser.add_argument("--perfiles", nargs="+", default=list(PERFILES_SQLITE), choices=list(PERFILES_SQLITE),
+                        help="Perfiles SQLite que se miden (modo por defecto, --concurrencia y --estres)")
+    parser.add_argument("--puertas", type=int, default=2, help="Hilos que registran entradas/salidas")
+    parser.add_argument("--lectores", type=int, default=4, help="Hilos que consultan reportes")
+    parser.add_argument("--segundos", type=float, default=5.0)
+    args = parser.parse_args()
+
+    carpeta = args.carpeta or tempfile.mkdtemp(prefix="benchmark_bd_")
+    os.makedirs(carpeta, exist_ok=True)
+
+    if args.concurrencia:
+        comparar_perfiles(carpeta, args.perfiles, args.puertas, args.lectores, args.segundos, args.espacios)
+        return 0
+    if args.ocupacion:
+        medir_ocupacion(carpeta, args.espacios, args.eventos)
+        return 0
+    if args.replicacion:
+        return probar_replicacion(carpeta, args.nodos, args.espacios, args.placas, args.segundos)
+    if args.sync:
+        medir_sincronizacion(carpeta, args.eventos, args.latencia / 1000, args.espacios)
+        return 0
+    if args.archivo:
+        return medir_archivo(carpeta, args.eventos, args.espacios)
+    if args.resumenes:
+        return medir_resumenes(carpeta, args.eventos, args.espacios)
+    if args.historial:
+        return medir_historial(carpeta, args.espacios)
+    if args.panel:
+        return medir_panel(carpeta, args.espacios, segundos=args.segundos)
+    if args.planes:
+        return verificar_planes(carpeta, args.espacios)
+    if args.estres:
+        return ejecutar_estres(carpeta, args.perfiles, args.puertas, args.lectores, args.segundos, args.espacios)
+
+    # El resultado depende del perfil: se mide con cada uno y se dice con cuál
+    for perfil in args.perfiles:
+        print(f"Perfil SQLite: {perfil} ({describir_perfil(perfil)})")
+        resultados = {}
+        for nombre in args.variantes:
+            ingreso, salida = VARIANTES[nombre]
+            db = crear_base(os.path.join(carpeta, f"{nombre}_{perfil}.db"), args.espacios, perfil)
+            try:
+                eventos, segundos = medir_eventos(db, ingreso, salida, args.eventos, args.espacios)
+                ingresos, egresos = contar_reportes(db)
+            finally:
+                db.cerrar()
+            resultados[nombre] = eventos / segundos
+            print(
+                f"  {nombre:<14} {eventos} eventos en {segundos:.2f}s = {eventos / segundos:8.1f} eventos/s "
+                f"(reportes: {ingresos} ingresos, {egresos} egresos)"
+            )
+
+        if "legado" in resultados and "transaccional" in resultados:
+            mejora = resultados['transaccional'] / resultados['legado']
+            print(f"  Mejora: {mejora:.1f}x")
+            if mejora < 1:
+                print(
+                    "  (transaccional además escribe el outbox y los resúmenes en cada evento; con "
+                    f"synchronous={PERFILES_SQLITE[perfil]['synchronous']} un commit casi no cuesta, así que "
+                    "ese trabajo extra pesa más que los commits que se ahorra)"
+                )
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
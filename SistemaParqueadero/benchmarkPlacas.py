@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from reconocimientoPlacas import PlateRecognizer, OCR_BACKENDS, crear_ocr_backend
+
+# Junto al script, no en la carpeta desde donde se lo ejecuta
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+ETAPAS = ["preproceso", "contorno", "recorte", "umbral", "ocr", "total"]
+
+# Márgenes tolerados antes de considerar una regresión frente al baseline
+TOLERANCIA_ACIERTO = 0.02
+TOLERANCIA_CER = 0.02
+TOLERANCIA_LATENCIA = 0.25
+
+# ******************** PLACAS SINTÉTICAS ********************
+def texto_placa_aleatorio(rng):
+    letras = "".join(rng.choice(string.ascii_uppercase) for _ in range(3))
+    numeros = "".join(rng.choice(string.digits) for _ in range(3))
+    return letras + numeros
+
+def generar_placa_sintetica(texto, rng, ancho=640, alto=480):
+    """Dibuja una placa blanca con borde negro sobre un fondo con ruido, iluminación y desenfoque variables"""
+    fondo = np.full((alto, ancho, 3), rng.randint(40, 120), np.uint8)
+    ruido = np.random.default_rng(rng.randint(0, 2**31)).integers(0, 40, fondo.shape, dtype=np.uint8)
+    img = cv2.add(fondo, ruido)
+
+    placa_w = rng.randint(ancho // 3, ancho // 2)
+    placa_h = int(placa_w / rng.uniform(2.4, 3.2))
+    x = rng.randint(10, ancho - placa_w - 10)
+    y = rng.randint(10, alto - placa_h - 10)
+    cv2.rectangle(img, (x, y), (x + placa_w, y + placa_h), (255, 255, 255), -1)
+    cv2.rectangle(img, (x, y), (x + placa_w, y + placa_h), (0, 0, 0), 4)
+
+    escala = placa_h / 40
+    (tw, th), _ = cv2.getTextSize(texto, cv2.FONT_HERSHEY_SIMPLEX, escala, 3)
+    tx = x + max((placa_w - tw) // 2, 5)
+    ty = y + (placa_h + th) // 2
+    cv2.putText(img, texto, (tx, ty), cv2.FONT_HERSHEY_SIMPLEX, escala, (0, 0, 0), 3, cv2.LINE_AA)
+
+    angulo = rng.uniform(-4, 4)
+    rotacion = cv2.getRotationMatrix2D((ancho / 2, alto / 2), angulo, 1.0)
+    img = cv2.warpAffine(img, rotacion, (ancho, alto), borderMode=cv2.BORDER_REPLICATE)
+    img = cv2.convertScaleAbs(img, alpha=rng.uniform(0.8, 1.1), beta=rng.randint(-20, 20))
+    if rng.random() < 0.5:
+        img = cv2.GaussianBlur(img, (3, 3), 0)
+    return img
+
+def generar_fixtures(cantidad, semilla=0, ancho=640, alto=480):
+    rng = random.Random(semilla)
+    fixtures = []
+    for _ in range(cantidad):
+        texto = texto_placa_aleatorio(rng)
+        fixtures.append((texto, generar_placa_sintetica(texto, rng, ancho, alto)))
+    return fixtures
+
+def cargar_fixtures(carpeta):
+    """Imágenes etiquetadas reales: el nombre del archivo (sin extensión) es la placa esperada"""
+    fixtures = []
+    for archivo in sorted(os.listdir(carpeta)):
+        img = cv2.imread(os.path.join(carpeta, archivo))
+        if img is not None:
+            etiqueta = os.path.splitext(archivo)[0].split("_")[0].upper().replace("-", "")
+            fixtures.append((etiqueta, img))
+    return fixtures
+
+def exportar_fixtures(fixtures, carpeta):
+    os.makedirs(carpeta, exist_ok=True)
+    for i, (texto, img) in enumerate(fixtures):
+        cv2.imwrite(os.path.join(carpeta, f"{texto}_{i:04d}.png"), img)
+
+# ******************** MÉTRICAS ********************
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[k]
+
+def distancia_edicion(a, b):
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = actual
+    return anterior[-1]
+
+def medir_etapas(img, backend):
+    """Ejecuta el pipeline de read_plate midiendo cada etapa por separado (ms)"""
+    tiempos = {}
+    t0 = time.perf_counter()
+    gray = PlateRecognizer.to_gray(img)
+    busqueda, escala = PlateRecognizer.search_image(gray)
+    edged = PlateRecognizer.preprocess_image(busqueda)
+    t1 = time.perf_counter()
+    contorno = PlateRecognizer.find_plate_contour(edged)
+    t2 = time.perf_counter()
+    if contorno is not None:
+        x, y, w, h = PlateRecognizer.contour_bbox(contorno, escala, img.shape)
+        recorte = img[y:y+h, x:x+w]
+    else:
+        recorte = gray
+    t3 = time.perf_counter()
+    thresh = PlateRecognizer.binarize_plate(recorte)
+    t4 = time.perf_counter()
+    texto = PlateRecognizer.clean_text(backend.image_to_string(thresh))
+    t5 = time.perf_counter()
+
+    tiempos["preproceso"] = (t1 - t0) * 1000
+    tiempos["contorno"] = (t2 - t1) * 1000
+    tiempos["recorte"] = (t3 - t2) * 1000
+    tiempos["umbral"] = (t4 - t3) * 1000
+    tiempos["ocr"] = (t5 - t4) * 1000
+    tiempos["total"] = (t5 - t0) * 1000
+    return texto, contorno is not None, tiempos
+
+def buscar_contorno_legado(img):
+    """Búsqueda anterior: RETR_TREE a resolución completa y orden total por área"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(gray, (5,5), 0)
+    edged = cv2.Canny(blur, 50, 200)
+    contours, _ = cv2.findContours(edged, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
+    for contour in contours:
+        perimeter = cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+        if len(approx) == 4:
+            x, y, w, h = cv2.boundingRect(contour)
+            if 2 <= w / h <= 5:
+                return approx
+    return None
+
+def comparar_busqueda(fixtures):
+    """Compara la búsqueda de candidatos anterior con locate_plate (sin OCR)"""
+    for nombre, buscar in [
+        ("legado", buscar_contorno_legado),
+        ("actual", lambda img: PlateRecognizer.locate_plate(img)[1]),
+    ]:
+        tiempos = []
+        detectadas = 0
+        for _, img in fixtures:
+            inicio = time.perf_counter()
+            encontrado = buscar(img)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            detectadas += encontrado is not None
+        print(
+            f"{nombre:8s} {fixtures[0][1].shape[1]}x{fixtures[0][1].shape[0]} "
+            f"p50={percentil(tiempos, 50):.2f}ms p95={percentil(tiempos, 95):.2f}ms "
+            f"media={statistics.mean(tiempos):.2f}ms deteccion={detectadas / len(fixtures):.1%}"
+        )
+
+def probar_backend(backend):
+    """Una lectura sobre una imagen en blanco; pytesseract sólo descubre que falta tesseract al invocarlo"""
+    try:
+        backend.image_to_string(np.full((40, 120), 255, np.uint8))
+        return None
+    except Exception as e:
+        return str(e)
+
+def evaluar_backend(nombre, fixtures, tesseract_path):
+    backend = crear_ocr_backend(nombre, tesseract_path)
+    if backend.nombre != nombre:
+        print(f"{nombre}: no disponible (se obtuvo {backend.nombre}), se omite")
+        backend.close()
+        return None
+    error = probar_backend(backend)
+    if error is not None:
+        print(f"{nombre}: no disponible ({error}), se omite")
+        backend.close()
+        return None
+
+    tiempos = {etapa: [] for etapa in ETAPAS}
+    aciertos = 0
+    detectadas = 0
+    errores_caracter = 0
+    caracteres = 0
+    try:
+        for esperado, img in fixtures:
+            leido, detectada, t = medir_etapas(img, backend)
+            for etapa in ETAPAS:
+                tiempos[etapa].append(t[etapa])
+            aciertos += leido == esperado
+            detectadas += detectada
+            errores_caracter += distancia_edicion(leido, esperado)
+            caracteres += len(esperado)
+    finally:
+        backend.close()
+
+    return {
+        "placas": len(fixtures),
+        "acierto": aciertos / len(fixtures),
+        "deteccion": detectadas / len(fixtures),
+        "cer": errores_caracter / max(caracteres, 1),
+        "latencia_ms": {
+            etapa: {
+                "p50": percentil(valores, 50),
+                "p95": percentil(valores, 95),
+                "p99": percentil(valores, 99),
+                "media": statistics.mean(valores),
+            }
+            for etapa, valores in tiempos.items()
+        },
+    }
+
+def imprimir_metricas(nombre, metricas):
+    print(
+        f"\n[{nombre}] placas={metricas['placas']} acierto={metricas['acierto']:.1%} "
+        f"deteccion={metricas['deteccion']:.1%} CER={metricas['cer']:.3f}"
+    )
+    print(f"  {'etapa':12s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'media':>9s}")
+    for etapa in ETAPAS:
+        lat = metricas["latencia_ms"][etapa]
+        print(f"  {etapa:12s} {lat['p50']:8.2f}ms {lat['p95']:8.2f}ms {lat['p99']:8.2f}ms {lat['media']:8.2f}ms")
+
+# ******************** BASELINE ********************
+def comparar_con_baseline(nombre, metricas, baseline):
+    """Devuelve la lista de regresiones respecto al baseline guardado"""
+    base = baseline.get(nombre)
+    if not base:
+        return []
+    regresiones = []
+    if metricas["acierto"] < base["acierto"] - TOLERANCIA_ACIERTO:
+        regresiones.append(f"acierto {metricas['acierto']:.1%} < baseline {base['acierto']:.1%}")
+    if metricas["deteccion"] < base["deteccion"] - TOLERANCIA_ACIERTO:
+        regresiones.append(f"deteccion {metricas['deteccion']:.1%} < baseline {base['deteccion']:.1%}")
+    if metricas["cer"] > base["cer"] + TOLERANCIA_CER:
+        regresiones.append(f"CER {metricas['cer']:.3f} > baseline {base['cer']:.3f}")
+    for etapa in ETAPAS:
+        actual = metricas["latencia_ms"][etapa]["p95"]
+        anterior = base["latencia_ms"][etapa]["p95"]
+        # Se ignoran etapas por debajo de 1 ms donde el ruido de medición domina
+        if actual > max(anterior * (1 + TOLERANCIA_LATENCIA), anterior + 1.0):
+            regresiones.append(f"p95 {etapa} {actual:.2f}ms > baseline {anterior:.2f}ms")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de latencia por etapa y precisión del reconocimiento de placas",
+        epilog="El baseline no viene con el repositorio: depende de la máquina y de la instalación de "
+               "tesseract. Créelo una vez con --guardar-baseline antes de un cambio y ejecute sin esa "
+               "opción después para comparar."
+    )
+    parser.add_argument("--placas", type=int, default=50, help="Cantidad de placas sintéticas")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--resolucion", default="640x480", help="Tamaño de las placas sintéticas, ej. 1920x1080")
+    parser.add_argument("--comparar-busqueda", action="store_true",
+                        help="Sólo compara la búsqueda de contornos anterior con la actual")
+    parser.add_argument("--fixtures", default=None, help="Carpeta de imágenes etiquetadas (PLACA_xxx.jpg)")
+    parser.add_argument("--exportar-fixtures", default=None, help="Guarda las placas sintéticas en esta carpeta")
+    parser.add_argument("--backends", nargs="+", default=list(OCR_BACKENDS), choices=list(OCR_BACKENDS))
+    parser.add_argument("--tesseract-path", default=None, help="Ruta del ejecutable de tesseract")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="Archivo JSON de referencia (por defecto junto a este script)")
+    parser.add_argument("--guardar-baseline", action="store_true",
+                        help="Guarda las métricas de esta ejecución en el baseline, por backend")
+    parser.add_argument("--canny-bajo", type=int, default=PlateRecognizer.CANNY_BAJO)
+    parser.add_argument("--canny-alto", type=int, default=PlateRecognizer.CANNY_ALTO)
+    parser.add_argument("--epsilon", type=float, default=PlateRecognizer.EPSILON_CONTORNO)
+    parser.add_argument("--umbral", type=int, default=PlateRecognizer.UMBRAL_BINARIO)
+    args = parser.parse_args()
+
+    PlateRecognizer.CANNY_BAJO = args.canny_bajo
+    PlateRecognizer.CANNY_ALTO = args.canny_alto
+    PlateRecognizer.EPSILON_CONTORNO = args.epsilon
+    PlateRecognizer.UMBRAL_BINARIO = args.umbral
+
+    if args.fixtures:
+        fixtures = cargar_fixtures(args.fixtures)
+    else:
+        ancho, alto = (int(v) for v in args.resolucion.lower().split("x"))
+        fixtures = generar_fixtures(args.placas, args.semilla, ancho, alto)
+    if args.exportar_fixtures:
+        exportar_fixtures(fixtures, args.exportar_fixtures)
+    if not fixtures:
+        print("No hay imágenes para evaluar")
+        return 1
+    if args.comparar_busqueda:
+        comparar_busqueda(fixtures)
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    elif not args.guardar_baseline:
+        print(f"No existe {args.baseline}; use --guardar-baseline para crearlo")
+
+    resultados = {}
+    regresiones = []
+    for nombre in args.backends:
+        metricas = evaluar_backend(nombre, fixtures, args.tesseract_path)
+        if metricas is None:
+            continue
+        resultados[nombre] = metricas
+        imprimir_metricas(nombre, metricas)
+        regresiones.extend(f"{nombre}: {r}" for r in comparar_con_baseline(nombre, metricas, baseline))
+    if not resultados:
+        print("Ningún backend OCR disponible: no se midió nada")
+        return 1
+
+    if args.guardar_baseline:
+        baseline.update(resultados)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline guardado en {args.baseline}")
+        return 0
+
+    if regresiones:
+        print("\nREGRESIONES:")
+        for regresion in regresiones:
+            print(f"  - {regresion}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as esperar_futures
+
+ESPERA_CIERRE_S = 10  # lo que shutdown(wait=True) espera a las tareas que ya están corriendo
+# ******************** TAREAS EN SEGUNDO PLANO ********************
+class TareaRechazada(Exception):
+    """La tarea no se aceptó: ya hay otra con la misma clave o la cola está llena"""
+
+
+class TareaCancelada(Exception):
+    """Una tarea cancelable la lanza para terminar antes de tiempo"""
+
+
+class Tarea:
+    def __init__(self, clave, descripcion, funcion, args, kwargs, al_terminar, al_fallar):
+        self.clave = clave
+        self.descripcion = descripcion or str(clave)
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.cancelacion = threading.Event()
+        self.cancelable = False
+        self.future = None
+        self.inicio = time.time()
+
+    def cancelar(self):
+        self.cancelacion.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def cancelada(self):
+        return self.cancelacion.is_set()
+
+
+class TaskExecutor:
+    """Pool acotado de hilos para trabajo lento (cámara, OCR, base de datos, PDF) de una app Tk.
+
+    Las funciones corren en los workers y nunca tocan widgets; sus callbacks al_terminar y
+    al_fallar se ejecutan en el hilo de Tk, al vaciar la cola de terminadas con after().
+    """
+    def __init__(self, widget, max_workers=4, max_pendientes=16, intervalo_ms=50, on_estado=None):
+        self.widget = widget
+        self.max_pendientes = max_pendientes
+        self.intervalo_ms = intervalo_ms
+        self.on_estado = on_estado
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarea")
+        self.terminadas = queue.Queue()
+        self.lock = threading.Lock()
+        self.activas = {}
+        self.cerrado = False
+        self._programar()
+
+    def submit(self, clave, funcion, *args, al_terminar=None, al_fallar=None, descripcion=None,
+               cancelable=False, **kwargs):
+        """Encola funcion(*args, **kwargs); con cancelable=True recibe además cancelacion=<Event>.
+
+        Lanza TareaRechazada si ya hay una tarea con la misma clave (por ejemplo, la misma
+        placa) o si se alcanzó el máximo de tareas pendientes.
+        """
+        with self.lock:
+            if self.cerrado:
+                raise TareaRechazada("El ejecutor de tareas está cerrado")
+            if clave in self.activas:
+                raise TareaRechazada(f"Ya hay una operación en curso: {self.activas[clave].descripcion}")
+            if len(self.activas) >= self.max_pendientes:
+                raise TareaRechazada("Hay demasiadas operaciones en curso, intente en unos segundos")
+            tarea = Tarea(clave, descripcion, funcion, args, kwargs, al_terminar, al_fallar)
+            if cancelable:
+                tarea.cancelable = True
+                tarea.kwargs = dict(kwargs, cancelacion=tarea.cancelacion)
+            self.activas[clave] = tarea
+            tarea.future = self.pool.submit(self._ejecutar, tarea)
+            tarea.future.add_done_callback(lambda future, tarea=tarea: self._si_cancelada(future, tarea))
+        self._notificar_estado()
+        return tarea
+
+    def cancelar(self, clave):
+        with self.lock:
+            tarea = self.activas.get(clave)
+        if tarea is not None:
+            tarea.cancelar()
+        return tarea is not None
+
+    def cancelables(self):
+        """Claves de las tareas en curso que aceptan cancelación y todavía no se cancelaron"""
+        with self.lock:
+            return [tarea.clave for tarea in self.activas.values() if tarea.cancelable and not tarea.cancelada()]
+
+    def en_curso(self, clave=None):
+        with self.lock:
+            if clave is not None:
+                return clave in self.activas
+            return [tarea.descripcion for tarea in self.activas.values()]
+
+    def shutdown(self, wait=False, timeout=ESPERA_CIERRE_S):
+        """Cancela lo pendiente; con wait=True espera hasta timeout a las que ya están corriendo.
+
+        Devuelve las descripciones de las tareas que seguían corriendo al volver. Quien cierra
+        la base después tiene que esperar: una transacción a medias no debe perder su conexión.
+        """
+        with self.lock:
+            self.cerrado = True
+            tareas = list(self.activas.values())
+        for tarea in tareas:
+            tarea.cancelar()
+        # Las canceladas antes de empezar ya están terminadas; las cancelables se enteran por el Event
+        self.pool.shutdown(wait=False)
+        futures = [tarea.future for tarea in tareas if tarea.future is not None]
+        if wait and futures:
+            esperar_futures(futures, timeout=timeout)
+        return [tarea.descripcion for tarea in tareas if tarea.future is not None and not tarea.future.done()]
+
+    def _si_cancelada(self, future, tarea):
+        # Cancelada antes de empezar: _ejecutar nunca corre, así que se avisa desde aquí
+        if future.cancelled():
+            self.terminadas.put((tarea, None, TareaCancelada()))
+
+    def _ejecutar(self, tarea):
+        if tarea.cancelada():
+            self.terminadas.put((tarea, None, TareaCancelada()))
+            return
+        try:
+            resultado = tarea.funcion(*tarea.args, **tarea.kwargs)
+            self.terminadas.put((tarea, resultado, None))
+        except Exception as e:
+            if not isinstance(e, TareaCancelada):
+                logging.error(f"Error en tarea '{tarea.descripcion}': {e}")
+            self.terminadas.put((tarea, None, e))
+
+    def _programar(self):
+        try:
+            self.widget.after(self.intervalo_ms, self._vaciar)
+        except Exception:
+            # La ventana ya fue destruida
+            self.cerrado = True
+
+    def _vaciar(self):
+        """Corre en el hilo de Tk: entrega resultados a sus callbacks"""
+        hubo_cambios = False
+        while True:
+            try:
+                tarea, resultado, error = self.terminadas.get_nowait()
+            except queue.Empty:
+                break
+            with self.lock:
+                if self.activas.get(tarea.clave) is tarea:
+                    del self.activas[tarea.clave]
+            hubo_cambios = True
+            if tarea.cancelada() or isinstance(error, TareaCancelada):
+                continue
+            try:
+                if error is None:
+                    if tarea.al_terminar is not None:
+                        tarea.al_terminar(resultado)
+                elif tarea.al_fallar is not None:
+                    tarea.al_fallar(error)
+            except Exception as e:
+                logging.error(f"Error al completar la tarea '{tarea.descripcion}': {e}")
+        if hubo_cambios:
+            self._notificar_estado()
+        if not self.cerrado:
+            self._programar()
+
+    def _notificar_estado(self):
+        if self.on_estado is None:
+            return
+        if threading.current_thread() is not threading.main_thread():
+            return
+        try:
+            self.on_estado(self.en_curso())
+        except Exception as e:
+            logging.error(f"Error al mostrar el estado de las tareas: {e}")
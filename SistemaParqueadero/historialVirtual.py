@@ -0,0 +1,374 @@
+import tkinter as tk
+from collections import OrderedDict
+from datetime import datetime
+from tkinter import messagebox, ttk
+
+from ejecutorTareas import TareaCancelada, TareaRechazada
+
+# ******************** HISTORIAL VIRTUAL ********************
+HISTORIAL_BLOQUE = 200  # filas por consulta; el índice guarda una clave cada tantas filas
+HISTORIAL_CACHE = 40  # bloques en memoria: 8000 filas aunque el historial tenga millones
+HISTORIAL_MARGEN = 1  # bloques que se piden antes y después de lo visible
+HISTORIAL_PEDIDOS = 3  # consultas de bloques en curso a la vez
+HISTORIAL_RUEDA = 3  # filas por paso de la rueda del mouse
+REINTENTO_MS = 100
+TODOS = "Todos"
+
+
+def indice_por_bloques(cursor, cada, cancelacion=None):
+    """(total, claves) recorriendo un SELECT ya ejecutado que devuelve sólo las columnas de la clave.
+
+    claves[k] es la clave de la última fila del bloque k: el bloque k + 1 son las filas que
+    vienen después de ella.
+    """
+    total = 0
+    claves = []
+    while True:
+        if cancelacion is not None and cancelacion.is_set():
+            raise TareaCancelada()
+        filas = cursor.fetchmany(cada)
+        total += len(filas)
+        if len(filas) < cada:
+            return total, claves
+        claves.append(tuple(filas[-1]))
+
+
+def leer_fecha(texto, nombre):
+    """'AAAA-MM-DD' validada, o None si está vacía"""
+    texto = texto.strip()
+    if not texto:
+        return None
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Fecha {nombre} inválida, use AAAA-MM-DD")
+
+
+class VirtualHistory(ttk.Frame):
+    """Historial de movimientos que sólo carga lo que se ve.
+
+    El Treeview tiene tantas filas como caben en pantalla y se reescriben al desplazarse. Los
+    datos llegan en bloques de HISTORIAL_BLOQUE filas pedidos por keyset (las que siguen a la
+    clave de la última fila del bloque anterior), nunca con OFFSET, y quedan en un LRU de
+    HISTORIAL_CACHE bloques. Un índice calculado en segundo plano guarda la clave de cada
+    límite de bloque: saltar con la barra a cualquier posición cuesta una sola consulta.
+
+    pagina(filtros, despues, limite) -> filas e indice(filtros, cada, cancelacion) ->
+    (total, claves) corren en los workers de `tareas` y filtran en la base de datos;
+    clave(fila) da la clave de keyset de una fila y formatear(fila) sus valores en pantalla.
+    """
+    def __init__(self, padre, tareas, columnas, pagina, indice, clave, formatear,
+                 tipos=(), estados=(), filtros=None, filas=20):
+        super().__init__(padre)
+        self.tareas = tareas
+        self.pagina = pagina
+        self.indice = indice
+        self.clave = clave
+        self.formatear = formatear
+        self.columnas = len(columnas)
+        self.generacion = 0
+        self.filtros = {}
+        self.total = None
+        self.conocidas = 0
+        self.claves = None
+        self.indice_pedido = False
+        self.bloques = OrderedDict()
+        self.pedidos = set()
+        self.posicion = 0
+        self.reintento = None
+        self.destruido = False
+
+        self._crear_filtros(tipos, estados, filtros or {})
+
+        frame_tabla = ttk.Frame(self)
+        frame_tabla.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(frame_tabla, columns=[titulo for titulo, _ in columnas],
+                                 show="headings", height=filas, selectmode="browse")
+        for titulo, ancho in columnas:
+            self.tree.heading(titulo, text=titulo)
+            self.tree.column(titulo, width=ancho)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.barra = ttk.Scrollbar(frame_tabla, orient=tk.VERTICAL, command=self._barra)
+        self.barra.pack(side=tk.RIGHT, fill=tk.Y)
+        self.items = [self.tree.insert("", tk.END) for _ in range(filas)]
+
+        self.lbl_estado = ttk.Label(self, text="")
+        self.lbl_estado.pack(fill=tk.X, pady=(5, 0))
+
+        self.tree.bind("<Configure>", self._ajustar_filas)
+        # "break" evita que el Treeview además se desplace por su cuenta
+        self.tree.bind("<MouseWheel>", lambda e: self._mover(-HISTORIAL_RUEDA if e.delta > 0 else HISTORIAL_RUEDA))
+        self.tree.bind("<Button-4>", lambda e: self._mover(-HISTORIAL_RUEDA))
+        self.tree.bind("<Button-5>", lambda e: self._mover(HISTORIAL_RUEDA))
+        self.tree.bind("<Up>", lambda e: self._mover(-1))
+        self.tree.bind("<Down>", lambda e: self._mover(1))
+        self.tree.bind("<Prior>", lambda e: self._mover(-len(self.items)))
+        self.tree.bind("<Next>", lambda e: self._mover(len(self.items)))
+        self.tree.bind("<Home>", lambda e: self._mover(-self._filas_conocidas()))
+        self.tree.bind("<End>", lambda e: self._mover(self._filas_conocidas()))
+        self.bind("<Destroy>", self._al_destruir)
+
+        self.aplicar_filtros()
+
+    def _crear_filtros(self, tipos, estados, iniciales):
+        frame = ttk.Frame(self)
+        frame.pack(fill=tk.X, pady=(0, 5))
+
+        self.entry_placa = ttk.Entry(frame, width=10)
+        self.entry_desde = ttk.Entry(frame, width=11)
+        self.entry_hasta = ttk.Entry(frame, width=11)
+        campos = [("Placa:", self.entry_placa), ("Desde:", self.entry_desde), ("Hasta:", self.entry_hasta)]
+        self.combo_tipo = self.combo_estado = None
+        if tipos:
+            self.combo_tipo = ttk.Combobox(frame, values=(TODOS,) + tuple(tipos), width=11, state="readonly")
+            campos.append(("Tipo:", self.combo_tipo))
+        if estados:
+            self.combo_estado = ttk.Combobox(frame, values=(TODOS,) + tuple(estados), width=9, state="readonly")
+            campos.append(("Estado:", self.combo_estado))
+
+        for columna, (texto, widget) in enumerate(campos):
+            ttk.Label(frame, text=texto).grid(row=0, column=2 * columna, padx=(5, 2))
+            widget.grid(row=0, column=2 * columna + 1, padx=(0, 5))
+            if isinstance(widget, ttk.Combobox):
+                widget.set(TODOS)
+            else:
+                widget.bind("<Return>", lambda e: self.aplicar_filtros())
+        ttk.Button(frame, text="Filtrar", command=self.aplicar_filtros).grid(row=0, column=2 * len(campos), padx=5)
+        ttk.Button(frame, text="Limpiar", command=self.limpiar_filtros).grid(row=0, column=2 * len(campos) + 1)
+
+        for clave, widget in (('placa', self.entry_placa), ('desde', self.entry_desde), ('hasta', self.entry_hasta)):
+            if iniciales.get(clave):
+                widget.insert(0, iniciales[clave])
+        for clave, combo in (('tipo', self.combo_tipo), ('estado', self.combo_estado)):
+            if combo is not None and iniciales.get(clave):
+                combo.set(iniciales[clave])
+
+    def _leer_filtros(self):
+        filtros = {
+            'placa': self.entry_placa.get().strip().upper() or None,
+            'desde': leer_fecha(self.entry_desde.get(), "desde"),
+            'hasta': leer_fecha(self.entry_hasta.get(), "hasta"),
+        }
+        if filtros['desde'] and filtros['hasta'] and filtros['desde'] > filtros['hasta']:
+            raise ValueError("La fecha desde es posterior a la fecha hasta")
+        for clave, combo in (('tipo', self.combo_tipo), ('estado', self.combo_estado)):
+            if combo is not None and combo.get() != TODOS:
+                filtros[clave] = combo.get()
+        return {clave: valor for clave, valor in filtros.items() if valor}
+
+    def limpiar_filtros(self):
+        for entry in (self.entry_placa, self.entry_desde, self.entry_hasta):
+            entry.delete(0, tk.END)
+        for combo in (self.combo_tipo, self.combo_estado):
+            if combo is not None:
+                combo.set(TODOS)
+        self.aplicar_filtros()
+
+    def aplicar_filtros(self):
+        try:
+            filtros = self._leer_filtros()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        # Lo que siga en vuelo de los filtros anteriores se descarta al llegar
+        self.tareas.cancelar(self._clave_tarea("indice"))
+        self.generacion += 1
+        self.filtros = filtros
+        self.total = None
+        self.conocidas = 0
+        self.claves = None
+        self.indice_pedido = False
+        self.bloques.clear()
+        self.pedidos.clear()
+        self.posicion = 0
+        self._pedir_bloques()
+        self._pedir_indice()
+        self._pintar()
+
+    # ******************** CONSULTAS EN SEGUNDO PLANO ********************
+    def _clave_tarea(self, nombre):
+        return ("historial", id(self), self.generacion, nombre)
+
+    def _enviar(self, nombre, funcion, *args, al_terminar, al_fallar, cancelable=False):
+        try:
+            self.tareas.submit(
+                self._clave_tarea(nombre), funcion, *args,
+                al_terminar=al_terminar,
+                al_fallar=al_fallar,
+                descripcion="Leyendo historial",
+                cancelable=cancelable
+            )
+            return True
+        except TareaRechazada:
+            # El ejecutor está lleno: se vuelve a intentar en un momento
+            if self.reintento is None:
+                self.reintento = self.after(REINTENTO_MS, self._reintentar)
+            return False
+
+    def _reintentar(self):
+        self.reintento = None
+        self._pedir_indice()
+        self._pedir_bloques()
+
+    def _pedir_indice(self):
+        if self.indice_pedido:
+            return
+        generacion = self.generacion
+        self.indice_pedido = self._enviar(
+            "indice", self.indice, dict(self.filtros), HISTORIAL_BLOQUE,
+            al_terminar=lambda resultado: self._indice_listo(generacion, resultado),
+            al_fallar=lambda error: self._consulta_fallida(generacion, None, error),
+            cancelable=True
+        )
+
+    def _indice_listo(self, generacion, resultado):
+        if self.destruido or generacion != self.generacion:
+            return
+        self.total, self.claves = resultado
+        self.conocidas = self.total
+        self._ir_a(self.posicion)
+
+    def _inicio_bloque(self, bloque):
+        """(True, clave después de la cual empieza el bloque) o (False, None) si todavía no se sabe"""
+        if bloque == 0:
+            return True, None
+        if self.claves is not None and bloque - 1 < len(self.claves):
+            return True, self.claves[bloque - 1]
+        anterior = self.bloques.get(bloque - 1)
+        if anterior is not None and len(anterior) == HISTORIAL_BLOQUE:
+            return True, self.clave(anterior[-1])
+        return False, None
+
+    def _pedir_bloques(self):
+        primero = self.posicion // HISTORIAL_BLOQUE
+        ultimo = (self.posicion + len(self.items) - 1) // HISTORIAL_BLOQUE
+        # Primero lo visible, después lo que sigue y por último lo anterior
+        orden = list(range(primero, ultimo + 1))
+        orden += list(range(ultimo + 1, ultimo + 1 + HISTORIAL_MARGEN))
+        orden += list(range(primero - HISTORIAL_MARGEN, primero))
+        for bloque in orden:
+            if bloque < 0 or (self.total is not None and bloque * HISTORIAL_BLOQUE >= self.total):
+                continue
+            if bloque in self.bloques:
+                self.bloques.move_to_end(bloque)
+                continue
+            if bloque in self.pedidos:
+                continue
+            if len(self.pedidos) >= HISTORIAL_PEDIDOS:
+                return
+            listo, despues = self._inicio_bloque(bloque)
+            if not listo:
+                continue
+            generacion = self.generacion
+            if not self._enviar(
+                f"bloque {bloque}", self.pagina, dict(self.filtros), despues, HISTORIAL_BLOQUE,
+                al_terminar=lambda filas, bloque=bloque: self._bloque_listo(generacion, bloque, filas),
+                al_fallar=lambda error, bloque=bloque: self._consulta_fallida(generacion, bloque, error)
+            ):
+                return
+            self.pedidos.add(bloque)
+
+    def _bloque_listo(self, generacion, bloque, filas):
+        if self.destruido or generacion != self.generacion:
+            return
+        self.pedidos.discard(bloque)
+        self.bloques[bloque] = filas
+        while len(self.bloques) > HISTORIAL_CACHE:
+            self.bloques.popitem(last=False)
+        self.conocidas = max(self.conocidas, bloque * HISTORIAL_BLOQUE + len(filas))
+        if len(filas) < HISTORIAL_BLOQUE and self.total is None:
+            # Un bloque incompleto es el último: ya se sabe el total sin esperar al índice
+            self.total = self.conocidas
+        self._pedir_bloques()
+        self._pintar()
+
+    def _consulta_fallida(self, generacion, bloque, error):
+        """bloque None es el índice; lo fallido se vuelve a pedir al desplazarse"""
+        if self.destruido or generacion != self.generacion:
+            return
+        if bloque is None:
+            self.indice_pedido = False
+        else:
+            self.pedidos.discard(bloque)
+        self.lbl_estado.config(text=f"Error al leer el historial: {error}")
+
+    # ******************** DESPLAZAMIENTO ********************
+    def _filas_conocidas(self):
+        return self.total if self.total is not None else self.conocidas
+
+    def _barra(self, accion, cantidad, unidad=None):
+        if accion == tk.MOVETO:
+            self._ir_a(int(float(cantidad) * self._filas_conocidas()))
+        elif accion == tk.SCROLL:
+            self._mover(int(cantidad) * (len(self.items) if unidad == tk.PAGES else 1))
+
+    def _mover(self, filas):
+        self._ir_a(self.posicion + filas)
+        return "break"
+
+    def _ir_a(self, posicion):
+        maximo = max(0, self._filas_conocidas() - len(self.items))
+        posicion = min(max(0, posicion), maximo)
+        if posicion != self.posicion:
+            self.tree.selection_remove(self.tree.selection())
+        self.posicion = posicion
+        self._pedir_bloques()
+        self._pedir_indice()
+        self._pintar()
+
+    def _ajustar_filas(self, event=None):
+        caja = self.tree.bbox(self.items[0]) if self.items else None
+        if not caja:
+            return
+        _, arriba, _, alto = caja
+        filas = max(1, (self.tree.winfo_height() - arriba) // alto)
+        if filas == len(self.items):
+            return
+        while len(self.items) < filas:
+            self.items.append(self.tree.insert("", tk.END))
+        while len(self.items) > filas:
+            self.tree.delete(self.items.pop())
+        self.tree.yview_moveto(0)
+        self._ir_a(self.posicion)
+
+    def _pintar(self):
+        vacia = ("",) * self.columnas
+        cargando = ("…",) + ("",) * (self.columnas - 1)
+        faltan = False
+        for i, item in enumerate(self.items):
+            numero = self.posicion + i
+            bloque, desplazamiento = divmod(numero, HISTORIAL_BLOQUE)
+            filas = self.bloques.get(bloque)
+            if filas is not None and desplazamiento < len(filas):
+                valores = self.formatear(filas[desplazamiento])
+            elif self.total is not None and numero >= self.total:
+                valores = vacia
+            else:
+                valores = cargando
+                faltan = True
+            self.tree.item(item, values=valores)
+
+        total = self._filas_conocidas()
+        if total:
+            self.barra.set(self.posicion / total, min(1.0, (self.posicion + len(self.items)) / total))
+        else:
+            self.barra.set(0.0, 1.0)
+
+        if self.total == 0:
+            texto = "Sin movimientos para estos filtros"
+        else:
+            ultimo = min(self.posicion + len(self.items), total)
+            de = f"{self.total}" if self.total is not None else f"al menos {self.conocidas} (contando...)"
+            texto = f"Movimientos {self.posicion + 1}-{ultimo} de {de}" if total else "Cargando..."
+            if faltan and total:
+                texto += " - cargando..."
+        self.lbl_estado.config(text=texto)
+
+    def _al_destruir(self, event):
+        if event.widget is not self:
+            return
+        self.destruido = True
+        self.tareas.cancelar(self._clave_tarea("indice"))
+        if self.reintento is not None:
+            self.after_cancel(self.reintento)
+            self.reintento = None
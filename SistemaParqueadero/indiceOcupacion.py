@@ -0,0 +1,160 @@
+import heapq
+import logging
+import threading
+
+# ******************** ÍNDICE DE OCUPACIÓN ********************
+ZONA_DEFECTO = 'general'
+
+
+class OccupancyIndex:
+    """Ocupación de los espacios en memoria: bitmap por id de espacio y lista de libres por zona.
+
+    La lista de libres es un heap por (numero, id) con borrado perezoso: ocupar un espacio sólo
+    cambia el bitmap y la entrada vieja se descarta cuando llega al tope. Así "siguiente libre",
+    "libres por zona" y "¿está libre?" no necesitan SQL. La fuente de verdad sigue siendo la
+    tabla espacios; DatabaseManager aplica aquí cada cambio confirmado y reconcilia cada tanto.
+
+    Como todo cambio de ocupación confirmado pasa por aquí, los observadores se enteran de
+    qué espacios cambiaron sin volver a leer la tabla.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ocupado = bytearray()
+        self.zona_de = {}
+        self.numero_de = {}
+        self.libres_heap = {}
+        self.libres_zona = {}
+        self.observadores = []
+
+    def observar(self, funcion):
+        """funcion(ids, estructura) después de cada cambio, en el hilo que lo hizo.
+
+        ids son los espacios cuya ocupación cambió; estructura es True si además se agregaron,
+        quitaron o renumeraron espacios. El estado actual se lee con estados().
+        """
+        with self.lock:
+            self.observadores.append(funcion)
+
+    def dejar_de_observar(self, funcion):
+        with self.lock:
+            if funcion in self.observadores:
+                self.observadores.remove(funcion)
+
+    def _notificar(self, ids, estructura=False):
+        # Fuera del lock: un observador puede consultar el índice
+        with self.lock:
+            observadores = list(self.observadores)
+        for funcion in observadores:
+            try:
+                funcion(ids, estructura)
+            except Exception as e:
+                logging.error(f"Error al notificar un cambio de ocupación: {e}")
+
+    def cargar(self, filas):
+        """filas = [(id, numero, zona, ocupado)] tal como están en la tabla espacios"""
+        filas = list(filas)
+        with self.lock:
+            anteriores = {
+                espacio_id: (self.numero_de[espacio_id], zona, self.ocupado[espacio_id])
+                for espacio_id, zona in self.zona_de.items()
+            }
+            self.ocupado = bytearray(max((fila[0] for fila in filas), default=0) + 1)
+            self.zona_de = {}
+            self.numero_de = {}
+            self.libres_heap = {}
+            self.libres_zona = {}
+            for espacio_id, numero, zona, ocupado in filas:
+                zona = zona or ZONA_DEFECTO
+                self.zona_de[espacio_id] = zona
+                self.numero_de[espacio_id] = numero
+                self.libres_heap.setdefault(zona, [])
+                self.libres_zona.setdefault(zona, 0)
+                if ocupado:
+                    self.ocupado[espacio_id] = 1
+                else:
+                    self.libres_heap[zona].append((numero, espacio_id))
+                    self.libres_zona[zona] += 1
+            for heap in self.libres_heap.values():
+                heapq.heapify(heap)
+            actuales = {
+                espacio_id: (self.numero_de[espacio_id], zona, self.ocupado[espacio_id])
+                for espacio_id, zona in self.zona_de.items()
+            }
+        estructura = {k: v[:2] for k, v in anteriores.items()} != {k: v[:2] for k, v in actuales.items()}
+        ids = {espacio_id for espacio_id, estado in actuales.items() if anteriores.get(espacio_id) != estado}
+        if ids or estructura:
+            self._notificar(ids, estructura)
+
+    def diferencias(self, filas):
+        """Espacios cuyo estado en la tabla no coincide con el índice: [(id, ocupado_en_tabla)]"""
+        with self.lock:
+            return [
+                (espacio_id, bool(ocupado))
+                for espacio_id, _, _, ocupado in filas
+                if espacio_id not in self.zona_de or bool(self.ocupado[espacio_id]) != bool(ocupado)
+            ]
+
+    def siguiente_libre(self, zona=None):
+        """(id, numero) del libre de menor número en la zona (o en cualquiera); None si no hay"""
+        with self.lock:
+            zonas = [zona] if zona is not None else sorted(self.libres_heap)
+            for nombre in zonas:
+                heap = self.libres_heap.get(nombre)
+                while heap:
+                    numero, espacio_id = heap[0]
+                    if not self.ocupado[espacio_id]:
+                        return espacio_id, numero
+                    heapq.heappop(heap)
+            return None
+
+    def ocupar(self, espacio_id):
+        with self.lock:
+            if espacio_id not in self.zona_de or self.ocupado[espacio_id]:
+                return
+            self.ocupado[espacio_id] = 1
+            self.libres_zona[self.zona_de[espacio_id]] -= 1
+        self._notificar({espacio_id})
+
+    def liberar(self, espacio_id):
+        with self.lock:
+            if espacio_id not in self.zona_de or not self.ocupado[espacio_id]:
+                return
+            self.ocupado[espacio_id] = 0
+            zona = self.zona_de[espacio_id]
+            self.libres_zona[zona] += 1
+            heapq.heappush(self.libres_heap[zona], (self.numero_de[espacio_id], espacio_id))
+        self._notificar({espacio_id})
+
+    def espacios(self):
+        """[(id, numero, zona, ocupado)] ordenados por zona y número"""
+        with self.lock:
+            return sorted(
+                ((espacio_id, self.numero_de[espacio_id], zona, bool(self.ocupado[espacio_id]))
+                 for espacio_id, zona in self.zona_de.items()),
+                key=lambda espacio: (espacio[2], espacio[1])
+            )
+
+    def estados(self, ids):
+        """{id: ocupado} de los espacios pedidos que existen"""
+        with self.lock:
+            return {espacio_id: bool(self.ocupado[espacio_id]) for espacio_id in ids if espacio_id in self.zona_de}
+
+    def esta_libre(self, espacio_id):
+        with self.lock:
+            return espacio_id in self.zona_de and not self.ocupado[espacio_id]
+
+    def libres(self, zona=None):
+        with self.lock:
+            if zona is not None:
+                return self.libres_zona.get(zona, 0)
+            return sum(self.libres_zona.values())
+
+    def libres_por_zona(self):
+        with self.lock:
+            return dict(sorted(self.libres_zona.items()))
+
+    def total(self, zona=None):
+        with self.lock:
+            if zona is None:
+                return len(self.zona_de)
+            return sum(1 for z in self.zona_de.values() if z == zona)
@@ -0,0 +1,175 @@
+import bisect
+import queue
+import tkinter as tk
+from tkinter import ttk
+
+# ******************** LISTA DE VEHÍCULOS ACTIVOS ********************
+LISTA_COLUMNAS = (  # (columna, título, ancho) en el orden de las filas de ActiveVehicles
+    ("Placa", "Placa", 100),
+    ("Tipo", "Tipo", 80),
+    ("Ingreso", "Hora de Ingreso", 150),
+    ("Espacio", "Espacio", 60),
+    ("Conductor", "Conductor", 150),
+)
+LISTA_ORDEN_DEFECTO = 2  # por hora de ingreso
+LISTA_INTERVALO_MS = 100
+
+
+class VehicleList(ttk.Frame):
+    """Los vehículos activos en un Treeview que aplica sólo las placas que cambiaron.
+
+    El orden (clic en un encabezado) y el filtro se resuelven en memoria: una lista ordenada
+    de (clave, placa) dice en qué posición va cada fila, así que un ingreso o una salida
+    cuesta un bisect y una operación sobre el Treeview, sin importar cuántos autos haya.
+    Como en el mapa de espacios, los cambios llegan a una cola que vacía el hilo de Tk.
+    """
+    def __init__(self, padre, activos, filas=10):
+        super().__init__(padre)
+        self.activos = activos
+        self.filas = {}  # placa -> fila, todas las activas
+        self.orden = []  # (clave, placa) de las que pasan el filtro, siempre ascendente
+        self.columna = LISTA_ORDEN_DEFECTO
+        self.descendente = False
+        self.filtro = ""
+        self.pendientes = queue.Queue()
+        self.vaciado = None
+
+        barra = ttk.Frame(self)
+        barra.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(barra, text="Buscar:").pack(side=tk.LEFT, padx=(0, 5))
+        self.var_filtro = tk.StringVar()
+        ttk.Entry(barra, textvariable=self.var_filtro, width=20).pack(side=tk.LEFT)
+        self.var_filtro.trace_add("write", lambda *args: self.filtrar(self.var_filtro.get()))
+        self.label_total = ttk.Label(barra)
+        self.label_total.pack(side=tk.RIGHT)
+
+        frame_tabla = ttk.Frame(self)
+        frame_tabla.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(
+            frame_tabla, columns=[columna[0] for columna in LISTA_COLUMNAS], show="headings", height=filas
+        )
+        scrollbar = ttk.Scrollbar(frame_tabla, orient=tk.VERTICAL, command=self.tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        for i, (nombre, _, ancho) in enumerate(LISTA_COLUMNAS):
+            self.tree.heading(nombre, command=lambda i=i: self.ordenar(i))
+            self.tree.column(nombre, width=ancho)
+        self._titular()
+        self.bind("<Destroy>", self._al_destruir)
+
+        self.activos.observar(self._al_cambiar)
+        self.recargar()
+        self.vaciado = self.after(LISTA_INTERVALO_MS, self._vaciar)
+
+    def _al_cambiar(self, cambios):
+        # Cualquier hilo, con el lock de escritura tomado: sólo se encola
+        self.pendientes.put(cambios)
+
+    def _tomar_pendientes(self):
+        cambios = {}
+        while True:
+            try:
+                # Cada cambio trae la fila completa: de varios sobre la misma placa vale el último
+                cambios.update(self.pendientes.get_nowait())
+            except queue.Empty:
+                return cambios
+
+    def _vaciar(self):
+        """Corre en el hilo de Tk: aplica juntos los cambios acumulados"""
+        self.vaciado = None
+        cambios = self._tomar_pendientes()
+        if cambios:
+            self.aplicar(cambios)
+        self.vaciado = self.after(LISTA_INTERVALO_MS, self._vaciar)
+
+    def _clave(self, fila):
+        valor = fila[self.columna]
+        # Los None van al final sin compararse con valores de otro tipo
+        return (valor is None, "" if valor is None else valor, fila[0])
+
+    def _coincide(self, fila):
+        return not self.filtro or any(self.filtro in str(valor).upper() for valor in fila if valor is not None)
+
+    def _valores(self, fila):
+        return ["" if valor is None else valor for valor in fila]
+
+    def aplicar(self, cambios):
+        """{placa: fila o None}: sólo se tocan esas filas del Treeview"""
+        for placa, fila in cambios.items():
+            anterior = self.filas.pop(placa, None)
+            if anterior is not None and self._coincide(anterior):
+                self._quitar(placa, anterior)
+            if fila is not None:
+                self.filas[placa] = fila
+                if self._coincide(fila):
+                    self._insertar(placa, fila)
+        self._contar()
+
+    def _insertar(self, placa, fila):
+        entrada = (self._clave(fila), placa)
+        i = bisect.bisect_left(self.orden, entrada)
+        self.orden.insert(i, entrada)
+        # orden es ascendente; en descendente la posición en pantalla es la simétrica
+        posicion = len(self.orden) - 1 - i if self.descendente else i
+        self.tree.insert("", posicion, iid=placa, values=self._valores(fila))
+
+    def _quitar(self, placa, fila):
+        entrada = (self._clave(fila), placa)
+        i = bisect.bisect_left(self.orden, entrada)
+        if i < len(self.orden) and self.orden[i] == entrada:
+            del self.orden[i]
+        if self.tree.exists(placa):
+            self.tree.delete(placa)
+
+    def _contar(self):
+        total = len(self.filas)
+        visibles = len(self.orden)
+        self.label_total.configure(
+            text=f"{total} vehículos" if visibles == total else f"{visibles} de {total} vehículos"
+        )
+
+    def _titular(self):
+        for i, (nombre, titulo, _) in enumerate(LISTA_COLUMNAS):
+            if i == self.columna:
+                titulo += " ▼" if self.descendente else " ▲"
+            self.tree.heading(nombre, text=titulo)
+
+    def _redibujar(self):
+        """Vuelve a llenar el Treeview: sólo al cambiar el orden o el filtro, o al recargar"""
+        seleccion = self.tree.selection()
+        self.orden = sorted(
+            (self._clave(fila), placa) for placa, fila in self.filas.items() if self._coincide(fila)
+        )
+        self.tree.delete(*self.tree.get_children())
+        for _, placa in (reversed(self.orden) if self.descendente else self.orden):
+            self.tree.insert("", tk.END, iid=placa, values=self._valores(self.filas[placa]))
+        self.tree.selection_set([placa for placa in seleccion if self.tree.exists(placa)])
+        self._contar()
+
+    def ordenar(self, columna):
+        if columna == self.columna:
+            self.descendente = not self.descendente
+        else:
+            self.columna, self.descendente = columna, False
+        self._titular()
+        self._redibujar()
+
+    def filtrar(self, texto):
+        self.filtro = texto.strip().upper()
+        self._redibujar()
+
+    def recargar(self):
+        """Toma todos los vehículos del modelo (al inicio)"""
+        # La foto ya incluye lo que haya en la cola
+        self._tomar_pendientes()
+        self.filas = self.activos.vehiculos()
+        self._redibujar()
+
+    def _al_destruir(self, event):
+        if event.widget is not self:
+            return
+        self.activos.dejar_de_observar(self._al_cambiar)
+        if self.vaciado is not None:
+            self.after_cancel(self.vaciado)
+            self.vaciado = None
@@ -0,0 +1,194 @@
+import math
+import queue
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+# ******************** MAPA DE ESPACIOS ********************
+COLOR_LIBRE = "#4CAF50"
+COLOR_OCUPADO = "#FF6B6B"
+MAPA_CELDA = 36  # lado de un espacio en píxeles con zoom 1
+MAPA_SEPARACION = 4
+MAPA_TITULO = 26  # alto del título de cada nivel con zoom 1
+MAPA_COLUMNAS_MIN = 10
+MAPA_LETRA = 9  # tamaño del número de espacio con zoom 1
+MAPA_LETRA_MIN = 6  # con letra más chica los números no se leen y se ocultan
+MAPA_ZOOM_MIN = 0.2
+MAPA_ZOOM_MAX = 3.0
+MAPA_ZOOM_PASO = 1.25
+MAPA_INTERVALO_MS = 100
+TODOS_LOS_NIVELES = "Todos"
+
+
+class SpaceMap(ttk.Frame):
+    """Los espacios dibujados en un Canvas, un bloque por zona (nivel), con zoom.
+
+    Los rectángulos se crean una sola vez y después sólo se recolorean los espacios que
+    cambiaron: el mapa observa el índice de ocupación en lugar de releer la tabla espacios.
+    Las notificaciones llegan desde cualquier hilo a una cola que el hilo de Tk vacía cada
+    MAPA_INTERVALO_MS, así que varios cambios seguidos del mismo espacio se pintan una vez.
+    """
+    def __init__(self, padre, ocupacion):
+        super().__init__(padre)
+        self.ocupacion = ocupacion
+        self.zoom = 1.0
+        self.rectangulos = {}  # id de espacio -> rectángulo en el Canvas
+        self.pintado = {}  # id de espacio -> ocupado, tal como se ve
+        self.zona_de = {}
+        self.titulos = {}  # zona -> [texto del título, libres, total]
+        self.pendientes = queue.Queue()
+        self.vaciado = None
+        self.letra = tkfont.Font(root=self, family="Arial", size=MAPA_LETRA)
+        self.letra_titulo = tkfont.Font(root=self, family="Arial", size=MAPA_LETRA + 2, weight="bold")
+
+        barra = ttk.Frame(self)
+        barra.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(barra, text="Nivel:").pack(side=tk.LEFT, padx=(0, 5))
+        self.combo_nivel = ttk.Combobox(barra, width=12, state="readonly", values=(TODOS_LOS_NIVELES,))
+        self.combo_nivel.set(TODOS_LOS_NIVELES)
+        self.combo_nivel.pack(side=tk.LEFT)
+        self.combo_nivel.bind("<<ComboboxSelected>>", lambda e: self.reconstruir())
+        ttk.Button(barra, text="+", width=3, command=lambda: self.acercar(MAPA_ZOOM_PASO)).pack(side=tk.RIGHT)
+        ttk.Button(barra, text="-", width=3, command=lambda: self.acercar(1 / MAPA_ZOOM_PASO)).pack(side=tk.RIGHT, padx=5)
+
+        frame_canvas = ttk.Frame(self)
+        frame_canvas.pack(fill=tk.BOTH, expand=True)
+        frame_canvas.rowconfigure(0, weight=1)
+        frame_canvas.columnconfigure(0, weight=1)
+        self.canvas = tk.Canvas(frame_canvas, background="white", highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        barra_y = ttk.Scrollbar(frame_canvas, orient=tk.VERTICAL, command=self.canvas.yview)
+        barra_y.grid(row=0, column=1, sticky="ns")
+        barra_x = ttk.Scrollbar(frame_canvas, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        barra_x.grid(row=1, column=0, sticky="ew")
+        self.canvas.configure(yscrollcommand=barra_y.set, xscrollcommand=barra_x.set)
+
+        # Rueda: desplaza; con Ctrl: zoom
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, tk.UNITS))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, tk.UNITS))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, tk.UNITS))
+        self.canvas.bind("<Control-MouseWheel>", lambda e: self.acercar(MAPA_ZOOM_PASO if e.delta > 0 else 1 / MAPA_ZOOM_PASO))
+        self.canvas.bind("<Control-Button-4>", lambda e: self.acercar(MAPA_ZOOM_PASO))
+        self.canvas.bind("<Control-Button-5>", lambda e: self.acercar(1 / MAPA_ZOOM_PASO))
+        self.bind("<Destroy>", self._al_destruir)
+
+        self.ocupacion.observar(self._al_cambiar)
+        self.reconstruir()
+        self.vaciado = self.after(MAPA_INTERVALO_MS, self._vaciar)
+
+    def _al_cambiar(self, ids, estructura):
+        # Cualquier hilo, con el lock de escritura tomado: sólo se encola
+        self.pendientes.put((ids, estructura))
+
+    def _tomar_pendientes(self):
+        ids, estructura = set(), False
+        while True:
+            try:
+                cambiados, cambio_estructura = self.pendientes.get_nowait()
+            except queue.Empty:
+                return ids, estructura
+            ids |= cambiados
+            estructura = estructura or cambio_estructura
+
+    def _vaciar(self):
+        """Corre en el hilo de Tk: aplica juntos los cambios acumulados"""
+        self.vaciado = None
+        ids, estructura = self._tomar_pendientes()
+        if estructura:
+            self.reconstruir()
+        elif ids:
+            self.recolorear(ids)
+        self.vaciado = self.after(MAPA_INTERVALO_MS, self._vaciar)
+
+    def recolorear(self, ids):
+        """Pinta los espacios pedidos según el índice; devuelve cuántos cambiaron de color"""
+        cambiados = 0
+        niveles = set()
+        for espacio_id, ocupado in self.ocupacion.estados(ids).items():
+            rectangulo = self.rectangulos.get(espacio_id)
+            if rectangulo is None or self.pintado.get(espacio_id) == ocupado:
+                continue
+            self.canvas.itemconfigure(rectangulo, fill=COLOR_OCUPADO if ocupado else COLOR_LIBRE)
+            self.pintado[espacio_id] = ocupado
+            cambiados += 1
+            titulo = self.titulos.get(self.zona_de[espacio_id])
+            if titulo is not None:
+                titulo[1] += -1 if ocupado else 1
+                niveles.add(self.zona_de[espacio_id])
+        for zona in niveles:
+            self._titular(zona)
+        return cambiados
+
+    def _titular(self, zona):
+        texto, libres, total = self.titulos[zona]
+        self.canvas.itemconfigure(texto, text=f"Nivel {zona}: {libres}/{total} libres")
+
+    def reconstruir(self):
+        """Dibuja todo desde una foto del índice: al inicio, al cambiar de nivel o si cambian los espacios"""
+        # La foto ya incluye lo que haya en la cola
+        self._tomar_pendientes()
+        espacios = self.ocupacion.espacios()
+        niveles = sorted({zona for _, _, zona, _ in espacios})
+        self.combo_nivel.configure(values=(TODOS_LOS_NIVELES,) + tuple(niveles))
+        if self.combo_nivel.get() not in niveles:
+            self.combo_nivel.set(TODOS_LOS_NIVELES)
+        nivel = self.combo_nivel.get()
+        visibles = niveles if nivel == TODOS_LOS_NIVELES else [nivel]
+
+        self.canvas.delete("all")
+        self.rectangulos = {}
+        self.pintado = {}
+        self.zona_de = {}
+        self.titulos = {}
+        paso = MAPA_CELDA + MAPA_SEPARACION
+        y = MAPA_SEPARACION
+        for zona in visibles:
+            de_la_zona = [espacio for espacio in espacios if espacio[2] == zona]
+            if len(niveles) > 1:
+                texto = self.canvas.create_text(MAPA_SEPARACION, y, anchor=tk.NW, font=self.letra_titulo)
+                libres = sum(1 for espacio in de_la_zona if not espacio[3])
+                self.titulos[zona] = [texto, libres, len(de_la_zona)]
+                self._titular(zona)
+                y += MAPA_TITULO
+            columnas = max(MAPA_COLUMNAS_MIN, math.ceil(math.sqrt(len(de_la_zona))))
+            for i, (espacio_id, numero, _, ocupado) in enumerate(de_la_zona):
+                fila, columna = divmod(i, columnas)
+                x0 = MAPA_SEPARACION + columna * paso
+                y0 = y + fila * paso
+                self.rectangulos[espacio_id] = self.canvas.create_rectangle(
+                    x0, y0, x0 + MAPA_CELDA, y0 + MAPA_CELDA, outline="#555555",
+                    fill=COLOR_OCUPADO if ocupado else COLOR_LIBRE
+                )
+                self.canvas.create_text(
+                    x0 + MAPA_CELDA / 2, y0 + MAPA_CELDA / 2, text=str(numero), font=self.letra, tags=("numero",)
+                )
+                self.pintado[espacio_id] = ocupado
+                self.zona_de[espacio_id] = zona
+            y += math.ceil(len(de_la_zona) / columnas) * paso + MAPA_TITULO / 2
+        if self.zoom != 1.0:
+            self.canvas.scale("all", 0, 0, self.zoom, self.zoom)
+        self._ajustar_letra()
+
+    def acercar(self, factor):
+        zoom = min(max(self.zoom * factor, MAPA_ZOOM_MIN), MAPA_ZOOM_MAX)
+        if zoom == self.zoom:
+            return
+        # scale mueve y agranda los ítems existentes; las letras siguen a sus fuentes
+        self.canvas.scale("all", 0, 0, zoom / self.zoom, zoom / self.zoom)
+        self.zoom = zoom
+        self._ajustar_letra()
+
+    def _ajustar_letra(self):
+        tamano = round(MAPA_LETRA * self.zoom)
+        self.letra.configure(size=max(tamano, 1))
+        self.letra_titulo.configure(size=max(round((MAPA_LETRA + 2) * self.zoom), MAPA_LETRA_MIN))
+        self.canvas.itemconfigure("numero", state=tk.HIDDEN if tamano < MAPA_LETRA_MIN else tk.NORMAL)
+        self.canvas.configure(scrollregion=self.canvas.bbox("all") or (0, 0, 0, 0))
+
+    def _al_destruir(self, event):
+        if event.widget is not self:
+            return
+        self.ocupacion.dejar_de_observar(self._al_cambiar)
+        if self.vaciado is not None:
+            self.after_cancel(self.vaciado)
+            self.vaciado = None
@@ -0,0 +1,119 @@
+import logging
+import time
+import tkinter as tk
+from tkinter import ttk
+
+# ******************** PANEL DE ESTADO ********************
+PANEL_REFRESCOS_DEFECTO = 2  # redibujos por segundo como máximo
+PANEL_MAXIMO_S = 30  # se redibuja aunque nada cambie: las tasas por minuto corren con el reloj
+PANEL_VENTANA_MIN = 15  # minutos sobre los que se promedian entradas y salidas por minuto
+
+
+class RefreshScheduler:
+    """Junta los avisos de cambio y redibuja a lo sumo `por_segundo` veces por segundo.
+
+    avisar() sólo marca que hay algo nuevo, desde cualquier hilo. En cada vuelta (en el hilo
+    de Tk) se redibuja si hubo avisos o si version() devolvió otro valor; si no, la vuelta
+    no lee la base ni toca los widgets. Diez avisos entre dos vueltas son un solo redibujo.
+    """
+    def __init__(self, widget, redibujar, version=None, por_segundo=PANEL_REFRESCOS_DEFECTO,
+                 maximo_s=PANEL_MAXIMO_S):
+        self.widget = widget
+        self.redibujar = redibujar
+        self.version = version
+        self.intervalo_ms = max(int(1000 / por_segundo), 1)
+        self.maximo_s = maximo_s
+        self.sucio = True
+        self.ultima_version = None
+        self.ultimo = 0.0
+        self.redibujos = 0
+        self.vuelta = widget.after(self.intervalo_ms, self._vuelta)
+
+    def avisar(self, *args):
+        # Asignar un bool es atómico: no hace falta lock ni cola
+        self.sucio = True
+
+    def _vuelta(self):
+        self.vuelta = None
+        try:
+            if self.version is not None:
+                version = self.version()
+                if version != self.ultima_version:
+                    self.ultima_version = version
+                    self.sucio = True
+            if self.sucio or time.monotonic() - self.ultimo >= self.maximo_s:
+                # Antes de redibujar: un aviso que llegue mientras tanto no se pierde
+                self.sucio = False
+                self.ultimo = time.monotonic()
+                self.redibujos += 1
+                self.redibujar()
+        except Exception as e:
+            logging.error(f"Error al actualizar el panel de estado: {e}")
+        self.vuelta = self.widget.after(self.intervalo_ms, self._vuelta)
+
+    def detener(self):
+        if self.vuelta is not None:
+            self.widget.after_cancel(self.vuelta)
+            self.vuelta = None
+
+
+class StatusPanel(ttk.Frame):
+    """Ocupación, entradas y salidas por minuto, lo de hoy y los pendientes de sincronizar.
+
+    No escucha a nadie en particular: cualquier commit en la base, de esta app, del hilo de
+    sincronización, de la replicación o de otro programa, cambia PRAGMA data_version en la
+    conexión de lectura, y eso es lo único que mira cada vuelta mientras no pasa nada.
+    al_mostrar(estado) recibe la misma foto, para la barra de estado.
+    """
+    def __init__(self, padre, db, por_segundo=PANEL_REFRESCOS_DEFECTO, al_mostrar=None):
+        super().__init__(padre, padding=(5, 2))
+        self.db = db
+        self.al_mostrar = al_mostrar
+
+        self.lbl_ocupacion = ttk.Label(self, width=24)
+        self.lbl_ocupacion.pack(side=tk.LEFT)
+        self.barra_ocupacion = ttk.Progressbar(self, length=120, mode="determinate")
+        self.barra_ocupacion.pack(side=tk.LEFT, padx=(0, 15))
+        self.lbl_flujo = ttk.Label(self)
+        self.lbl_flujo.pack(side=tk.LEFT, padx=(0, 15))
+        self.lbl_hoy = ttk.Label(self)
+        self.lbl_hoy.pack(side=tk.LEFT, padx=(0, 15))
+        self.lbl_sync = ttk.Label(self)
+        self.lbl_sync.pack(side=tk.LEFT)
+
+        self.programador = RefreshScheduler(self, self.redibujar, self.version, por_segundo)
+        self.bind("<Destroy>", self._al_destruir)
+
+    def avisar(self):
+        """Pide un redibujo; se junta con los demás avisos hasta la próxima vuelta"""
+        self.programador.avisar()
+
+    def version(self):
+        # El modo no pasa por la base: el circuito hacia MySQL se abre o se cierra solo
+        return self.db.version_datos(), self.db.modo_offline()
+
+    def redibujar(self):
+        estado = self.db.estado_panel()
+        total = estado['total']
+        ocupados = total - estado['libres']
+        porcentaje = 100 * ocupados / total if total else 0
+        self.lbl_ocupacion.configure(text=f"Ocupación: {ocupados}/{total} ({porcentaje:.0f}%)")
+        self.barra_ocupacion.configure(maximum=max(total, 1), value=ocupados)
+        self.lbl_flujo.configure(
+            text=f"Por minuto: {estado['entradas_min']:.1f} entradas, {estado['salidas_min']:.1f} salidas "
+                 f"(últimos {PANEL_VENTANA_MIN} min)"
+        )
+        self.lbl_hoy.configure(
+            text=f"Hoy: {estado['ingresos_hoy']} entradas, {estado['egresos_hoy']} salidas, "
+                 f"S/.{estado['cobrado_hoy']:.2f}"
+        )
+        self.lbl_sync.configure(
+            text=f"Pendientes de sincronizar: {estado['pendientes_sync']}",
+            foreground="red" if estado['pendientes_sync'] and estado['offline'] else ""
+        )
+        if self.al_mostrar is not None:
+            self.al_mostrar(estado)
+
+    def _al_destruir(self, event):
+        if event.widget is self:
+            self.programador.detener()
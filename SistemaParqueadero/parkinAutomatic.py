@@ -3,13 +3,14 @@ import pytesseract
 import sqlite3
 from datetime import datetime
 import tkinter as tk
-from tkinter import messagebox, ttk
-from PIL import Image, ImageTk
-import os
+from tkinter import messagebox
 import logging
 import configparser
-import threading
-import numpy as np
+from contextlib import closing
+from reconocimientoPlacas import PlateRecognizer, crear_ocr_backend
+from servicioCamaras import CameraManager
+from ejecutorTareas import TaskExecutor, TareaRechazada
+from historialVirtual import VirtualHistory, HISTORIAL_BLOQUE, indice_por_bloques
 
 # ******************** CONFIGURACIÓN INICIAL ********************
 # 📝 Configuración de logs
@@ -27,13 +28,21 @@ TESSERACT_PATH = config.get('Settings', 'tesseract_path',
                           fallback=r'C:\Program Files\Tesseract-OCR\tesseract.exe')
 TARIFA_POR_HORA = config.getfloat('Settings', 'tarifa_por_hora', fallback=2.0)
 TIEMPO_APERTURA_PUERTA = config.getint('Settings', 'tiempo_apertura_puerta', fallback=3000)
+OCR_BACKEND = config.get('Settings', 'ocr_backend', fallback='auto')
+CAMARA_FUENTE = config.get('Settings', 'camara', fallback='0')
 
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+PlateRecognizer.set_ocr_backend(crear_ocr_backend(OCR_BACKEND, TESSERACT_PATH))
+
+# 📷 La cámara queda abierta entre vehículos en lugar de abrirse en cada captura
+camaras = CameraManager({'principal': CAMARA_FUENTE})
+camaras.precalentar()
 
 # ******************** BASE DE DATOS ********************
 class DatabaseManager:
-    def __init__(self):
-        self.conn = sqlite3.connect("estacionamiento.db", check_same_thread=False)
+    def __init__(self, ruta="estacionamiento.db"):
+        self.ruta = ruta
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
         self.cursor = self.conn.cursor()
         self._initialize_db()
         
@@ -49,8 +58,82 @@ class DatabaseManager:
         ''')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_placa ON movimientos(placa)')
         self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_hora_salida ON movimientos(hora_salida)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_hora_entrada ON movimientos(hora_entrada)')
+        
+        # Vehículos y cobrado por día de entrada; se actualiza con cada salida
+        nuevo = not self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumen_diario'"
+        ).fetchone()
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumen_diario (
+                fecha TEXT PRIMARY KEY,
+                vehiculos INTEGER NOT NULL DEFAULT 0,
+                ingresos REAL NOT NULL DEFAULT 0
+            )
+        ''')
         self.conn.commit()
+        if nuevo:
+            self.reconstruir_resumen()
+    
+    def reconstruir_resumen(self):
+        """Rehace resumen_diario desde los movimientos cerrados"""
+        with self.conn:
+            self.conn.execute("DELETE FROM resumen_diario")
+            self.conn.execute(
+                "INSERT INTO resumen_diario (fecha, vehiculos, ingresos) "
+                "SELECT DATE(hora_entrada), COUNT(*), COALESCE(SUM(tarifa), 0) "
+                "FROM movimientos WHERE hora_salida IS NOT NULL GROUP BY DATE(hora_entrada)"
+            )
+    
+    def cerrar_movimiento(self, id_mov, hora_salida, tarifa):
+        """Registra la salida y la suma al resumen del día de entrada en la misma transacción"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE movimientos SET hora_salida=?, tarifa=? WHERE id=?",
+                (hora_salida, tarifa, id_mov)
+            )
+            self.conn.execute(
+                "INSERT INTO resumen_diario (fecha, vehiculos, ingresos) "
+                "SELECT DATE(hora_entrada), 1, ? FROM movimientos WHERE id = ? "
+                "ON CONFLICT(fecha) DO UPDATE SET vehiculos = vehiculos + 1, ingresos = ingresos + excluded.ingresos",
+                (tarifa, id_mov)
+            )
         
+    def _consulta_historial(self, filtros, columnas, despues=None):
+        """(sql, params) de los movimientos filtrados, del más nuevo al más viejo; la clave es (id,)"""
+        condiciones, params = [], []
+        if despues is not None:
+            condiciones.append("id < ?")
+            params.append(despues[0])
+        if filtros.get('placa'):
+            condiciones.append("placa >= ? AND placa < ?")
+            params += [filtros['placa'], filtros['placa'] + '\uffff']
+        if filtros.get('desde'):
+            condiciones.append("hora_entrada >= ?")
+            params.append(f"{filtros['desde']} 00:00:00")
+        if filtros.get('hasta'):
+            condiciones.append("hora_entrada <= ?")
+            params.append(f"{filtros['hasta']} 23:59:59")
+        if filtros.get('estado') == 'activo':
+            condiciones.append("hora_salida IS NULL")
+        elif filtros.get('estado') == 'salido':
+            condiciones.append("hora_salida IS NOT NULL")
+        where = " AND ".join(condiciones) or "1"
+        return f"SELECT {columnas} FROM movimientos WHERE {where} ORDER BY id DESC", params
+    
+    def historial_pagina(self, filtros, despues=None, limite=HISTORIAL_BLOQUE):
+        """Hasta `limite` movimientos (id, placa, entrada, salida, tarifa) después de la clave (id,)"""
+        sql, params = self._consulta_historial(filtros, "id, placa, hora_entrada, hora_salida, tarifa", despues)
+        # Corre en un worker: conexión propia en lugar del cursor compartido
+        with closing(sqlite3.connect(self.ruta)) as conn:
+            return conn.execute(f"{sql} LIMIT ?", params + [limite]).fetchall()
+    
+    def historial_indice(self, filtros, cada=HISTORIAL_BLOQUE, cancelacion=None):
+        """(total, claves de límite de bloque) de los movimientos filtrados"""
+        sql, params = self._consulta_historial(filtros, "id")
+        with closing(sqlite3.connect(self.ruta)) as conn:
+            return indice_por_bloques(conn.execute(sql, params), cada, cancelacion)
+    
     def execute_query(self, query, params=()):
         try:
             self.cursor.execute(query, params)
@@ -62,60 +145,6 @@ class DatabaseManager:
 
 db = DatabaseManager()
 
-# ******************** PROCESAMIENTO DE IMÁGENES ********************
-class PlateRecognizer:
-    @staticmethod
-    def preprocess_image(img):
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5,5), 0)
-        edged = cv2.Canny(blur, 50, 200)
-        return edged
-    
-    @staticmethod
-    def find_plate_contour(edged):
-        contours, _ = cv2.findContours(edged, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
-        
-        for contour in contours:
-            perimeter = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-            if len(approx) == 4:
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = w / h
-                if 2 <= aspect_ratio <= 5:
-                    return approx
-        return None
-    
-    @staticmethod
-    def extract_plate(img, contour):
-        mask = np.zeros(img.shape[:2], np.uint8)
-        cv2.drawContours(mask, [contour], 0, 255, -1)
-        return cv2.bitwise_and(img, img, mask=mask)
-    
-    @staticmethod
-    def read_plate(image_path):
-        try:
-            img = cv2.imread(image_path)
-            edged = PlateRecognizer.preprocess_image(img)
-            plate_contour = PlateRecognizer.find_plate_contour(edged)
-            
-            if plate_contour is not None:
-                plate_img = PlateRecognizer.extract_plate(img, plate_contour)
-                x, y, w, h = cv2.boundingRect(plate_contour)
-                plate_cropped = img[y:y+h, x:x+w]
-            else:
-                plate_cropped = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Procesamiento final para OCR
-            _, thresh = cv2.threshold(plate_cropped, 150, 255, cv2.THRESH_BINARY)
-            return pytesseract.image_to_string(
-                thresh, 
-                config='--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-            ).strip().replace(" ", "").replace("\n", "")
-        except Exception as e:
-            logging.error(f"Error en OCR: {e}")
-            return ""
-
 # ******************** LÓGICA PRINCIPAL ********************
 class ParkingSystem:
     @staticmethod
@@ -128,12 +157,13 @@ class ParkingSystem:
     
     @staticmethod
     def capturar_placa():
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        cap = camaras.suscribir()
+        if not cap.isOpened() and not cap.read()[0]:
+            cap.release()
             logging.error("No se pudo acceder a la cámara")
             return None
             
-        filename = "placa_temp.jpg"
+        frame_capturado = None
         try:
             while True:
                 ret, frame = cap.read()
@@ -142,14 +172,17 @@ class ParkingSystem:
                 cv2.imshow("Captura de Placa", frame)
                 key = cv2.waitKey(1)
                 if key % 256 == 32:  # Tecla ESPACIO
-                    cv2.imwrite(filename, frame)
+                    frame_capturado = frame
                     break
         finally:
             cap.release()
             cv2.destroyAllWindows()
         
-        placa = PlateRecognizer.read_plate(filename)
-        os.remove(filename)
+        if frame_capturado is None:
+            logging.error("No se capturó ninguna imagen de la cámara")
+            return None
+        
+        placa = PlateRecognizer.read_plate(frame_capturado)
         
         if ParkingSystem.validar_placa(placa):
             return placa
@@ -165,6 +198,8 @@ class ParkingApp(tk.Tk):
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self._create_widgets()
+        # Una sola captura a la vez: entrada y salida comparten la cámara y la ventana de vista previa
+        self.tareas = TaskExecutor(self, max_workers=2, on_estado=self.mostrar_tareas)
     
     def _create_widgets(self):
         frame = tk.Frame(self, padx=20, pady=20)
@@ -190,101 +225,107 @@ class ParkingApp(tk.Tk):
         self.lbl_puerta.config(text="Puerta: Abierta", fg="green")
         self.after(TIEMPO_APERTURA_PUERTA, lambda: self.lbl_puerta.config(text="Puerta: Cerrada", fg="red"))
     
+    def mostrar_tareas(self, en_curso):
+        if en_curso:
+            self.actualizar_estado(", ".join(en_curso), "blue")
+        else:
+            self.actualizar_estado("Listo", "green")
+    
+    def _enviar_captura(self, descripcion, funcion, al_terminar):
+        try:
+            self.tareas.submit(
+                "captura", funcion,
+                al_terminar=al_terminar,
+                al_fallar=lambda e: messagebox.showerror("Error", str(e)),
+                descripcion=descripcion
+            )
+        except TareaRechazada as e:
+            messagebox.showwarning("En curso", str(e))
+    
     def registrar_entrada(self):
-        self.actualizar_estado("Procesando entrada...", "blue")
-        threading.Thread(target=self._procesar_entrada, daemon=True).start()
+        self._enviar_captura("Procesando entrada...", self._procesar_entrada, self._entrada_procesada)
     
     def _procesar_entrada(self):
-        try:
-            placa = ParkingSystem.capturar_placa()
-            if placa:
-                res = db.execute_query(
-                    "SELECT * FROM movimientos WHERE placa=? AND hora_salida IS NULL",
-                    (placa,)
-                ).fetchone()
-                
-                if res:
-                    self.after(0, lambda: messagebox.showwarning("Duplicado", f"Placa {placa} ya registrada"))
-                else:
-                    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    db.execute_query(
-                        "INSERT INTO movimientos (placa, hora_entrada) VALUES (?, ?)",
-                        (placa, ahora)
-                    )
-                    self.after(0, lambda: (
-                        self.abrir_puerta(),
-                        messagebox.showinfo("Entrada Registrada", f"Placa: {placa}\nHora: {ahora}")
-                    ))
-        except Exception as e:
-            logging.error(f"Error en entrada: {e}")
-            self.after(0, lambda: messagebox.showerror("Error", str(e)))
-        finally:
-            self.after(0, lambda: self.actualizar_estado("Listo", "green"))
+        placa = ParkingSystem.capturar_placa()
+        if not placa:
+            return None
+        res = db.execute_query(
+            "SELECT * FROM movimientos WHERE placa=? AND hora_salida IS NULL",
+            (placa,)
+        ).fetchone()
+        if res:
+            return placa, None
+        
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        db.execute_query(
+            "INSERT INTO movimientos (placa, hora_entrada) VALUES (?, ?)",
+            (placa, ahora)
+        )
+        return placa, ahora
+    
+    def _entrada_procesada(self, resultado):
+        if resultado is None:
+            return
+        placa, ahora = resultado
+        if ahora is None:
+            messagebox.showwarning("Duplicado", f"Placa {placa} ya registrada")
+            return
+        self.abrir_puerta()
+        messagebox.showinfo("Entrada Registrada", f"Placa: {placa}\nHora: {ahora}")
     
     def registrar_salida(self):
-        self.actualizar_estado("Procesando salida...", "blue")
-        threading.Thread(target=self._procesar_salida, daemon=True).start()
+        self._enviar_captura("Procesando salida...", self._procesar_salida, self._salida_procesada)
     
     def _procesar_salida(self):
-        try:
-            placa = ParkingSystem.capturar_placa()
-            if placa:
-                res = db.execute_query(
-                    "SELECT id, hora_entrada FROM movimientos WHERE placa=? AND hora_salida IS NULL",
-                    (placa,)
-                ).fetchone()
-                
-                if res:
-                    id_mov, hora_entrada = res
-                    entrada_dt = datetime.strptime(hora_entrada, "%Y-%m-%d %H:%M:%S")
-                    salida_dt = datetime.now()
-                    duracion = (salida_dt - entrada_dt).total_seconds() / 60
-                    tarifa = ParkingSystem.calcular_tarifa(duracion)
-                    
-                    db.execute_query(
-                        "UPDATE movimientos SET hora_salida=?, tarifa=? WHERE id=?",
-                        (salida_dt.strftime("%Y-%m-%d %H:%M:%S"), tarifa, id_mov)
-                    )
-                    self.after(0, lambda: (
-                        self.abrir_puerta(),
-                        messagebox.showinfo("Salida Registrada",
-                            f"Placa: {placa}\nTiempo: {int(duracion)} min\nTarifa: S/. {tarifa}")
-                    ))
-                else:
-                    self.after(0, lambda: messagebox.showwarning("Error", "Placa no encontrada"))
-        except Exception as e:
-            logging.error(f"Error en salida: {e}")
-            self.after(0, lambda: messagebox.showerror("Error", str(e)))
-        finally:
-            self.after(0, lambda: self.actualizar_estado("Listo", "green"))
+        placa = ParkingSystem.capturar_placa()
+        if not placa:
+            return None
+        res = db.execute_query(
+            "SELECT id, hora_entrada FROM movimientos WHERE placa=? AND hora_salida IS NULL",
+            (placa,)
+        ).fetchone()
+        if not res:
+            return placa, None, None
+        
+        id_mov, hora_entrada = res
+        entrada_dt = datetime.strptime(hora_entrada, "%Y-%m-%d %H:%M:%S")
+        salida_dt = datetime.now()
+        duracion = (salida_dt - entrada_dt).total_seconds() / 60
+        tarifa = ParkingSystem.calcular_tarifa(duracion)
+        
+        db.cerrar_movimiento(id_mov, salida_dt.strftime("%Y-%m-%d %H:%M:%S"), tarifa)
+        return placa, duracion, tarifa
+    
+    def _salida_procesada(self, resultado):
+        if resultado is None:
+            return
+        placa, duracion, tarifa = resultado
+        if duracion is None:
+            messagebox.showwarning("Error", "Placa no encontrada")
+            return
+        self.abrir_puerta()
+        messagebox.showinfo("Salida Registrada",
+            f"Placa: {placa}\nTiempo: {int(duracion)} min\nTarifa: S/. {tarifa}")
     
     def ver_historial(self):
-        try:
-            res = db.execute_query(
-                "SELECT placa, hora_entrada, hora_salida, tarifa FROM movimientos ORDER BY id DESC"
-            ).fetchall()
-            
-            historial = tk.Toplevel(self)
-            historial.title("Historial")
-            tree = ttk.Treeview(historial, columns=("Placa", "Entrada", "Salida", "Tarifa"), show="headings")
-            tree.heading("Placa", text="Placa")
-            tree.heading("Entrada", text="Entrada")
-            tree.heading("Salida", text="Salida")
-            tree.heading("Tarifa", text="Tarifa (S/.)")
-            
-            for row in res:
-                tree.insert("", tk.END, values=row)
-            
-            tree.pack(fill=tk.BOTH, expand=True)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        # Las filas se leen por bloques mientras se desplaza, no todas al abrir
+        historial = tk.Toplevel(self)
+        historial.title("Historial")
+        historial.geometry("650x450")
+        VirtualHistory(
+            historial, self.tareas,
+            columnas=[("Placa", 100), ("Entrada", 150), ("Salida", 150), ("Tarifa (S/.)", 90)],
+            pagina=db.historial_pagina,
+            indice=db.historial_indice,
+            clave=lambda fila: (fila[0],),
+            formatear=lambda fila: (fila[1], fila[2], fila[3] or "", fila[4] if fila[4] is not None else ""),
+            estados=("activo", "salido")
+        ).pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
     def generar_reporte(self):
         try:
             res = db.execute_query(
-                "SELECT DATE(hora_entrada), COUNT(*), SUM(tarifa) "
-                "FROM movimientos WHERE hora_salida IS NOT NULL "
-                "GROUP BY DATE(hora_entrada)"
+                "SELECT fecha, vehiculos, ingresos FROM resumen_diario ORDER BY fecha"
             ).fetchall()
             
             reporte = tk.Toplevel(self)
@@ -299,6 +340,10 @@ class ParkingApp(tk.Tk):
             messagebox.showerror("Error", str(e))
     
     def on_close(self):
+        en_curso = self.tareas.shutdown(wait=True)
+        if en_curso:
+            logging.warning(f"Se cierra con tareas todavía en curso: {', '.join(en_curso)}")
+        camaras.cerrar()
         db.conn.close()
         self.destroy()
 
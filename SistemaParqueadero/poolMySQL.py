@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+
+# ******************** POOL DE CONEXIONES MYSQL ********************
+CLAVES_CONEXION_MYSQL = ('host', 'port', 'user', 'password', 'database')
+
+# Errores que indican que el servidor o la red fallaron; un error de SQL no abre el circuito
+ERRORES_CONEXION = (errors.InterfaceError, errors.OperationalError, errors.PoolError, OSError)
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    """El servidor central falló varias veces seguidas; no se intenta hasta que pase la espera"""
+
+
+class PoolAgotado(Exception):
+    """Todas las conexiones están en uso y ninguna se liberó a tiempo"""
+
+
+class MySQLPool:
+    """Conexiones persistentes al servidor central, con un máximo de abiertas a la vez.
+
+    Las conexiones que estuvieron ociosas más de `ping_intervalo` se verifican antes de
+    entregarse. Después de `fallos_circuito` errores de conexión seguidos el circuito se
+    abre: las llamadas fallan de inmediato (la app trabaja offline) y recién después de la
+    espera, que se duplica en cada intento fallido hasta `reintento_max`, se prueba con una
+    sola conexión. `conectar` permite usar un stub en lugar de mysql.connector.
+    """
+    def __init__(self, parametros, tamano=4, timeout_espera=5.0, fallos_circuito=3,
+                 reintento_base=1.0, reintento_max=60.0, ping_intervalo=30.0,
+                 conectar=None, on_estado=None):
+        self.parametros = {k: v for k, v in parametros.items() if k in CLAVES_CONEXION_MYSQL and v != ''}
+        if 'password' in parametros:
+            self.parametros['password'] = parametros['password']
+        if 'port' in self.parametros:
+            self.parametros['port'] = int(self.parametros['port'])
+        self.tamano = tamano
+        self.timeout_espera = timeout_espera
+        self.fallos_circuito = fallos_circuito
+        self.reintento_base = reintento_base
+        self.reintento_max = reintento_max
+        self.ping_intervalo = ping_intervalo
+        self.conectar = conectar or self._conectar_mysql
+        self.on_estado = on_estado
+
+        self.lock = threading.Lock()
+        self.cupos = threading.BoundedSemaphore(tamano)
+        self.ociosas = deque()
+        self.abiertas = 0
+        self.estado = CERRADO
+        self.fallos = 0
+        self.espera = reintento_base
+        self.proximo_intento = 0.0
+        self.cerrado = False
+
+    def _conectar_mysql(self):
+        return mysql.connector.connect(connection_timeout=int(self.timeout_espera), **self.parametros)
+
+    # ---- Circuito ----
+    def disponible(self):
+        """False mientras el circuito está abierto y no toca reintentar"""
+        with self.lock:
+            return self.estado != ABIERTO or time.time() >= self.proximo_intento
+
+    def _permitir(self):
+        with self.lock:
+            if self.cerrado:
+                raise CircuitoAbierto("El pool de MySQL está cerrado")
+            if self.estado == CERRADO:
+                return
+            if self.estado == ABIERTO and time.time() >= self.proximo_intento:
+                # Una sola llamada de prueba; las demás siguen fallando rápido hasta que se resuelva
+                self.estado = SEMIABIERTO
+                cambio = SEMIABIERTO
+            else:
+                restante = max(self.proximo_intento - time.time(), 0)
+                raise CircuitoAbierto(f"Servidor MySQL no disponible, próximo intento en {restante:.0f}s")
+        self._notificar(cambio)
+
+    def _registrar_exito(self):
+        with self.lock:
+            self.fallos = 0
+            self.espera = self.reintento_base
+            cambio = self.estado != CERRADO
+            self.estado = CERRADO
+        if cambio:
+            logging.info("Conexión con MySQL restablecida")
+            self._notificar(CERRADO)
+
+    def _registrar_fallo(self, error):
+        with self.lock:
+            self.fallos += 1
+            if self.estado == SEMIABIERTO or self.fallos >= self.fallos_circuito:
+                abierto_antes = self.estado == ABIERTO
+                self.estado = ABIERTO
+                self.proximo_intento = time.time() + self.espera
+                espera = self.espera
+                self.espera = min(self.espera * 2, self.reintento_max)
+            else:
+                return
+        logging.error(f"MySQL no disponible ({error}), reintento en {espera:.1f}s")
+        if not abierto_antes:
+            self._notificar(ABIERTO)
+
+    def _notificar(self, estado):
+        if self.on_estado is None:
+            return
+        try:
+            self.on_estado(estado)
+        except Exception as e:
+            logging.error(f"Error al notificar el estado de MySQL: {e}")
+
+    # ---- Conexiones ----
+    def _sana(self, conn, ociosa_desde):
+        if time.time() - ociosa_desde < self.ping_intervalo:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _cerrar_conexion(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _obtener(self):
+        while True:
+            with self.lock:
+                if not self.ociosas:
+                    self.abiertas += 1
+                    break
+                conn, ociosa_desde = self.ociosas.pop()
+            if self._sana(conn, ociosa_desde):
+                return conn
+            with self.lock:
+                self.abiertas -= 1
+            self._cerrar_conexion(conn)
+        try:
+            return self.conectar()
+        except Exception:
+            with self.lock:
+                self.abiertas -= 1
+            raise
+
+    def _devolver(self, conn):
+        with self.lock:
+            if not self.cerrado:
+                self.ociosas.append((conn, time.time()))
+                return
+            self.abiertas -= 1
+        self._cerrar_conexion(conn)
+
+    def _descartar(self, conn):
+        with self.lock:
+            self.abiertas -= 1
+        self._cerrar_conexion(conn)
+
+    @contextmanager
+    def conexion(self):
+        """Una conexión del pool; hace rollback si el bloque falla y la descarta si se cayó"""
+        if not self.disponible():
+            self._permitir()
+        if not self.cupos.acquire(timeout=self.timeout_espera):
+            raise PoolAgotado(f"No se liberó ninguna de las {self.tamano} conexiones MySQL a tiempo")
+        conn = None
+        try:
+            # Ya con el cupo: si ésta es la llamada de prueba, siempre termina en éxito o fallo
+            self._permitir()
+            try:
+                conn = self._obtener()
+            except Exception as e:
+                # Sin conexión (red, credenciales, servidor caído) no hay nada que hacer en línea
+                self._registrar_fallo(e)
+                raise
+            try:
+                yield conn
+            except ERRORES_CONEXION as e:
+                self._descartar(conn)
+                conn = None
+                self._registrar_fallo(e)
+                raise
+            except BaseException:
+                # Un error de SQL: el servidor respondió, así que la conexión sigue sirviendo
+                self._registrar_exito()
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._descartar(conn)
+                    conn = None
+                raise
+            self._registrar_exito()
+        finally:
+            if conn is not None:
+                self._devolver(conn)
+            self.cupos.release()
+
+    def estadisticas(self):
+        with self.lock:
+            return {
+                "estado": self.estado,
+                "abiertas": self.abiertas,
+                "ociosas": len(self.ociosas),
+                "fallos": self.fallos,
+                "proximo_intento": max(self.proximo_intento - time.time(), 0) if self.estado == ABIERTO else 0,
+            }
+
+    def cerrar(self):
+        with self.lock:
+            self.cerrado = True
+            ociosas = list(self.ociosas)
+            self.ociosas.clear()
+            self.abiertas -= len(ociosas)
+        for conn, _ in ociosas:
+            self._cerrar_conexion(conn)
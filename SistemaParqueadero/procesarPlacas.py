@@ -0,0 +1,194 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+
+from reconocimientoPlacas import PlateRecognizer, OCR_BACKENDS, crear_ocr_backend
+
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+CAMPOS = ["imagen", "placa", "bbox", "ms", "error"]
+
+# ******************** ENTRADAS Y SALIDAS ********************
+def listar_imagenes(entradas, recursivo=False):
+    """Expande carpetas y patrones glob en una lista ordenada de imágenes"""
+    rutas = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            patron = os.path.join(entrada, "**", "*") if recursivo else os.path.join(entrada, "*")
+            candidatos = glob.glob(patron, recursive=recursivo)
+        else:
+            candidatos = glob.glob(entrada, recursive=recursivo)
+        rutas.update(
+            os.path.abspath(ruta) for ruta in candidatos
+            if os.path.isfile(ruta) and ruta.lower().endswith(EXTENSIONES)
+        )
+    return sorted(rutas)
+
+def formato_salida(archivo, formato=None):
+    if formato:
+        return formato
+    return "jsonl" if archivo.lower().endswith((".jsonl", ".json")) else "csv"
+
+def leer_procesadas(archivo, formato):
+    """Imágenes ya presentes en un archivo de resultados previo (para reanudar)"""
+    if not os.path.exists(archivo):
+        return set()
+    procesadas = set()
+    with open(archivo, newline="", encoding="utf-8") as f:
+        if formato == "jsonl":
+            for linea in f:
+                try:
+                    procesadas.add(json.loads(linea)["imagen"])
+                except (ValueError, KeyError):
+                    # Línea truncada por una interrupción: esa imagen se vuelve a procesar
+                    continue
+        else:
+            for fila in csv.DictReader(f):
+                if fila.get("imagen") and fila.get("ms"):
+                    procesadas.add(fila["imagen"])
+    return procesadas
+
+def recortar_linea_incompleta(archivo):
+    """Quita la última línea si quedó sin salto de línea por una interrupción.
+
+    Sin esto la primera fila que se agrega al reanudar se pega a la línea truncada.
+    """
+    if not os.path.exists(archivo):
+        return
+    with open(archivo, "r+b") as f:
+        fin = f.seek(0, os.SEEK_END)
+        if fin == 0:
+            return
+        f.seek(fin - 1)
+        if f.read(1) == b"\n":
+            return
+        pos = fin
+        while pos > 0:
+            bloque = min(4096, pos)
+            f.seek(pos - bloque)
+            i = f.read(bloque).rfind(b"\n")
+            if i >= 0:
+                f.truncate(pos - bloque + i + 1)
+                return
+            pos -= bloque
+        f.truncate(0)
+
+class EscritorResultados:
+    def __init__(self, archivo, formato):
+        nuevo = not os.path.exists(archivo) or os.path.getsize(archivo) == 0
+        self.formato = formato
+        self.archivo = open(archivo, "a", newline="", encoding="utf-8")
+        if formato == "csv":
+            self.writer = csv.DictWriter(self.archivo, fieldnames=CAMPOS)
+            if nuevo:
+                self.writer.writeheader()
+
+    def escribir(self, resultado):
+        if self.formato == "jsonl":
+            self.archivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        else:
+            fila = dict(resultado)
+            fila["bbox"] = " ".join(map(str, fila["bbox"])) if fila["bbox"] else ""
+            self.writer.writerow(fila)
+        # Cada resultado queda en disco para poder reanudar tras una interrupción
+        self.archivo.flush()
+
+    def cerrar(self):
+        self.archivo.close()
+
+# ******************** WORKERS ********************
+def iniciar_worker(nombre_backend, tesseract_path):
+    PlateRecognizer.set_ocr_backend(crear_ocr_backend(nombre_backend, tesseract_path))
+
+def procesar_imagen(ruta):
+    inicio = time.perf_counter()
+    placa, bbox, error = "", None, ""
+    try:
+        img = cv2.imread(ruta)
+        if img is None:
+            error = "no se pudo leer la imagen"
+        else:
+            recorte, bbox = PlateRecognizer.locate_plate(img)
+            placa = PlateRecognizer.ocr_plate(recorte)
+    except Exception as e:
+        error = str(e)
+    return {
+        "imagen": ruta,
+        "placa": placa,
+        "bbox": list(bbox) if bbox else None,
+        "ms": round((time.perf_counter() - inicio) * 1000, 2),
+        "error": error,
+    }
+
+# ******************** PROGRAMA PRINCIPAL ********************
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconoce placas de carpetas de imágenes usando todos los núcleos de la CPU"
+    )
+    parser.add_argument("entradas", nargs="+", help="Carpetas o patrones glob (ej. 'capturas/*.jpg')")
+    parser.add_argument("-o", "--salida", default="resultados_placas.csv", help="Archivo .csv o .jsonl")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("-r", "--recursivo", action="store_true", help="Recorre subcarpetas")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-c", "--chunksize", type=int, default=8, help="Imágenes por tarea enviada a cada worker")
+    parser.add_argument("--ocr-backend", default="auto", choices=["auto"] + list(OCR_BACKENDS))
+    parser.add_argument("--tesseract-path", default=None)
+    parser.add_argument("--desde-cero", action="store_true", help="Ignora resultados previos en lugar de reanudar")
+    args = parser.parse_args()
+
+    formato = formato_salida(args.salida, args.formato)
+    if args.desde_cero and os.path.exists(args.salida):
+        os.remove(args.salida)
+
+    imagenes = listar_imagenes(args.entradas, args.recursivo)
+    # Antes de leer: una fila csv a medias puede tener ya la columna ms y contarse como hecha
+    recortar_linea_incompleta(args.salida)
+    procesadas = leer_procesadas(args.salida, formato)
+    pendientes = [ruta for ruta in imagenes if ruta not in procesadas]
+    print(f"{len(imagenes)} imágenes, {len(imagenes) - len(pendientes)} ya procesadas, {len(pendientes)} pendientes")
+    if not pendientes:
+        return 0
+
+    escritor = EscritorResultados(args.salida, formato)
+    inicio = time.perf_counter()
+    hechas = 0
+    leidas = 0
+    pool = multiprocessing.Pool(
+        args.workers, initializer=iniciar_worker, initargs=(args.ocr_backend, args.tesseract_path)
+    )
+    try:
+        for resultado in pool.imap_unordered(procesar_imagen, pendientes, chunksize=args.chunksize):
+            escritor.escribir(resultado)
+            hechas += 1
+            leidas += bool(resultado["placa"])
+            if hechas % 100 == 0 or hechas == len(pendientes):
+                transcurrido = time.perf_counter() - inicio
+                print(f"{hechas}/{len(pendientes)} imágenes - {hechas / transcurrido:.1f} img/s")
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        print(f"Interrumpido tras {hechas} imágenes; vuelva a ejecutar el comando para reanudar")
+        return 1
+    except BaseException:
+        # Sin terminate, join espera a que los workers terminen todas las imágenes pendientes
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        escritor.cerrar()
+
+    transcurrido = time.perf_counter() - inicio
+    print(
+        f"Listo: {hechas} imágenes en {transcurrido:.1f}s ({hechas / transcurrido:.1f} img/s), "
+        f"{leidas} con placa leída, resultados en {args.salida}"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,908 @@
+import cv2
+import pytesseract
+import numpy as np
+import logging
+import os
+import threading
+import queue
+import time
+import argparse
+import heapq
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCR_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+OCR_CONFIG = f"--psm 8 -c tessedit_char_whitelist={OCR_WHITELIST}"
+
+# ******************** MOTORES OCR ********************
+class OCRBackend:
+    """Interfaz común de los motores OCR usados por PlateRecognizer"""
+    nombre = "base"
+
+    def image_to_string(self, img):
+        raise NotImplementedError
+
+    def image_to_chars(self, img):
+        """Devuelve [(caracter, confianza 0-100)]; sin información de confianza usa 50 para todos"""
+        texto = self.image_to_string(img)
+        return [(c, 50.0) for c in texto if c in OCR_WHITELIST]
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Invoca el ejecutable de tesseract en cada lectura (un proceso por placa)"""
+    nombre = "pytesseract"
+
+    def __init__(self, tesseract_path=None):
+        if tesseract_path:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+    def image_to_string(self, img):
+        return pytesseract.image_to_string(img, config=OCR_CONFIG)
+
+    def image_to_chars(self, img):
+        # tesseract por línea de comandos sólo reporta confianza por palabra
+        datos = pytesseract.image_to_data(img, config=OCR_CONFIG, output_type=pytesseract.Output.DICT)
+        chars = []
+        for texto, conf in zip(datos["text"], datos["conf"]):
+            conf = float(conf)
+            if conf < 0:
+                continue
+            chars.extend((c, conf) for c in texto if c in OCR_WHITELIST)
+        return chars
+
+
+class TesserocrBackend(OCRBackend):
+    """Mantiene el modelo de tesseract cargado en memoria entre placas"""
+    nombre = "tesserocr"
+
+    def __init__(self, tessdata_path=None, lang="eng"):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr no está instalado")
+        kwargs = {"lang": lang, "psm": tesserocr.PSM.SINGLE_WORD}
+        if tessdata_path:
+            kwargs["path"] = tessdata_path
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        self.api.SetVariable("tessedit_char_whitelist", OCR_WHITELIST)
+        # PyTessBaseAPI no es seguro entre hilos
+        self.lock = threading.Lock()
+
+    def image_to_string(self, img):
+        img = np.ascontiguousarray(img)
+        height, width = img.shape[:2]
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        with self.lock:
+            self.api.SetImageBytes(img.tobytes(), width, height, channels, width * channels)
+            return self.api.GetUTF8Text()
+
+    def image_to_chars(self, img):
+        img = np.ascontiguousarray(img)
+        height, width = img.shape[:2]
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        chars = []
+        with self.lock:
+            self.api.SetImageBytes(img.tobytes(), width, height, channels, width * channels)
+            self.api.Recognize()
+            nivel = tesserocr.RIL.SYMBOL
+            for simbolo in tesserocr.iterate_level(self.api.GetIterator(), nivel):
+                c = simbolo.GetUTF8Text(nivel)
+                if c and c in OCR_WHITELIST:
+                    chars.append((c, simbolo.Confidence(nivel)))
+        return chars
+
+    def close(self):
+        with self.lock:
+            self.api.End()
+
+
+OCR_BACKENDS = {
+    PytesseractBackend.nombre: PytesseractBackend,
+    TesserocrBackend.nombre: TesserocrBackend,
+}
+
+def tessdata_desde_ejecutable(tesseract_path):
+    """Deduce la carpeta tessdata de una instalación a partir de la ruta de tesseract.exe"""
+    if not tesseract_path:
+        return None
+    ruta = os.path.join(os.path.dirname(tesseract_path), "tessdata")
+    return ruta if os.path.isdir(ruta) else None
+
+def crear_ocr_backend(nombre="auto", tesseract_path=None):
+    """Crea el motor OCR pedido; 'auto' prefiere el motor en memoria y cae a pytesseract"""
+    if nombre in ("auto", TesserocrBackend.nombre):
+        try:
+            return TesserocrBackend(tessdata_desde_ejecutable(tesseract_path))
+        except Exception as e:
+            if nombre != "auto":
+                logging.error(f"No se pudo iniciar tesserocr, se usará pytesseract: {e}")
+    return PytesseractBackend(tesseract_path)
+
+# ******************** PERFILES DE CÁMARA ********************
+class PerfilCamara:
+    """Región de interés y tamaño esperado de la placa para una cámara.
+
+    Todo se expresa en fracciones del frame para que no dependa de la resolución:
+    roi = (x, y, ancho, alto) y el ancho de la placa relativo al ancho del frame.
+    """
+    def __init__(self, nombre="principal", roi=(0.0, 0.0, 1.0, 1.0), placa_ancho_min=0.04, placa_ancho_max=1.0):
+        self.nombre = nombre
+        self.roi = tuple(roi)
+        self.placa_ancho_min = placa_ancho_min
+        self.placa_ancho_max = placa_ancho_max
+
+    def roi_pixeles(self, shape):
+        alto, ancho = shape[:2]
+        rx, ry, rw, rh = self.roi
+        x = min(max(int(rx * ancho), 0), ancho - 1)
+        y = min(max(int(ry * alto), 0), alto - 1)
+        w = max(min(int(round(rw * ancho)), ancho - x), 1)
+        h = max(min(int(round(rh * alto)), alto - y), 1)
+        return x, y, w, h
+
+
+def parsear_roi(texto):
+    """Convierte 'x,y,ancho,alto' (fracciones del frame) en una tupla validada"""
+    valores = tuple(float(v) for v in texto.split(","))
+    if len(valores) != 4:
+        raise ValueError("El ROI debe tener 4 valores: x,y,ancho,alto")
+    x, y, w, h = valores
+    if not (0 <= x < 1 and 0 <= y < 1 and 0 < w <= 1 and 0 < h <= 1):
+        raise ValueError("Los valores del ROI deben ser fracciones entre 0 y 1")
+    return valores
+
+def formatear_roi(roi):
+    return ",".join(f"{v:g}" for v in roi)
+
+
+class CalibradorROI:
+    """Aprende la región de interés de una cámara a partir de lecturas exitosas"""
+    def __init__(self, nombre="principal", muestras_min=20, margen=0.5):
+        self.nombre = nombre
+        self.muestras_min = muestras_min
+        # Margen alrededor de las placas observadas, en múltiplos del alto medio de placa
+        self.margen = margen
+        self.muestras = []
+
+    def agregar(self, bbox, shape):
+        alto, ancho = shape[:2]
+        x, y, w, h = bbox
+        self.muestras.append((x / ancho, y / alto, w / ancho, h / alto))
+
+    def listo(self):
+        return len(self.muestras) >= self.muestras_min
+
+    def calcular(self):
+        if not self.muestras:
+            return None
+        muestras = np.array(self.muestras)
+        # Percentiles en lugar de mínimo/máximo para que una lectura errónea no abra el ROI
+        x0 = np.percentile(muestras[:, 0], 5)
+        y0 = np.percentile(muestras[:, 1], 5)
+        x1 = np.percentile(muestras[:, 0] + muestras[:, 2], 95)
+        y1 = np.percentile(muestras[:, 1] + muestras[:, 3], 95)
+        margen = self.margen * float(np.mean(muestras[:, 3]))
+        x0, y0 = max(float(x0) - margen, 0.0), max(float(y0) - margen, 0.0)
+        x1, y1 = min(float(x1) + margen, 1.0), min(float(y1) + margen, 1.0)
+        return PerfilCamara(
+            self.nombre,
+            roi=(round(x0, 4), round(y0, 4), round(x1 - x0, 4), round(y1 - y0, 4)),
+            placa_ancho_min=round(float(np.percentile(muestras[:, 2], 5)) * 0.7, 4),
+            placa_ancho_max=round(min(float(np.percentile(muestras[:, 2], 95)) * 1.3, 1.0), 4),
+        )
+
+# ******************** RECONOCIMIENTO DE PLACAS ********************
+class PlateRecognizer:
+    ocr_backend = None
+    # Lecturas en curso por motor, y motores reemplazados que esperan a su última lectura
+    _ocr_lock = threading.Lock()
+    _ocr_usos = {}
+    _ocr_retirados = set()
+
+    # Parámetros de detección; benchmarkPlacas.py permite variarlos y medir el efecto
+    CANNY_BAJO = 50
+    CANNY_ALTO = 200
+    EPSILON_CONTORNO = 0.02
+    ASPECTO_MIN = 2
+    ASPECTO_MAX = 5
+    UMBRAL_BINARIO = 150
+    # Los contornos se buscan sobre una copia reducida a este ancho; 0 desactiva la reducción
+    ANCHO_BUSQUEDA = 960
+    # RETR_LIST no construye la jerarquía como RETR_TREE pero conserva el borde interior del
+    # marco de la placa, que suele ser el contorno limpio; RETR_EXTERNAL lo pierde
+    MODO_CONTORNOS = cv2.RETR_LIST
+    # Tamaño mínimo del bounding rect de una placa, relativo al ancho de la imagen de búsqueda
+    ANCHO_MIN_RELATIVO = 0.04
+    MAX_CANDIDATOS = 10
+
+    @staticmethod
+    def set_ocr_backend(backend):
+        """Cambia el motor de todo el proceso; el anterior se cierra al terminar su última lectura"""
+        with PlateRecognizer._ocr_lock:
+            anterior = PlateRecognizer.ocr_backend
+            PlateRecognizer.ocr_backend = backend
+            if anterior is None or anterior is backend:
+                return
+            if PlateRecognizer._ocr_usos.get(anterior):
+                PlateRecognizer._ocr_retirados.add(anterior)
+                return
+        anterior.close()
+
+    @staticmethod
+    def get_ocr_backend():
+        """El motor actual; quien lo use fuera de usar_ocr_backend() puede verlo cerrarse si se cambia"""
+        with PlateRecognizer._ocr_lock:
+            if PlateRecognizer.ocr_backend is None:
+                PlateRecognizer.ocr_backend = crear_ocr_backend(
+                    "auto", pytesseract.pytesseract.tesseract_cmd
+                )
+            return PlateRecognizer.ocr_backend
+
+    @staticmethod
+    @contextmanager
+    def usar_ocr_backend():
+        """El motor actual, que no se cierra mientras dure el with aunque otro hilo lo reemplace"""
+        backend = PlateRecognizer.get_ocr_backend()
+        with PlateRecognizer._ocr_lock:
+            PlateRecognizer._ocr_usos[backend] = PlateRecognizer._ocr_usos.get(backend, 0) + 1
+        try:
+            yield backend
+        finally:
+            with PlateRecognizer._ocr_lock:
+                usos = PlateRecognizer._ocr_usos.pop(backend) - 1
+                if usos:
+                    PlateRecognizer._ocr_usos[backend] = usos
+                    retirado = False
+                else:
+                    retirado = backend in PlateRecognizer._ocr_retirados
+                    PlateRecognizer._ocr_retirados.discard(backend)
+            if retirado:
+                backend.close()
+
+    @staticmethod
+    def load_image(source):
+        """Acepta un frame de NumPy, los bytes de una imagen codificada o una ruta"""
+        if isinstance(source, np.ndarray):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR)
+        return cv2.imread(os.fspath(source))
+
+    @staticmethod
+    def to_gray(img):
+        if img.ndim == 2:
+            return img
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    @staticmethod
+    def preprocess_image(img):
+        gray = PlateRecognizer.to_gray(img)
+        blur = cv2.GaussianBlur(gray, (5,5), 0)
+        edged = cv2.Canny(blur, PlateRecognizer.CANNY_BAJO, PlateRecognizer.CANNY_ALTO)
+        return edged
+
+    @staticmethod
+    def find_plate_candidates(edged, ancho_min=None, ancho_max=None):
+        """Contornos cuyo bounding rect tiene tamaño y proporción de placa, los de mayor área primero"""
+        contours, _ = cv2.findContours(edged, PlateRecognizer.MODO_CONTORNOS, cv2.CHAIN_APPROX_SIMPLE)
+        if ancho_min is None:
+            ancho_min = edged.shape[1] * PlateRecognizer.ANCHO_MIN_RELATIVO
+        if ancho_max is None:
+            ancho_max = edged.shape[1]
+
+        candidatos = []
+        for contour in contours:
+            # boundingRect es mucho más barato que contourArea y descarta casi todo el ruido
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < ancho_min or w > ancho_max or h == 0:
+                continue
+            if PlateRecognizer.ASPECTO_MIN <= w / h <= PlateRecognizer.ASPECTO_MAX:
+                candidatos.append(contour)
+        return heapq.nlargest(PlateRecognizer.MAX_CANDIDATOS, candidatos, key=cv2.contourArea)
+
+    @staticmethod
+    def find_plate_contour(edged, ancho_min=None, ancho_max=None):
+        for contour in PlateRecognizer.find_plate_candidates(edged, ancho_min, ancho_max):
+            perimeter = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, PlateRecognizer.EPSILON_CONTORNO * perimeter, True)
+            if len(approx) == 4:
+                return approx
+        return None
+
+    @staticmethod
+    def extract_plate(img, contour):
+        mask = np.zeros(img.shape[:2], np.uint8)
+        cv2.drawContours(mask, [contour], 0, 255, -1)
+        return cv2.bitwise_and(img, img, mask=mask)
+
+    @staticmethod
+    def read_plate(image, perfil=None):
+        """Lee la placa de un frame en memoria, un buffer codificado o una ruta de archivo"""
+        try:
+            img = PlateRecognizer.load_image(image)
+            if img is None or img.size == 0:
+                logging.error("Error en OCR: imagen vacía o no encontrada")
+                return ""
+            return PlateRecognizer.read_plate_frame(img, perfil)
+        except Exception as e:
+            logging.error(f"Error en OCR: {e}")
+            return ""
+
+    @staticmethod
+    def read_plate_frame(img, perfil=None):
+        plate_cropped, _ = PlateRecognizer.locate_plate(img, perfil=perfil)
+        return PlateRecognizer.ocr_plate(plate_cropped)
+
+    @staticmethod
+    def locate_plate(img, gray=None, perfil=None):
+        """Devuelve el recorte de la placa (una vista del frame, no una copia) y su bounding box.
+
+        Con un PerfilCamara sólo se procesa su región de interés; el bounding box devuelto
+        sigue en coordenadas del frame completo.
+        """
+        ox = oy = 0
+        ancho_frame = img.shape[1]
+        if perfil is not None:
+            ox, oy, rw, rh = perfil.roi_pixeles(img.shape)
+            img = img[oy:oy+rh, ox:ox+rw]
+            if gray is not None:
+                gray = gray[oy:oy+rh, ox:ox+rw]
+        if gray is None:
+            gray = PlateRecognizer.to_gray(img)
+
+        busqueda, escala = PlateRecognizer.search_image(gray)
+        edged = PlateRecognizer.preprocess_image(busqueda)
+        ancho_min = ancho_max = None
+        if perfil is not None:
+            ancho_min = perfil.placa_ancho_min * ancho_frame / escala
+            ancho_max = perfil.placa_ancho_max * ancho_frame / escala
+        plate_contour = PlateRecognizer.find_plate_contour(edged, ancho_min, ancho_max)
+
+        if plate_contour is None:
+            return gray, None
+        x, y, w, h = PlateRecognizer.contour_bbox(plate_contour, escala, img.shape)
+        return img[y:y+h, x:x+w], (x + ox, y + oy, w, h)
+
+    @staticmethod
+    def search_image(gray):
+        """Copia reducida donde se buscan los contornos y el factor para volver a resolución completa"""
+        ancho = PlateRecognizer.ANCHO_BUSQUEDA
+        if not ancho or gray.shape[1] <= ancho:
+            return gray, 1.0
+        # Factor entero: INTER_AREA con factores enteros es mucho más rápido que con fraccionarios
+        factor = int(np.ceil(gray.shape[1] / ancho))
+        reducida = cv2.resize(gray, (gray.shape[1] // factor, gray.shape[0] // factor), interpolation=cv2.INTER_AREA)
+        return reducida, gray.shape[1] / reducida.shape[1]
+
+    @staticmethod
+    def contour_bbox(contour, escala, shape):
+        x, y, w, h = cv2.boundingRect(contour)
+        if escala == 1.0:
+            return x, y, w, h
+        x, y = int(x * escala), int(y * escala)
+        w = min(int(np.ceil(w * escala)), shape[1] - x)
+        h = min(int(np.ceil(h * escala)), shape[0] - y)
+        return x, y, w, h
+
+    @staticmethod
+    def binarize_plate(plate_cropped):
+        _, thresh = cv2.threshold(plate_cropped, PlateRecognizer.UMBRAL_BINARIO, 255, cv2.THRESH_BINARY)
+        return thresh
+
+    @staticmethod
+    def clean_text(texto):
+        return texto.strip().replace(" ", "").replace("\n", "")
+
+    @staticmethod
+    def ocr_plate(plate_cropped, backend=None):
+        thresh = PlateRecognizer.binarize_plate(plate_cropped)
+        if backend is not None:
+            return PlateRecognizer.clean_text(backend.image_to_string(thresh))
+        with PlateRecognizer.usar_ocr_backend() as backend:
+            return PlateRecognizer.clean_text(backend.image_to_string(thresh))
+
+    @staticmethod
+    def ocr_plate_chars(plate_cropped, backend=None):
+        thresh = PlateRecognizer.binarize_plate(plate_cropped)
+        if backend is not None:
+            return backend.image_to_chars(thresh)
+        with PlateRecognizer.usar_ocr_backend() as backend:
+            return backend.image_to_chars(thresh)
+
+# ******************** VOTACIÓN ENTRE FRAMES ********************
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    interseccion = ix * iy
+    union = aw * ah + bw * bh - interseccion
+    return interseccion / union if union else 0.0
+
+
+class PlateTrack:
+    def __init__(self, track_id, bbox, frame_id):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.primer_frame = frame_id
+        self.ultimo_frame = frame_id
+        self.frames = 0
+        self.firma_ocr = None
+        self.lecturas = 0
+        self.pendientes = 0
+        self.cerrado = False
+        # votos[longitud][posicion][caracter] = suma de confianzas
+        self.votos = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+        self.peso_longitud = defaultdict(float)
+
+    def votar(self, chars):
+        if not chars:
+            return
+        longitud = len(chars)
+        for posicion, (c, conf) in enumerate(chars):
+            self.votos[longitud][posicion][c] += max(conf, 1.0)
+        self.peso_longitud[longitud] += sum(max(conf, 1.0) for _, conf in chars) / longitud
+
+    def resultado(self):
+        """Placa ganadora por votación ponderada por confianza, carácter por carácter"""
+        if not self.peso_longitud:
+            return None
+        longitud = max(self.peso_longitud, key=self.peso_longitud.get)
+        placa = []
+        acuerdo = []
+        for posicion in range(longitud):
+            votos = self.votos[longitud][posicion]
+            c = max(votos, key=votos.get)
+            placa.append(c)
+            acuerdo.append(votos[c] / sum(votos.values()))
+        return {
+            "placa": "".join(placa),
+            "confianza": sum(acuerdo) / len(acuerdo),
+            "lecturas": self.lecturas,
+            "frames": self.frames,
+            "bbox": self.bbox,
+            "frame_id": self.ultimo_frame,
+            "timestamp": time.time(),
+        }
+
+
+class PlateVoteAggregator:
+    """Sigue la placa de un mismo vehículo entre frames y combina las lecturas en una sola.
+
+    Sólo pide OCR cuando el recorte cambia lo suficiente respecto a la última lectura, y emite
+    la placa final cuando el vehículo deja de verse durante frames_perdida frames. Es seguro
+    usarlo desde varios hilos (detector y workers de OCR).
+    """
+    def __init__(self, iou_minimo=0.3, umbral_cambio=12.0, frames_perdida=15, lecturas_max=6,
+                 longitud_minima=6, on_placa=None):
+        self.iou_minimo = iou_minimo
+        self.umbral_cambio = umbral_cambio
+        self.frames_perdida = frames_perdida
+        self.lecturas_max = lecturas_max
+        self.longitud_minima = longitud_minima
+        self.on_placa = on_placa
+        self.lock = threading.Lock()
+        self.track = None
+        self.siguiente_id = 1
+        self.ocr_solicitados = 0
+        self.ocr_omitidos = 0
+        self.tracks_pendientes = {}
+        self.ultimas = deque(maxlen=50)
+        self.total_emitidas = 0
+
+    @staticmethod
+    def firma(recorte):
+        gray = PlateRecognizer.to_gray(recorte)
+        return cv2.resize(gray, (48, 16), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def observar(self, frame_id, recorte=None, bbox=None):
+        """Registra un frame; devuelve el track_id si el recorte merece OCR o None si no"""
+        finalizados = []
+        with self.lock:
+            track = self.track
+            if bbox is None:
+                if track is not None and frame_id - track.ultimo_frame > self.frames_perdida:
+                    finalizados.append(self._cerrar_track())
+                self._emitir(finalizados)
+                return None
+
+            if track is not None and iou(track.bbox, bbox) < self.iou_minimo:
+                finalizados.append(self._cerrar_track())
+                track = None
+            if track is None:
+                track = self.track = PlateTrack(self.siguiente_id, bbox, frame_id)
+                self.siguiente_id += 1
+
+            track.bbox = bbox
+            track.ultimo_frame = frame_id
+            track.frames += 1
+
+            firma = self.firma(recorte)
+            cambio = float("inf") if track.firma_ocr is None else float(np.mean(np.abs(firma - track.firma_ocr)))
+            if cambio < self.umbral_cambio or track.lecturas + track.pendientes >= self.lecturas_max:
+                self.ocr_omitidos += 1
+                self._emitir(finalizados)
+                return None
+
+            track.firma_ocr = firma
+            track.pendientes += 1
+            self.ocr_solicitados += 1
+            self.tracks_pendientes[track.track_id] = track
+        self._emitir(finalizados)
+        return track.track_id
+
+    def agregar_lectura(self, track_id, chars):
+        finalizados = []
+        with self.lock:
+            track = self.tracks_pendientes.get(track_id)
+            if track is None:
+                return
+            track.pendientes -= 1
+            track.lecturas += 1
+            track.votar(chars)
+            if track.pendientes == 0:
+                del self.tracks_pendientes[track_id]
+                if track.cerrado:
+                    finalizados.append(track.resultado())
+        self._emitir(finalizados)
+
+    def flush(self):
+        """Cierra el track actual (fin del video o de la captura)"""
+        with self.lock:
+            finalizados = [self._cerrar_track()] if self.track is not None else []
+        self._emitir(finalizados)
+
+    def leer_frame(self, frame, frame_id, backend=None, perfil=None):
+        """Uso síncrono: localiza, decide si hace falta OCR y vota; devuelve las placas emitidas"""
+        antes = self.total_emitidas
+        recorte, bbox = PlateRecognizer.locate_plate(frame, perfil=perfil)
+        track_id = self.observar(frame_id, recorte, bbox)
+        if track_id is not None:
+            self.agregar_lectura(track_id, PlateRecognizer.ocr_plate_chars(recorte, backend))
+        nuevas = self.total_emitidas - antes
+        return list(self.ultimas)[-nuevas:] if nuevas else []
+
+    def _cerrar_track(self):
+        track = self.track
+        self.track = None
+        track.cerrado = True
+        if track.pendientes:
+            # Se emitirá cuando lleguen las lecturas que faltan
+            return None
+        return track.resultado()
+
+    def _emitir(self, finalizados):
+        for resultado in finalizados:
+            if resultado is None or len(resultado["placa"]) < self.longitud_minima:
+                continue
+            self.ultimas.append(resultado)
+            self.total_emitidas += 1
+            if self.on_placa:
+                self.on_placa(resultado)
+
+# ******************** CAPTURA CONTINUA ********************
+class FrameRingBuffer:
+    """Buffer circular acotado: al llenarse descarta el frame más antiguo"""
+    def __init__(self, capacidad):
+        self.frames = deque(maxlen=capacidad)
+        self.cond = threading.Condition()
+        self.descartados = 0
+        self.cerrado = False
+
+    def put(self, item):
+        with self.cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.descartados += 1
+            self.frames.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Devuelve el frame más antiguo o None si el buffer se cerró y está vacío"""
+        with self.cond:
+            while not self.frames and not self.cerrado:
+                if not self.cond.wait(timeout):
+                    return None
+            if self.frames:
+                return self.frames.popleft()
+            return None
+
+    def close(self):
+        with self.cond:
+            self.cerrado = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class PlateCapturePipeline:
+    """Captura manos libres: un hilo lee frames, otro busca placas y un pool de hilos hace el OCR.
+
+    La fuente puede ser el índice de una cámara, la ruta de un video (para reproducirlo sin
+    cámara) o cualquier objeto con read() -> (ret, frame). Las lecturas se publican en
+    self.resultados para que la interfaz las consuma con after(). Con votacion=True se publica
+    una sola placa por vehículo (ver PlateVoteAggregator) en lugar de una por frame.
+    """
+    FIN = object()
+
+    def __init__(self, fuente=0, ocr_workers=2, capacidad_buffer=8, capacidad_candidatos=16,
+                 tiempo_real=True, umbral_nitidez=60.0, backend_factory=None, votacion=True,
+                 perfil=None, calibrador=None):
+        self.fuente = fuente
+        # En modo calibración se analiza el frame completo y cada lectura alimenta al calibrador
+        self.perfil = None if calibrador is not None else perfil
+        self.calibrador = calibrador
+        self.forma_frame = None
+        self.ocr_workers = ocr_workers
+        self.tiempo_real = tiempo_real
+        self.umbral_nitidez = umbral_nitidez
+        self.backend_factory = backend_factory
+
+        self.buffer = FrameRingBuffer(capacidad_buffer)
+        self.candidatos = queue.Queue(maxsize=capacidad_candidatos)
+        self.resultados = queue.Queue()
+        self.agregador = PlateVoteAggregator(on_placa=self._publicar) if votacion else None
+
+        self.detenido = threading.Event()
+        self.hilos = []
+        self.lock = threading.Lock()
+        self.tiempos_frames = deque(maxlen=60)
+        self.contadores = {"frames": 0, "utiles": 0, "candidatos": 0, "candidatos_descartados": 0, "lecturas": 0}
+        self.workers_activos = 0
+
+    def start(self):
+        self.detenido.clear()
+        self.hilos = [
+            threading.Thread(target=self._capturar, name="placas-captura", daemon=True),
+            threading.Thread(target=self._detectar, name="placas-deteccion", daemon=True),
+        ]
+        self.workers_activos = self.ocr_workers
+        for i in range(self.ocr_workers):
+            self.hilos.append(threading.Thread(target=self._leer, name=f"placas-ocr-{i}", daemon=True))
+        for hilo in self.hilos:
+            hilo.start()
+
+    def stop(self, timeout=2.0):
+        self.detenido.set()
+        self.buffer.close()
+        for hilo in self.hilos:
+            hilo.join(timeout)
+        self.hilos = []
+
+    def is_running(self):
+        return any(hilo.is_alive() for hilo in self.hilos)
+
+    def stats(self):
+        with self.lock:
+            tiempos = list(self.tiempos_frames)
+            contadores = dict(self.contadores)
+        fps = (len(tiempos) - 1) / (tiempos[-1] - tiempos[0]) if len(tiempos) > 1 and tiempos[-1] > tiempos[0] else 0.0
+        contadores.update({
+            "fps": fps,
+            "cola_frames": len(self.buffer),
+            "frames_descartados": self.buffer.descartados,
+            "cola_candidatos": self.candidatos.qsize(),
+            "cola_resultados": self.resultados.qsize(),
+        })
+        if self.agregador is not None:
+            contadores["ocr_omitidos"] = self.agregador.ocr_omitidos
+        return contadores
+
+    def _contar(self, clave):
+        with self.lock:
+            self.contadores[clave] += 1
+
+    def _abrir_fuente(self):
+        if hasattr(self.fuente, "read"):
+            return self.fuente, False
+        cap = cv2.VideoCapture(self.fuente)
+        if not cap.isOpened():
+            raise RuntimeError(f"No se pudo abrir la fuente de video {self.fuente}")
+        return cap, True
+
+    def _capturar(self):
+        try:
+            cap, propia = self._abrir_fuente()
+        except Exception as e:
+            logging.error(f"Error en captura continua: {e}")
+            self.buffer.close()
+            return
+
+        es_video = isinstance(self.fuente, str)
+        intervalo = 0
+        if es_video and self.tiempo_real:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            intervalo = 1.0 / fps if fps and fps > 0 else 0
+        frame_id = 0
+        try:
+            while not self.detenido.is_set():
+                inicio = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    if getattr(cap, "reconecta", False) and getattr(cap, "activa", True):
+                        # La cámara se está reconectando: sin la pausa este bucle ocupa un núcleo
+                        time.sleep(0.05)
+                        continue
+                    if getattr(cap, "reconecta", False):
+                        logging.info("La cámara de la captura continua se cerró; la captura se detiene")
+                    break
+                frame_id += 1
+                with self.lock:
+                    self.contadores["frames"] += 1
+                    self.tiempos_frames.append(time.perf_counter())
+                self.buffer.put((frame_id, frame))
+                if intervalo:
+                    espera = intervalo - (time.perf_counter() - inicio)
+                    if espera > 0:
+                        time.sleep(espera)
+        finally:
+            if propia:
+                cap.release()
+            self.buffer.close()
+
+    def frame_util(self, gray):
+        """Descarta frames borrosos antes de buscar contornos"""
+        return cv2.Laplacian(gray, cv2.CV_64F).var() >= self.umbral_nitidez
+
+    def _detectar(self):
+        try:
+            while True:
+                item = self.buffer.get(timeout=0.5)
+                if self.detenido.is_set():
+                    break
+                if item is None:
+                    if self.buffer.cerrado:
+                        break
+                    continue
+                frame_id, frame = item
+                self.forma_frame = frame.shape
+                if self.perfil is not None:
+                    rx, ry, rw, rh = self.perfil.roi_pixeles(frame.shape)
+                    gray = PlateRecognizer.to_gray(frame[ry:ry+rh, rx:rx+rw])
+                else:
+                    gray = PlateRecognizer.to_gray(frame)
+                if not self.frame_util(gray):
+                    self._observar(frame_id)
+                    continue
+                self._contar("utiles")
+
+                if self.perfil is not None:
+                    recorte, bbox = PlateRecognizer.locate_plate(frame, perfil=self.perfil)
+                else:
+                    recorte, bbox = PlateRecognizer.locate_plate(frame, gray)
+                track_id = self._observar(frame_id, recorte, bbox)
+                if bbox is None or (self.agregador is not None and track_id is None):
+                    continue
+                try:
+                    self.candidatos.put_nowait((frame_id, recorte, bbox, track_id))
+                    self._contar("candidatos")
+                except queue.Full:
+                    self._contar("candidatos_descartados")
+                    if track_id is not None:
+                        self.agregador.agregar_lectura(track_id, [])
+        except Exception as e:
+            logging.error(f"Error en detección de placas: {e}")
+        finally:
+            for _ in range(self.ocr_workers):
+                self.candidatos.put(self.FIN)
+
+    def _publicar(self, resultado):
+        if self.calibrador is not None and resultado.get("bbox") and self.forma_frame is not None:
+            self.calibrador.agregar(resultado["bbox"], self.forma_frame)
+        self.resultados.put(resultado)
+
+    def _observar(self, frame_id, recorte=None, bbox=None):
+        if self.agregador is None:
+            return None
+        return self.agregador.observar(frame_id, recorte, bbox)
+
+    def _leer(self):
+        backend = self.backend_factory() if self.backend_factory else None
+        try:
+            while True:
+                item = self.candidatos.get()
+                if item is self.FIN:
+                    break
+                frame_id, recorte, bbox, track_id = item
+                if self.detenido.is_set():
+                    if track_id is not None:
+                        self.agregador.agregar_lectura(track_id, [])
+                    continue
+                if track_id is not None:
+                    try:
+                        chars = PlateRecognizer.ocr_plate_chars(recorte, backend)
+                    except Exception as e:
+                        logging.error(f"Error en OCR: {e}")
+                        chars = []
+                    self._contar("lecturas")
+                    self.agregador.agregar_lectura(track_id, chars)
+                    continue
+                try:
+                    placa = PlateRecognizer.ocr_plate(recorte, backend)
+                except Exception as e:
+                    logging.error(f"Error en OCR: {e}")
+                    continue
+                self._contar("lecturas")
+                if placa:
+                    self._publicar({
+                        "placa": placa,
+                        "bbox": bbox,
+                        "frame_id": frame_id,
+                        "timestamp": time.time(),
+                    })
+        finally:
+            if backend is not None:
+                backend.close()
+            with self.lock:
+                self.workers_activos -= 1
+                ultimo = self.workers_activos == 0
+            if ultimo:
+                if self.agregador is not None and not self.detenido.is_set():
+                    self.agregador.flush()
+                self.resultados.put(self.FIN)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Captura continua de placas desde una cámara o un video")
+    parser.add_argument("fuente", nargs="?", default="0", help="Índice de cámara o ruta de un video")
+    parser.add_argument("--workers", type=int, default=2, help="Hilos de OCR")
+    parser.add_argument("--sin-tiempo-real", action="store_true", help="Reproduce el video sin respetar sus FPS")
+    parser.add_argument("--ocr-backend", default="auto", choices=["auto"] + list(OCR_BACKENDS))
+    parser.add_argument("--tesseract-path", default=None)
+    parser.add_argument("--sin-votacion", action="store_true", help="Publica una lectura por frame")
+    parser.add_argument("--roi", default=None, help="Región de interés 'x,y,ancho,alto' en fracciones del frame")
+    parser.add_argument("--calibrar", type=int, default=0, metavar="N",
+                        help="Aprende el ROI a partir de N lecturas exitosas y lo imprime")
+    args = parser.parse_args()
+
+    fuente = int(args.fuente) if args.fuente.isdigit() else args.fuente
+    perfil = PerfilCamara(roi=parsear_roi(args.roi)) if args.roi else None
+    calibrador = CalibradorROI(muestras_min=args.calibrar) if args.calibrar else None
+    pipeline = PlateCapturePipeline(
+        fuente,
+        ocr_workers=args.workers,
+        tiempo_real=not args.sin_tiempo_real,
+        backend_factory=lambda: crear_ocr_backend(args.ocr_backend, args.tesseract_path),
+        votacion=not args.sin_votacion,
+        perfil=perfil,
+        calibrador=calibrador,
+    )
+    pipeline.start()
+    ultimo_reporte = time.time()
+    try:
+        while True:
+            try:
+                resultado = pipeline.resultados.get(timeout=0.5)
+            except queue.Empty:
+                resultado = None
+            if resultado is PlateCapturePipeline.FIN:
+                break
+            if resultado:
+                print(f"frame {resultado['frame_id']}: {resultado['placa']} {resultado['bbox']}")
+            if calibrador is not None and calibrador.listo():
+                break
+            if time.time() - ultimo_reporte >= 1:
+                print(pipeline.stats())
+                ultimo_reporte = time.time()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+    print(pipeline.stats())
+    if calibrador is not None:
+        perfil = calibrador.calcular()
+        if perfil is None:
+            print("No hubo lecturas suficientes para calibrar el ROI")
+        else:
+            print(f"roi = {formatear_roi(perfil.roi)}")
+            print(f"placa_ancho_min = {perfil.placa_ancho_min:g}")
+            print(f"placa_ancho_max = {perfil.placa_ancho_max:g}")
+
+if __name__ == "__main__":
+    main()
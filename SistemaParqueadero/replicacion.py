@@ -0,0 +1,152 @@
+import logging
+import sqlite3
+import time
+from contextlib import closing
+
+# ******************** REPLICACIÓN ENTRE PUERTAS ********************
+CONSUMIDOR_REPLICACION = 'replicacion'
+REPLICACION_LOTE = 500
+# Los reportes son de cada puerta; la ocupación se deriva de los movimientos
+TABLAS_REPLICADAS = ('movimientos',)
+
+ESQUEMA_CAMBIOS_MYSQL = """CREATE TABLE IF NOT EXISTS cambios (
+    nodo VARCHAR(64) NOT NULL,
+    seq BIGINT NOT NULL,
+    tabla VARCHAR(32) NOT NULL,
+    clave VARCHAR(64) NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (nodo, seq)
+)"""
+
+
+class RegistroCambiosSQLite:
+    """Registro de cambios compartido en un archivo SQLite: varias puertas en la misma máquina o una carpeta de red"""
+    def __init__(self, ruta, timeout=10.0):
+        self.ruta = ruta
+        self.timeout = timeout
+        with closing(self._conectar()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cambios ("
+                "nodo TEXT NOT NULL, seq INTEGER NOT NULL, tabla TEXT NOT NULL, "
+                "clave TEXT NOT NULL, payload TEXT NOT NULL, PRIMARY KEY (nodo, seq))"
+            )
+            conn.commit()
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=self.timeout)
+
+    def publicar(self, nodo, entradas):
+        # (nodo, seq) es la clave: publicar dos veces el mismo lote no duplica nada
+        with closing(self._conectar()) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO cambios (nodo, seq, tabla, clave, payload) VALUES (?, ?, ?, ?, ?)",
+                [(nodo, seq, tabla, clave, payload) for seq, tabla, clave, payload in entradas]
+            )
+            conn.commit()
+
+    def leer(self, nodo, cursores, lote):
+        """[(nodo, seq, tabla, payload)] de las demás puertas posteriores a sus cursores"""
+        with closing(self._conectar()) as conn:
+            nodos = [fila[0] for fila in conn.execute("SELECT DISTINCT nodo FROM cambios WHERE nodo <> ?", (nodo,))]
+            cambios = []
+            for remoto in nodos:
+                cambios += conn.execute(
+                    "SELECT nodo, seq, tabla, payload FROM cambios WHERE nodo = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (remoto, cursores.get(remoto, 0), lote)
+                ).fetchall()
+            return cambios
+
+
+class RegistroCambiosMySQL:
+    """El mismo registro en el servidor central, a través del pool de MySQL de la app"""
+    def __init__(self, pool_mysql):
+        self.pool_mysql = pool_mysql
+        self.preparado = False
+
+    def _preparar(self, conn):
+        if not self.preparado:
+            conn.cursor().execute(ESQUEMA_CAMBIOS_MYSQL)
+            conn.commit()
+            self.preparado = True
+
+    def publicar(self, nodo, entradas):
+        with self.pool_mysql.conexion() as conn:
+            self._preparar(conn)
+            conn.cursor().executemany(
+                "INSERT IGNORE INTO cambios (nodo, seq, tabla, clave, payload) VALUES (%s, %s, %s, %s, %s)",
+                [(nodo, seq, tabla, clave, payload) for seq, tabla, clave, payload in entradas]
+            )
+            conn.commit()
+
+    def leer(self, nodo, cursores, lote):
+        with self.pool_mysql.conexion() as conn:
+            self._preparar(conn)
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT nodo FROM cambios WHERE nodo <> %s", (nodo,))
+            nodos = [fila[0] for fila in cursor.fetchall()]
+            cambios = []
+            for remoto in nodos:
+                cursor.execute(
+                    "SELECT nodo, seq, tabla, payload FROM cambios WHERE nodo = %s AND seq > %s ORDER BY seq LIMIT %s",
+                    (remoto, cursores.get(remoto, 0), lote)
+                )
+                cambios += cursor.fetchall()
+            conn.commit()
+            return cambios
+
+
+def crear_registro(destino, db):
+    """'mysql' usa el servidor central; cualquier otro valor es la ruta de un archivo compartido"""
+    if destino.strip().lower() == 'mysql':
+        return RegistroCambiosMySQL(db.pool_mysql)
+    return RegistroCambiosSQLite(destino)
+
+
+class Replicador:
+    """Publica los cambios de esta puerta y aplica los de las demás, por número de secuencia.
+
+    Cada puerta publica su outbox con el seq local, que sólo crece; las demás lo leen a partir
+    del último seq que aplicaron de esa puerta. Los conflictos los resuelve DatabaseManager
+    de forma determinista, así que el orden en que cada puerta recibe los cambios no importa.
+    """
+    def __init__(self, db, registro, lote=REPLICACION_LOTE):
+        self.db = db
+        self.registro = registro
+        self.lote = lote
+        db.registrar_consumidor(CONSUMIDOR_REPLICACION)
+
+    def publicar(self):
+        publicados = 0
+        while True:
+            entradas = self.db.leer_outbox(CONSUMIDOR_REPLICACION, self.lote)
+            if not entradas:
+                return publicados
+            replicadas = [entrada for entrada in entradas if entrada[1] in TABLAS_REPLICADAS]
+            if replicadas:
+                self.registro.publicar(self.db.nodo_id, replicadas)
+            self.db.confirmar_outbox(entradas[-1][0], CONSUMIDOR_REPLICACION)
+            publicados += len(replicadas)
+
+    def recibir(self):
+        recibidos = 0
+        while True:
+            cambios = self.registro.leer(self.db.nodo_id, self.db.cursores_replicacion(), self.lote)
+            if not cambios:
+                return recibidos
+            self.db.aplicar_cambios_remotos(cambios)
+            recibidos += len(cambios)
+
+    def sincronizar(self):
+        """Una vuelta completa; devuelve (publicados, recibidos)"""
+        inicio = time.perf_counter()
+        publicados = self.publicar()
+        recibidos = self.recibir()
+        # Resolver un conflicto genera cambios propios que las demás puertas tienen que ver
+        publicados += self.publicar()
+        if publicados or recibidos:
+            logging.info(
+                f"Replicación: {publicados} cambios publicados, {recibidos} recibidos "
+                f"en {time.perf_counter() - inicio:.2f}s"
+            )
+        return publicados, recibidos
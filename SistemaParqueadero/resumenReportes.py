@@ -0,0 +1,170 @@
+import logging
+import time
+from datetime import date, timedelta
+
+from indiceOcupacion import ZONA_DEFECTO
+
+# ******************** RESÚMENES DE REPORTES ********************
+# Periodo -> expresión SQL que saca su clave de 'AAAA-MM-DD HH:MM:SS'. hora_mes ('AAAA-MM HH')
+# junta cada hora del día de todo un mes: las horas pico de un año son 288 filas, no 8760
+PERIODOS = {
+    'hora': "substr({0}, 1, 13)",
+    'dia': "substr({0}, 1, 10)",
+    'mes': "substr({0}, 1, 7)",
+    'hora_mes': "substr({0}, 1, 7) || substr({0}, 11, 3)",
+}
+# Largo del prefijo de la fecha que limita un rango en cada periodo
+LARGO_LIMITE = {'hora': 13, 'dia': 10, 'mes': 7, 'hora_mes': 7}
+AGRUPACIONES = ('inicio', 'tipo_vehiculo', 'zona')
+# Un movimiento marcado 'duplicado' nunca existió para los reportes
+ESTADOS_CONTADOS = ('activo', 'salido')
+COLUMNAS_RESUMEN = ('tipo_vehiculo', 'hora_entrada', 'hora_salida', 'estado', 'total_cobrado',
+                    'tiempo_estacionado', 'espacio_asignado')
+
+
+def clave_periodo(periodo, fecha):
+    """La clave de PERIODOS[periodo] calculada en Python"""
+    if periodo == 'hora_mes':
+        return fecha[:7] + fecha[10:13]
+    return fecha[:LARGO_LIMITE[periodo]]
+
+
+class ReportRollups:
+    """Ingresos, egresos, cobrado y minutos por hora, día y mes, por tipo de vehículo y zona.
+
+    Cada cambio a un movimiento aplica aquí la diferencia entre su versión anterior y la
+    nueva, en la misma transacción. Los ingresos cuentan en el periodo de hora_entrada y los
+    egresos (con lo cobrado y los minutos) en el de hora_salida, igual que la tabla reportes.
+    Como el resumen sólo depende de los movimientos, reconstruir() lo rehace desde cero.
+    """
+    def __init__(self, db):
+        self.db = db
+
+    def fila(self, cursor, uid):
+        """Lo que el resumen necesita de un movimiento de la tabla principal, o None"""
+        cursor.execute(
+            f"SELECT {', '.join(COLUMNAS_RESUMEN)} FROM movimientos WHERE uid = ?", (uid,)
+        )
+        fila = cursor.fetchone()
+        return dict(zip(COLUMNAS_RESUMEN, fila)) if fila is not None else None
+
+    def _zona(self, cursor, espacio_id):
+        cursor.execute("SELECT zona FROM espacios WHERE id = ?", (espacio_id,))
+        fila = cursor.fetchone()
+        return fila[0] if fila is not None and fila[0] else ZONA_DEFECTO
+
+    def _contribucion(self, cursor, fila, signo, deltas):
+        if fila is None or fila.get('estado') not in ESTADOS_CONTADOS or not fila.get('hora_entrada'):
+            return
+        tipo = fila.get('tipo_vehiculo') or ''
+        zona = self._zona(cursor, fila.get('espacio_asignado'))
+        salida = fila['hora_salida'] if fila['estado'] == 'salido' else None
+        for periodo in PERIODOS:
+            delta = deltas.setdefault((periodo, clave_periodo(periodo, fila['hora_entrada']), tipo, zona), [0, 0, 0.0, 0.0])
+            delta[0] += signo
+            if salida:
+                delta = deltas.setdefault((periodo, clave_periodo(periodo, salida), tipo, zona), [0, 0, 0.0, 0.0])
+                delta[1] += signo
+                delta[2] += signo * (fila.get('total_cobrado') or 0)
+                delta[3] += signo * (fila.get('tiempo_estacionado') or 0)
+
+    def aplicar(self, cursor, antes, despues):
+        """Lleva el resumen de la versión `antes` del movimiento a `despues` (cualquiera puede ser None)"""
+        deltas = {}
+        self._contribucion(cursor, antes, -1, deltas)
+        self._contribucion(cursor, despues, 1, deltas)
+        filas = [clave + tuple(delta) for clave, delta in deltas.items() if any(delta)]
+        if filas:
+            cursor.executemany(
+                "INSERT INTO resumenes (periodo, inicio, tipo_vehiculo, zona, ingresos, egresos, total_cobrado, minutos) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(periodo, inicio, tipo_vehiculo, zona) DO UPDATE SET "
+                "ingresos = ingresos + excluded.ingresos, egresos = egresos + excluded.egresos, "
+                "total_cobrado = total_cobrado + excluded.total_cobrado, minutos = minutos + excluded.minutos",
+                filas
+            )
+
+    def reconstruir(self, cursor):
+        """Rehace el resumen desde los movimientos, incluidos los archivados; devuelve las filas"""
+        inicio = time.perf_counter()
+        fuente = self.db.archivo.fuente(cursor)
+        estados = ", ".join(f"'{estado}'" for estado in ESTADOS_CONTADOS)
+        cursor.execute("DELETE FROM resumenes")
+        for periodo, expresion in PERIODOS.items():
+            cursor.execute(
+                "INSERT INTO resumenes (periodo, inicio, tipo_vehiculo, zona, ingresos) "
+                f"SELECT ?, {expresion.format('m.hora_entrada')}, COALESCE(m.tipo_vehiculo, ''), "
+                f"COALESCE(e.zona, '{ZONA_DEFECTO}'), COUNT(*) "
+                f"FROM {fuente} m LEFT JOIN espacios e ON e.id = m.espacio_asignado "
+                f"WHERE m.estado IN ({estados}) AND m.hora_entrada IS NOT NULL GROUP BY 2, 3, 4",
+                (periodo,)
+            )
+            cursor.execute(
+                "INSERT INTO resumenes (periodo, inicio, tipo_vehiculo, zona, egresos, total_cobrado, minutos) "
+                f"SELECT ?, {expresion.format('m.hora_salida')}, COALESCE(m.tipo_vehiculo, ''), "
+                f"COALESCE(e.zona, '{ZONA_DEFECTO}'), COUNT(*), "
+                "COALESCE(SUM(m.total_cobrado), 0), COALESCE(SUM(m.tiempo_estacionado), 0) "
+                f"FROM {fuente} m LEFT JOIN espacios e ON e.id = m.espacio_asignado "
+                "WHERE m.estado = 'salido' AND m.hora_entrada IS NOT NULL AND m.hora_salida IS NOT NULL "
+                "GROUP BY 2, 3, 4 "
+                "ON CONFLICT(periodo, inicio, tipo_vehiculo, zona) DO UPDATE SET "
+                "egresos = excluded.egresos, total_cobrado = excluded.total_cobrado, minutos = excluded.minutos",
+                (periodo,)
+            )
+        cursor.execute("SELECT COUNT(*) FROM resumenes")
+        filas = cursor.fetchone()[0]
+        logging.info(f"Resúmenes de reportes reconstruidos: {filas} filas en {time.perf_counter() - inicio:.2f}s")
+        return filas
+
+    def consultar(self, cursor, periodo, desde, hasta, agrupar=('inicio',)):
+        """[(*agrupar, ingresos, egresos, total_cobrado, minutos)] entre desde y hasta.
+
+        Los límites se recortan al periodo: con 'mes', desde='2024-01-15' cuenta enero completo.
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Periodo desconocido: {periodo}")
+        for columna in agrupar:
+            if columna not in AGRUPACIONES:
+                raise ValueError(f"No se puede agrupar por {columna}")
+        largo = LARGO_LIMITE[periodo]
+        columnas = ", ".join(agrupar)
+        cursor.execute(
+            f"SELECT {columnas + ', ' if agrupar else ''}"
+            "SUM(ingresos), SUM(egresos), SUM(total_cobrado), SUM(minutos) FROM resumenes "
+            "WHERE periodo = ? AND inicio BETWEEN ? AND ? "
+            + (f"GROUP BY {columnas} ORDER BY {columnas}" if agrupar else ""),
+            # '~' ordena después de dígitos y espacios: el último periodo entra completo
+            (periodo, desde[:largo], hasta[:largo] + '~')
+        )
+        return cursor.fetchall()
+
+    def por_hora_del_dia(self, cursor, desde, hasta):
+        """[(hora 'HH', ingresos, egresos)] sumando todos los días del rango, para ver las horas pico.
+
+        Los meses completos salen de hora_mes y sólo los días sueltos de los extremos de 'hora'.
+        """
+        inicio, fin = date.fromisoformat(desde[:10]), date.fromisoformat(hasta[:10])
+        primer_mes = inicio if inicio.day == 1 else (inicio.replace(day=1) + timedelta(days=32)).replace(day=1)
+        despues_ultimo_mes = (fin + timedelta(days=1)).replace(day=1)
+        tramos = []
+        if primer_mes < despues_ultimo_mes:
+            tramos.append(('hora_mes', 9, primer_mes, despues_ultimo_mes - timedelta(days=1)))
+            if inicio < primer_mes:
+                tramos.append(('hora', 12, inicio, primer_mes - timedelta(days=1)))
+            if despues_ultimo_mes <= fin:
+                tramos.append(('hora', 12, despues_ultimo_mes, fin))
+        elif inicio <= fin:
+            tramos.append(('hora', 12, inicio, fin))
+        horas = {}
+        for periodo, posicion, tramo_inicio, tramo_fin in tramos:
+            largo = LARGO_LIMITE[periodo]
+            cursor.execute(
+                f"SELECT substr(inicio, {posicion}, 2), SUM(ingresos), SUM(egresos) FROM resumenes "
+                "WHERE periodo = ? AND inicio BETWEEN ? AND ? GROUP BY 1",
+                (periodo, tramo_inicio.isoformat()[:largo], tramo_fin.isoformat()[:largo] + '~')
+            )
+            for hora, ingresos, egresos in cursor.fetchall():
+                acumulado = horas.setdefault(hora, [0, 0])
+                acumulado[0] += ingresos
+                acumulado[1] += egresos
+        return [(hora, ingresos, egresos) for hora, (ingresos, egresos) in sorted(horas.items())]
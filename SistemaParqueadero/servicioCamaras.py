@@ -0,0 +1,253 @@
+import cv2
+import logging
+import threading
+import time
+
+# ******************** CÁMARAS COMPARTIDAS ********************
+def normalizar_fuente(fuente):
+    """'0' -> 0 para índices de dispositivo; rutas y URLs (rtsp://...) quedan como texto"""
+    if isinstance(fuente, str) and fuente.strip().isdigit():
+        return int(fuente)
+    return fuente
+
+
+class CamaraCompartida:
+    """Un dispositivo abierto una sola vez; un hilo lee frames y publica siempre el último"""
+    def __init__(self, nombre, fuente, mantener_abierta=60.0, reintento_max=5.0, fallos_reconexion=30):
+        self.nombre = nombre
+        self.fuente = normalizar_fuente(fuente)
+        # Segundos que el dispositivo sigue abierto después de que se va el último suscriptor
+        self.mantener_abierta = mantener_abierta
+        self.reintento_max = reintento_max
+        self.fallos_reconexion = fallos_reconexion
+
+        self.condicion = threading.Condition()
+        self.frame = None
+        self.secuencia = 0
+        self.referencias = 0
+        self.permanente = False
+        self.conectada = False
+        self.reconexiones = 0
+        self.ultimo_uso = time.time()
+        self.detenido = False
+        self.hilo = None
+
+    def adquirir(self):
+        with self.condicion:
+            self.referencias += 1
+            self.ultimo_uso = time.time()
+            self._asegurar_hilo()
+
+    def liberar(self):
+        with self.condicion:
+            self.referencias = max(self.referencias - 1, 0)
+            self.ultimo_uso = time.time()
+
+    def precalentar(self):
+        """Abre el dispositivo y lo mantiene abierto aunque no haya suscriptores"""
+        with self.condicion:
+            self.permanente = True
+            self._asegurar_hilo()
+
+    def cerrar(self):
+        with self.condicion:
+            self.detenido = True
+            self.permanente = False
+            self.condicion.notify_all()
+            hilo = self.hilo
+        if hilo is not None:
+            hilo.join(timeout=2)
+
+    def esperar_frame(self, ultima_secuencia, timeout):
+        """Bloquea hasta que haya un frame más nuevo que ultima_secuencia"""
+        limite = time.time() + timeout
+        with self.condicion:
+            while self.secuencia <= ultima_secuencia and not self.detenido:
+                restante = limite - time.time()
+                if restante <= 0:
+                    return None, ultima_secuencia
+                self.condicion.wait(restante)
+            if self.secuencia <= ultima_secuencia:
+                return None, ultima_secuencia
+            return self.frame, self.secuencia
+
+    def _asegurar_hilo(self):
+        if self.hilo is None:
+            self.detenido = False
+            self.hilo = threading.Thread(target=self._capturar, name=f"camara-{self.nombre}", daemon=True)
+            self.hilo.start()
+
+    def _en_uso(self):
+        with self.condicion:
+            en_uso = not self.detenido and (
+                self.permanente or self.referencias > 0
+                or time.time() - self.ultimo_uso < self.mantener_abierta
+            )
+            if not en_uso:
+                # Se decide bajo el mismo lock que adquirir(): un suscriptor nuevo arranca otro hilo
+                self.hilo = None
+            return en_uso
+
+    def _abrir(self):
+        cap = cv2.VideoCapture(self.fuente)
+        if cap.isOpened():
+            return cap
+        cap.release()
+        return None
+
+    def _capturar(self):
+        cap = None
+        espera = 0.5
+        fallos = 0
+        try:
+            while self._en_uso():
+                if cap is None:
+                    cap = self._abrir()
+                    if cap is None:
+                        logging.error(f"No se pudo abrir la cámara '{self.nombre}' ({self.fuente}), reintentando en {espera:.1f}s")
+                        time.sleep(espera)
+                        espera = min(espera * 2, self.reintento_max)
+                        continue
+                    if self.conectada is False and self.secuencia > 0:
+                        self.reconexiones += 1
+                    self.conectada = True
+                    espera = 0.5
+                    fallos = 0
+
+                ret, frame = cap.read()
+                if not ret:
+                    fallos += 1
+                    if fallos >= self.fallos_reconexion:
+                        # Cámara desconectada o stream caído: se libera y se vuelve a abrir
+                        logging.error(f"Cámara '{self.nombre}' sin frames, reconectando")
+                        cap.release()
+                        cap = None
+                        self.conectada = False
+                    else:
+                        time.sleep(0.01)
+                    continue
+                fallos = 0
+                # Los suscriptores comparten el mismo arreglo: que nadie lo modifique por accidente
+                frame.flags.writeable = False
+                with self.condicion:
+                    self.frame = frame
+                    self.secuencia += 1
+                    self.condicion.notify_all()
+        except Exception as e:
+            logging.error(f"Error en la cámara '{self.nombre}': {e}")
+        finally:
+            if cap is not None:
+                cap.release()
+            with self.condicion:
+                # Si terminó por un error, el próximo adquirir() o precalentar() arranca otro hilo.
+                # Si _en_uso() ya lo soltó puede haber otro corriendo: ese no se toca
+                if self.hilo in (None, threading.current_thread()):
+                    self.hilo = None
+                    self.conectada = False
+                    self.frame = None
+                self.condicion.notify_all()
+
+
+class SuscripcionCamara:
+    """Vista de un suscriptor sobre una cámara compartida, con la misma interfaz que VideoCapture.read()"""
+    # La cámara se reconecta sola: un read() fallido no significa fin de la fuente
+    reconecta = True
+
+    def __init__(self, camara, timeout=3.0):
+        self.camara = camara
+        self.timeout = timeout
+        self.secuencia = 0
+        self.activa = True
+        camara.adquirir()
+
+    def read(self, timeout=None):
+        """Devuelve (True, frame) con un frame que este suscriptor aún no vio, o (False, None).
+
+        El frame es de sólo lectura porque lo comparten todos los suscriptores; para dibujar
+        sobre él hay que usar frame.copy().
+        """
+        if not self.activa:
+            return False, None
+        frame, self.secuencia = self.camara.esperar_frame(
+            self.secuencia, self.timeout if timeout is None else timeout
+        )
+        if frame is None and self.camara.detenido:
+            # La cámara se cerró (por ejemplo, se le cambió la fuente): para este suscriptor
+            # la fuente terminó y no se va a reconectar
+            self.release()
+        return frame is not None, frame
+
+    def isOpened(self):
+        return self.activa and self.camara.conectada
+
+    def release(self):
+        if self.activa:
+            self.activa = False
+            self.camara.liberar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CameraManager:
+    """Dueño de las cámaras con nombre (entrada, salida...) que comparten todas las funciones de la app"""
+    def __init__(self, fuentes=None, mantener_abierta=60.0):
+        self.mantener_abierta = mantener_abierta
+        self.lock = threading.Lock()
+        self.camaras = {}
+        self.configurar(fuentes or {"principal": 0})
+
+    def configurar(self, fuentes):
+        """Registra las cámaras {nombre: fuente}; una cámara cuya fuente cambió se vuelve a abrir"""
+        reemplazadas = []
+        with self.lock:
+            for nombre, fuente in fuentes.items():
+                actual = self.camaras.get(nombre)
+                if actual is not None and actual.fuente == normalizar_fuente(fuente):
+                    continue
+                if actual is not None:
+                    reemplazadas.append(actual)
+                self.camaras[nombre] = CamaraCompartida(nombre, fuente, self.mantener_abierta)
+        # cerrar() espera al hilo lector: fuera del lock, para no frenar a los demás
+        for camara in reemplazadas:
+            camara.cerrar()
+
+    def nombres(self):
+        with self.lock:
+            return list(self.camaras)
+
+    def suscribir(self, nombre="principal", timeout=3.0):
+        with self.lock:
+            camara = self.camaras.get(nombre)
+        if camara is None:
+            raise KeyError(f"No hay una cámara configurada con el nombre '{nombre}'")
+        return SuscripcionCamara(camara, timeout)
+
+    def precalentar(self, nombres=None):
+        with self.lock:
+            camaras = [c for n, c in self.camaras.items() if nombres is None or n in nombres]
+        for camara in camaras:
+            camara.precalentar()
+
+    def estado(self):
+        with self.lock:
+            camaras = list(self.camaras.values())
+        return {
+            c.nombre: {
+                "fuente": c.fuente,
+                "conectada": c.conectada,
+                "suscriptores": c.referencias,
+                "frames": c.secuencia,
+                "reconexiones": c.reconexiones,
+            }
+            for c in camaras
+        }
+
+    def cerrar(self):
+        with self.lock:
+            camaras = list(self.camaras.values())
+        for camara in camaras:
+            camara.cerrar()
@@ -14,6 +14,10 @@ import configparser
 import webbrowser
 from fpdf import FPDF
 import csv
+from indiceOcupacion import OccupancyIndex
+from mapaEspacios import SpaceMap
+from vehiculosActivos import ActiveVehicles
+from listaVehiculos import VehicleList
 
 
 CONFIG_FILE = "config.ini"
@@ -82,6 +86,8 @@ class BaseDatos:
         self.config = config
         self.conexion = None
         self.conexion_local = None
+        self.ocupacion = OccupancyIndex()
+        self.activos = ActiveVehicles()
         self.init_local_db()
         self.pending_sync = []
     
@@ -139,6 +145,10 @@ class BaseDatos:
         )
         ''')
         
+        # Índices para buscar vehículos activos por placa y reportes por fecha
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vehiculos_placa_estado ON vehiculos(placa, estado)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_vehiculos_hora_ingreso ON vehiculos(hora_ingreso)")
+        
         # Crear usuario admin por defecto si no existe
         cursor.execute("SELECT * FROM usuarios WHERE username = 'admin'")
         if not cursor.fetchone():
@@ -156,11 +166,34 @@ class BaseDatos:
                 cursor.execute("INSERT INTO espacios (numero, ocupado) VALUES (?, ?)", (i, False))
         
         self.conexion_local.commit()
+        self.recargar_ocupacion()
+        self.recargar_activos()
+    
+    def recargar_ocupacion(self):
+        """Carga el índice de ocupación desde la tabla espacios (aquí no hay zonas)"""
+        cursor = self._execute_local("SELECT id, numero, NULL, ocupado FROM espacios")
+        self.ocupacion.cargar(cursor.fetchall())
+    
+    def recargar_activos(self):
+        """Carga los vehículos activos; la lista de la pantalla recibe sólo las diferencias"""
+        cursor = self._execute_local(
+            "SELECT placa, tipo, hora_ingreso, espacio_asignado, COALESCE(conductor, '') "
+            "FROM vehiculos WHERE estado = 'activo' ORDER BY hora_ingreso"
+        )
+        self.activos.cargar(cursor.fetchall())
     
     def conectar_mysql(self):
         """Conecta con la base de datos MySQL"""
         if self.config.get_app_config().get('modo_offline') == 'True':
             return False
+        
+        if self.conexion is not None:
+            # Se reutiliza la conexión abierta; si el servidor la cerró, ping intenta reconectar
+            try:
+                self.conexion.ping(reconnect=True, attempts=2, delay=1)
+                return True
+            except mysql.connector.Error:
+                self.conexion = None
             
         try:
             db_config = self.config.get_mysql_config()
@@ -248,6 +281,8 @@ class BaseDatos:
             )
         
         self.conexion_local.commit()
+        self.ocupacion.ocupar(espacio_id)
+        self.activos.poner(placa, (placa, tipo, hora_ingreso, espacio_id, conductor or ''))
         self.add_pending_sync("ingreso", placa)
         return True, f"Vehículo {placa} registrado con éxito. Espacio: {espacio[1]}"
     
@@ -307,6 +342,8 @@ class BaseDatos:
             )
         
         self.conexion_local.commit()
+        self.ocupacion.liberar(espacio_id)
+        self.activos.poner(placa, None)
         self.add_pending_sync("salida", placa)
         
         return True, {
@@ -492,6 +529,8 @@ class BaseDatos:
             
             # Reconectar
             self.conexion_local = sqlite3.connect(LOCAL_DB)
+            self.recargar_ocupacion()
+            self.recargar_activos()
             
             return True
         except Exception as e:
@@ -674,27 +713,9 @@ class AplicacionParqueadero:
         ttk.Label(frame_registro, text="Vehículos Actualmente en el Parqueadero:", font=("Arial", 10, "bold")).grid(
             row=4, column=0, columnspan=3, padx=5, pady=5, sticky=tk.W)
         
-        # Crear tabla con scrollbar
-        self.tree_vehiculos = ttk.Treeview(frame_registro, columns=("Placa", "Tipo", "Ingreso", "Espacio", "Conductor"), show="headings")
-        self.tree_vehiculos.grid(row=5, column=0, columnspan=3, padx=5, pady=5, sticky=tk.NSEW)
-        
-        # Configurar scrollbar
-        scrollbar = ttk.Scrollbar(frame_registro, orient=tk.VERTICAL, command=self.tree_vehiculos.yview)
-        scrollbar.grid(row=5, column=3, sticky=tk.NS)
-        self.tree_vehiculos.configure(yscrollcommand=scrollbar.set)
-        
-        # Configurar columnas
-        self.tree_vehiculos.heading("Placa", text="Placa")
-        self.tree_vehiculos.heading("Tipo", text="Tipo")
-        self.tree_vehiculos.heading("Ingreso", text="Hora de Ingreso")
-        self.tree_vehiculos.heading("Espacio", text="Espacio")
-        self.tree_vehiculos.heading("Conductor", text="Conductor")
-        
-        self.tree_vehiculos.column("Placa", width=100)
-        self.tree_vehiculos.column("Tipo", width=80)
-        self.tree_vehiculos.column("Ingreso", width=150)
-        self.tree_vehiculos.column("Espacio", width=60)
-        self.tree_vehiculos.column("Conductor", width=150)
+        # Lista que aplica sólo los ingresos y salidas, con orden y filtro en memoria
+        self.lista_vehiculos = VehicleList(frame_registro, self.db.activos)
+        self.lista_vehiculos.grid(row=5, column=0, columnspan=4, padx=5, pady=5, sticky=tk.NSEW)
         
         # Hacer que las filas se expandan
         frame_registro.grid_rowconfigure(5, weight=1)
@@ -706,15 +727,10 @@ class AplicacionParqueadero:
         # Visualización de espacios
         ttk.Label(frame_ocupacion, text="Espacios de Estacionamiento", font=("Arial", 10, "bold")).pack(pady=5)
         
-        # Frame para los espacios
-        self.frame_espacios = ttk.Frame(frame_ocupacion)
-        self.frame_espacios.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # Inicializar visualización de espacios
-        self.actualizar_espacios()
+        # Mapa de espacios: se recolorea solo con los cambios del índice de ocupación
+        self.mapa_espacios = SpaceMap(frame_ocupacion, self.db.ocupacion)
+        self.mapa_espacios.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Cargar datos iniciales
-        self.actualizar_lista_vehiculos()
     
     def configurar_tab_reportes(self):
         """Configura la pestaña de reportes"""
@@ -950,9 +966,7 @@ class AplicacionParqueadero:
             self.entry_placa.delete(0, tk.END)
             self.entry_conductor.delete(0, tk.END)
             self.combo_tipo.current(0)
-            # Actualizar lista y espacios
-            self.actualizar_lista_vehiculos()
-            self.actualizar_espacios()
+            # La lista y el mapa de espacios se enteran solos
             self.actualizar_estado()
             # Generar ticket
             self.generar_ticket_ingreso(placa, tipo, conductor)
@@ -975,9 +989,7 @@ class AplicacionParqueadero:
             self.mostrar_factura(datos)
             # Limpiar campos
             self.entry_placa.delete(0, tk.END)
-            # Actualizar lista y espacios
-            self.actualizar_lista_vehiculos()
-            self.actualizar_espacios()
+            # La lista y el mapa de espacios se enteran solos
             self.actualizar_estado()
         else:
             messagebox.showerror("Error", datos)
@@ -1107,56 +1119,8 @@ class AplicacionParqueadero:
             messagebox.showerror("Error", f"Error al generar el ticket: {str(e)}")
     
     def actualizar_lista_vehiculos(self):
-        """Actualiza la lista de vehículos en el parqueadero"""
-        # Limpiar lista actual
-        for item in self.tree_vehiculos.get_children():
-            self.tree_vehiculos.delete(item)
-        
-        # Obtener vehículos activos
-        vehiculos = self.db.get_vehiculos_activos()
-        
-        # Llenar la tabla
-        for vehiculo in vehiculos:
-            # Formatear datos para la tabla
-            id_vehiculo = vehiculo[0]
-            placa = vehiculo[1]
-            tipo = vehiculo[2]
-            hora_ingreso = vehiculo[3]
-            espacio = vehiculo[5]
-            conductor = vehiculo[6] or ""
-            
-            self.tree_vehiculos.insert("", tk.END, values=(placa, tipo, hora_ingreso, espacio, conductor))
-    
-    def actualizar_espacios(self):
-        """Actualiza la visualización de espacios"""
-        # Limpiar frame de espacios
-        for widget in self.frame_espacios.winfo_children():
-            widget.destroy()
-        
-        # Obtener configuración
-        max_espacios = int(self.config.get_app_config().get('max_espacios', 50))
-        
-        # Consultar espacios ocupados
-        cursor = self.db._execute_local("SELECT id, numero, ocupado FROM espacios ORDER BY numero")
-        espacios = cursor.fetchall()
-        
-        # Crear botones para cada espacio
-        row, col = 0, 0
-        for espacio in espacios:
-            id_espacio, numero, ocupado = espacio
-            
-            # Color según estado
-            color = "#FF6B6B" if ocupado else "#4CAF50"
-            
-            # Crear botón
-            btn = tk.Button(self.frame_espacios, text=str(numero), width=4, height=2, bg=color)
-            btn.grid(row=row, column=col, padx=2, pady=2)
-            
-            # Actualizar posición para el siguiente botón
-            col += 1
-            if col > 9:  # 10 columnas máximo
-                col = 0
-                row += 1
+        """Relee los vehículos activos; la lista aplica sólo las diferencias"""
+        self.db.recargar_activos()
     
     def actualizar_estado(self):
         """Actualiza la barra de estado"""
@@ -1398,8 +1362,6 @@ class AplicacionParqueadero:
             
             messagebox.showinfo("Éxito", "Configuración guardada correctamente")
             
-            # Actualizar espacios si es necesario
-            self.actualizar_espacios()
             self.actualizar_estado()
             
         except ValueError as e:
@@ -1,8 +1,7 @@
 import cv2
 import pytesseract
 import sqlite3
-import mysql.connector
-from datetime import datetime
+from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog, filedialog
 from PIL import Image, ImageTk
@@ -19,6 +18,26 @@ from fpdf import FPDF
 import csv
 import time
 import shutil
+import queue
+import json
+import uuid
+from contextlib import closing, contextmanager
+from reconocimientoPlacas import (
+    PlateRecognizer, PlateCapturePipeline, PerfilCamara, CalibradorROI, OCR_BACKENDS,
+    crear_ocr_backend, parsear_roi, formatear_roi
+)
+from servicioCamaras import CameraManager
+from ejecutorTareas import TaskExecutor, TareaRechazada, ESPERA_CIERRE_S
+from poolMySQL import MySQLPool, ABIERTO
+from replicacion import Replicador, crear_registro
+from indiceOcupacion import OccupancyIndex, ZONA_DEFECTO
+from archivoMovimientos import MovementArchive, ARCHIVO_DIAS_DEFECTO
+from resumenReportes import ReportRollups
+from historialVirtual import VirtualHistory, HISTORIAL_BLOQUE, indice_por_bloques
+from mapaEspacios import SpaceMap
+from vehiculosActivos import ActiveVehicles
+from listaVehiculos import VehicleList
+from panelEstado import StatusPanel, PANEL_REFRESCOS_DEFECTO, PANEL_VENTANA_MIN
 
 # ******************** CONFIGURACIÓN INICIAL ********************
 logging.basicConfig(
@@ -31,6 +50,86 @@ logging.basicConfig(
 CONFIG_FILE = "configs.ini"
 LOCAL_DB = "estacionamientos.db"
 SYNC_INTERVAL = 300  # 5 minutos
+MANTENIMIENTO_BD_INTERVAL = 600  # 10 minutos
+REPLICACION_INTERVAL = 5  # segundos
+SYNC_LOTE = 500  # entradas del outbox por transacción en MySQL
+CONSUMIDOR_MYSQL = 'mysql'
+# Las vistas previas de cámara comparten clave: HighGUI no se maneja desde dos hilos a la vez
+CLAVE_VISTA_PREVIA = "vista_previa"
+VENTANA_ROSTRO_LOGIN = "Reconocimiento Facial (Presione 'q' para salir)"
+VENTANA_PLACA = "Captura de Placa (Presione ESPACIO para capturar)"
+VENTANA_ROSTRO = "Captura de Rostro (ESPACIO captura, ESC sale)"
+POOL_MYSQL_DEFECTO = {
+    'tamano': '4',
+    'timeout': '5',
+    'fallos_circuito': '3',
+    'reintento_max': '60',
+    'ping_intervalo': '30'
+}
+
+# Perfiles de almacenamiento de la base local; la sección [SQLITE] de configs.ini guarda el elegido
+PERFILES_SQLITE = {
+    # Lo que SQLite usa si no se le indica nada
+    'predeterminado': {
+        'journal_mode': 'DELETE', 'synchronous': 'FULL', 'mmap_size': '0',
+        'cache_size': '-2000', 'temp_store': 'DEFAULT', 'busy_timeout': '5000'
+    },
+    # WAL: los reportes leen mientras la puerta escribe; NORMAL sólo sincroniza en los checkpoints
+    'rendimiento': {
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'mmap_size': '268435456',
+        'cache_size': '-65536', 'temp_store': 'MEMORY', 'busy_timeout': '5000'
+    },
+    # WAL con fsync en cada commit: no se pierde la última transacción si se corta la luz
+    'seguro': {
+        'journal_mode': 'WAL', 'synchronous': 'FULL', 'mmap_size': '268435456',
+        'cache_size': '-65536', 'temp_store': 'MEMORY', 'busy_timeout': '5000'
+    },
+}
+PERFIL_SQLITE_DEFECTO = 'rendimiento'
+VALORES_PRAGMA = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+
+def validar_perfil_sqlite(perfil):
+    """Normaliza los valores del perfil; los PRAGMA no admiten parámetros, así que no pasa nada sin validar"""
+    validado = {}
+    for clave, defecto in PERFILES_SQLITE[PERFIL_SQLITE_DEFECTO].items():
+        valor = str(perfil.get(clave, defecto)).strip().upper()
+        if clave in VALORES_PRAGMA:
+            if valor not in VALORES_PRAGMA[clave]:
+                raise ValueError(f"{clave} debe ser uno de: {', '.join(VALORES_PRAGMA[clave])}")
+        else:
+            valor = str(int(valor))
+            if clave in ('mmap_size', 'busy_timeout') and int(valor) < 0:
+                raise ValueError(f"{clave} no puede ser negativo")
+        validado[clave] = valor
+    return validado
+
+def aplicar_perfil_sqlite(conn, perfil):
+    conn.execute(f"PRAGMA busy_timeout = {perfil['busy_timeout']}")
+    modo = conn.execute(f"PRAGMA journal_mode = {perfil['journal_mode']}").fetchone()[0]
+    if modo.upper() != perfil['journal_mode']:
+        # Pasar de WAL a otro modo requiere que nadie más tenga abierta la base
+        logging.warning(f"SQLite sigue en journal_mode={modo}, no se pudo cambiar a {perfil['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {perfil['synchronous']}")
+    conn.execute(f"PRAGMA mmap_size = {perfil['mmap_size']}")
+    conn.execute(f"PRAGMA cache_size = {perfil['cache_size']}")
+    conn.execute(f"PRAGMA temp_store = {perfil['temp_store']}")
+
+def parametros_pool_mysql(datos):
+    """Sección [MYSQL_POOL] -> argumentos de MySQLPool; lanza ValueError si un valor no es válido"""
+    parametros = {
+        'tamano': int(datos['tamano']),
+        'timeout_espera': float(datos['timeout']),
+        'fallos_circuito': int(datos['fallos_circuito']),
+        'reintento_max': float(datos['reintento_max']),
+        'ping_intervalo': float(datos['ping_intervalo'])
+    }
+    if parametros['tamano'] < 1 or parametros['fallos_circuito'] < 1:
+        raise ValueError("tamano y fallos_circuito deben ser al menos 1")
+    return parametros
 
 class Config:
     def __init__(self):
@@ -50,7 +149,8 @@ class Config:
                 'max_espacios': '50',
                 'ruta_reportes': './reportes',
                 'modo_offline': 'False',
-                'modelo_lbph': './modelos/lbph_model.xml'
+                'modelo_lbph': './modelos/lbph_model.xml',
+                'ocr_backend': 'auto'
             }
             self.config['DATABASE'] = {
                 'host': 'localhost',
@@ -58,6 +158,26 @@ class Config:
                 'password': '',
                 'database': 'estacionamiento'
             }
+            self.config['MYSQL_POOL'] = dict(POOL_MYSQL_DEFECTO)
+            self.config['REPLICACION'] = {
+                'activa': 'False',
+                'registro': 'mysql',
+                'intervalo': str(REPLICACION_INTERVAL)
+            }
+            self.config['ARCHIVO'] = {
+                'dias': str(ARCHIVO_DIAS_DEFECTO)
+            }
+            self.config['SQLITE'] = dict(
+                PERFILES_SQLITE[PERFIL_SQLITE_DEFECTO],
+                perfil=PERFIL_SQLITE_DEFECTO,
+                mantenimiento_intervalo=str(MANTENIMIENTO_BD_INTERVAL)
+            )
+            self.config['CAMARA_PRINCIPAL'] = {
+                'fuente': '0',
+                'roi': '0,0,1,1',
+                'placa_ancho_min': '0.04',
+                'placa_ancho_max': '1'
+            }
             self.save_config()
             
             if not os.path.exists(self.config['SETTINGS']['ruta_reportes']):
@@ -69,7 +189,10 @@ class Config:
     
     def get_tesseract_path(self):
         return self.config['SETTINGS']['tesseract_path']
-    
+
+    def get_ocr_backend(self):
+        return self.config['SETTINGS'].get('ocr_backend', 'auto')
+
     def get_tarifas(self):
         return {
             'auto': float(self.config['SETTINGS']['tarifa_auto']),
@@ -80,17 +203,136 @@ class Config:
     def get_tiempo_apertura(self):
         return int(self.config['SETTINGS']['tiempo_apertura_puerta'])
     
+    def get_replicacion(self):
+        """{'registro', 'intervalo'} si [REPLICACION] está activa; None si esta puerta trabaja sola"""
+        if not self.config.has_section('REPLICACION'):
+            return None
+        datos = self.config['REPLICACION']
+        if datos.get('activa', 'False') != 'True':
+            return None
+        return {
+            'registro': datos.get('registro', 'mysql'),
+            'intervalo': float(datos.get('intervalo', REPLICACION_INTERVAL))
+        }
+    
+    def get_dias_archivo(self):
+        """Días que un movimiento cerrado queda en la tabla principal; 0 = no archivar"""
+        if not self.config.has_section('ARCHIVO'):
+            return ARCHIVO_DIAS_DEFECTO
+        return int(self.config['ARCHIVO'].get('dias', ARCHIVO_DIAS_DEFECTO))
+    
+    def get_nodo_id(self):
+        """Identificador de esta puerta en el servidor central; se genera la primera vez"""
+        if not self.config['SETTINGS'].get('nodo_id'):
+            self.config['SETTINGS']['nodo_id'] = uuid.uuid4().hex[:12]
+            self.save_config()
+        return self.config['SETTINGS']['nodo_id']
+    
     def get_max_espacios(self):
         return int(self.config['SETTINGS']['max_espacios'])
     
+    def get_zonas(self):
+        """{zona: espacios} de la sección [ZONAS]; sin ella todos los espacios son de una sola zona"""
+        if not self.config.has_section('ZONAS') or not self.config['ZONAS']:
+            return {ZONA_DEFECTO: self.get_max_espacios()}
+        return {zona: int(cantidad) for zona, cantidad in self.config['ZONAS'].items()}
+    
     def get_ruta_reportes(self):
         return self.config['SETTINGS']['ruta_reportes']
     
     def get_modo_offline(self):
         return self.config['SETTINGS']['modo_offline'] == 'True'
     
+    def get_refrescos_panel(self):
+        """Redibujos por segundo del panel de estado como máximo"""
+        return max(float(self.config['SETTINGS'].get('refrescos_panel', PANEL_REFRESCOS_DEFECTO)), 0.1)
+    
     def get_mysql_config(self):
         return dict(self.config['DATABASE'])
+
+    def get_pool_mysql(self):
+        """Parámetros de MySQLPool; sin sección [MYSQL_POOL] se usan los valores por defecto"""
+        datos = dict(POOL_MYSQL_DEFECTO)
+        if self.config.has_section('MYSQL_POOL'):
+            datos.update(self.config['MYSQL_POOL'])
+        try:
+            return parametros_pool_mysql(datos)
+        except ValueError as e:
+            logging.error(f"Configuración inválida en [MYSQL_POOL]: {e}")
+            return parametros_pool_mysql(POOL_MYSQL_DEFECTO)
+
+    def get_camaras(self):
+        """Nombres de las cámaras configuradas en secciones [CAMARA_<NOMBRE>]"""
+        return [s[len('CAMARA_'):].lower() for s in self.config.sections() if s.startswith('CAMARA_')]
+
+    def get_fuentes_camaras(self):
+        """{nombre: fuente} de cada cámara; la fuente es un índice de dispositivo, un video o una URL"""
+        fuentes = {
+            nombre: self.config['CAMARA_' + nombre.upper()].get('fuente', '0')
+            for nombre in self.get_camaras()
+        }
+        return fuentes or {'principal': '0'}
+
+    def get_perfil_sqlite(self):
+        """Pragmas de la base local; sin sección [SQLITE] se usa el perfil por defecto"""
+        perfil = dict(PERFILES_SQLITE[PERFIL_SQLITE_DEFECTO])
+        if self.config.has_section('SQLITE'):
+            perfil.update(self.config['SQLITE'])
+        try:
+            return validar_perfil_sqlite(perfil)
+        except ValueError as e:
+            logging.error(f"Configuración inválida en [SQLITE]: {e}")
+            return validar_perfil_sqlite(PERFILES_SQLITE[PERFIL_SQLITE_DEFECTO])
+
+    def get_nombre_perfil_sqlite(self):
+        if not self.config.has_section('SQLITE'):
+            return PERFIL_SQLITE_DEFECTO
+        return self.config['SQLITE'].get('perfil', 'personalizado')
+
+    def get_intervalo_mantenimiento(self):
+        if not self.config.has_section('SQLITE'):
+            return MANTENIMIENTO_BD_INTERVAL
+        return int(self.config['SQLITE'].get('mantenimiento_intervalo', MANTENIMIENTO_BD_INTERVAL))
+
+    def set_perfil_sqlite(self, nombre, perfil, intervalo):
+        if not self.config.has_section('SQLITE'):
+            self.config.add_section('SQLITE')
+        self.config['SQLITE']['perfil'] = nombre
+        for clave, valor in perfil.items():
+            self.config['SQLITE'][clave] = valor
+        self.config['SQLITE']['mantenimiento_intervalo'] = str(intervalo)
+        self.save_config()
+
+    def get_camara_rostros(self):
+        return self.config['SETTINGS'].get('camara_rostros', 'principal')
+
+    def get_camara(self, nombre='principal'):
+        """Perfil de ROI y tamaño de placa de una cámara; sin sección se analiza el frame completo"""
+        seccion = 'CAMARA_' + nombre.upper()
+        if not self.config.has_section(seccion):
+            return PerfilCamara(nombre)
+        datos = self.config[seccion]
+        try:
+            return PerfilCamara(
+                nombre,
+                roi=parsear_roi(datos.get('roi', '0,0,1,1')),
+                placa_ancho_min=float(datos.get('placa_ancho_min', '0.04')),
+                placa_ancho_max=float(datos.get('placa_ancho_max', '1'))
+            )
+        except ValueError as e:
+            logging.error(f"Configuración inválida en [{seccion}]: {e}")
+            return PerfilCamara(nombre)
+
+    def set_roi_camara(self, perfil, fuente=None):
+        seccion = 'CAMARA_' + perfil.nombre.upper()
+        if not self.config.has_section(seccion):
+            self.config.add_section(seccion)
+        if fuente is not None:
+            self.config[seccion]['fuente'] = str(fuente)
+        self.config[seccion]['roi'] = formatear_roi(perfil.roi)
+        self.config[seccion]['placa_ancho_min'] = f"{perfil.placa_ancho_min:g}"
+        self.config[seccion]['placa_ancho_max'] = f"{perfil.placa_ancho_max:g}"
+        self.save_config()
     
     def update_config(self, section, key, value):
         self.config[section][key] = str(value)
@@ -103,59 +345,7 @@ class Config:
         self.save_config()
         return new_mode
 
-# ******************** RECONOCIMIENTO DE PLACAS ********************
-class PlateRecognizer:
-    @staticmethod
-    def preprocess_image(img):
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5,5), 0)
-        edged = cv2.Canny(blur, 50, 200)
-        return edged
-    
-    @staticmethod
-    def find_plate_contour(edged):
-        contours, _ = cv2.findContours(edged, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
-        
-        for contour in contours:
-            perimeter = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-            if len(approx) == 4:
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = w / h
-                if 2 <= aspect_ratio <= 5:
-                    return approx
-        return None
-    
-    @staticmethod
-    def extract_plate(img, contour):
-        mask = np.zeros(img.shape[:2], np.uint8)
-        cv2.drawContours(mask, [contour], 0, 255, -1)
-        return cv2.bitwise_and(img, img, mask=mask)
-    
-    @staticmethod
-    def read_plate(image_path):
-        try:
-            img = cv2.imread(image_path)
-            edged = PlateRecognizer.preprocess_image(img)
-            plate_contour = PlateRecognizer.find_plate_contour(edged)
-            
-            if plate_contour is not None:
-                plate_img = PlateRecognizer.extract_plate(img, plate_contour)
-                x, y, w, h = cv2.boundingRect(plate_contour)
-                plate_cropped = img[y:y+h, x:x+w]
-            else:
-                plate_cropped = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            _, thresh = cv2.threshold(plate_cropped, 150, 255, cv2.THRESH_BINARY)
-            return pytesseract.image_to_string(
-                thresh, 
-                config='--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-            ).strip().replace(" ", "").replace("\n", "")
-        except Exception as e:
-            logging.error(f"Error en OCR: {e}")
-            return ""
-
+# ******************** RECONOCIMIENTO FACIAL ********************
 class FaceRecognizer:
     def __init__(self, model_path):
         self.model_path = model_path
@@ -182,19 +372,284 @@ class FaceRecognizer:
         self.recognizer.train(faces, np.array(labels))
         self.recognizer.save(self.model_path)
 
+# ******************** SINCRONIZACIÓN ********************
+# Columnas que se envían al servidor; `nodo` lo agrega cada puerta al enviar
+COLUMNAS_SYNC = {
+    'movimientos': (
+        'uid', 'nodo', 'placa', 'tipo_vehiculo', 'hora_entrada', 'hora_salida', 'espacio_asignado',
+        'conductor', 'tarifa', 'tiempo_estacionado', 'total_cobrado', 'estado', 'sync_version'
+    ),
+    'reportes': ('nodo', 'fecha', 'ingresos', 'egresos', 'total_cobrado'),
+}
+# Clave de la fila en la base local (la que guarda el outbox) y clave única en el servidor
+CLAVES_SYNC = {'movimientos': 'uid', 'reportes': 'fecha'}
+CLAVES_SERVIDOR = {'movimientos': ('uid',), 'reportes': ('nodo', 'fecha')}
+
+ESQUEMA_MYSQL = (
+    """CREATE TABLE IF NOT EXISTS movimientos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        uid CHAR(32) NOT NULL UNIQUE,
+        nodo VARCHAR(64) NOT NULL,
+        placa VARCHAR(20),
+        tipo_vehiculo VARCHAR(20),
+        hora_entrada DATETIME,
+        hora_salida DATETIME NULL,
+        espacio_asignado INT,
+        conductor VARCHAR(100),
+        tarifa DECIMAL(10,2),
+        tiempo_estacionado DOUBLE,
+        total_cobrado DECIMAL(10,2),
+        estado VARCHAR(10),
+        sync_version INT NOT NULL DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS reportes (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nodo VARCHAR(64) NOT NULL,
+        fecha DATE NOT NULL,
+        ingresos INT DEFAULT 0,
+        egresos INT DEFAULT 0,
+        total_cobrado DECIMAL(10,2) DEFAULT 0,
+        UNIQUE KEY uq_reportes_nodo_fecha (nodo, fecha)
+    )""",
+)
+
+def sentencia_upsert_mysql(tabla):
+    """INSERT ... ON DUPLICATE KEY UPDATE para executemany: mysql.connector lo envía como un solo INSERT multi-fila.
+
+    Reenviar una fila nunca deja el servidor peor: un movimiento sólo se pisa con una
+    sync_version igual o mayor, y los totales diarios de cada puerta sólo crecen.
+    """
+    columnas = COLUMNAS_SYNC[tabla]
+    datos = [c for c in columnas if c not in CLAVES_SERVIDOR[tabla]]
+    if tabla == 'movimientos':
+        # sync_version va al final: MySQL evalúa las asignaciones en orden
+        actualizar = [
+            f"{c} = IF(VALUES(sync_version) >= sync_version, VALUES({c}), {c})"
+            for c in datos if c != 'sync_version'
+        ]
+        actualizar.append("sync_version = GREATEST(sync_version, VALUES(sync_version))")
+    else:
+        actualizar = [f"{c} = GREATEST({c}, VALUES({c}))" for c in datos]
+    return (
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))}) "
+        f"ON DUPLICATE KEY UPDATE {', '.join(actualizar)}"
+    )
+
+def valores_sync(tabla, fila, nodo):
+    # Un movimiento conserva la puerta por la que entró aunque la salida la registre otra
+    fila = dict(fila)
+    if not fila.get('nodo'):
+        fila['nodo'] = nodo
+    return tuple(fila.get(c) for c in COLUMNAS_SYNC[tabla])
+
+def _version_fila(fila):
+    """Orden total entre dos versiones del mismo movimiento; a igual sync_version desempata el contenido"""
+    return (
+        fila.get('sync_version') or 0, fila.get('estado') or '', fila.get('hora_salida') or '',
+        fila.get('espacio_asignado') or 0, fila.get('nodo') or ''
+    )
+
+TIPOS_VEHICULO = ("Auto", "Moto", "Camioneta")
+ESTADOS_MOVIMIENTO = ("activo", "salido", "duplicado")
+# Columnas que muestra el historial; (hora_entrada, id) es su clave de paginación
+HISTORIAL_COLUMNAS = ('id', 'placa', 'tipo_vehiculo', 'hora_entrada', 'hora_salida', 'espacio_asignado',
+                      'conductor', 'total_cobrado', 'estado')
+# Índice UNIQUE parcial sobre las placas activas que ingresaron por esta puerta
+INDICE_PLACA_UNICA = 'idx_movimientos_activos_placa_puerta'
+# Una fila de ActiveVehicles: (placa, tipo, hora_entrada, espacio, conductor)
+COLUMNAS_ACTIVOS = "placa, tipo_vehiculo, hora_entrada, espacio_asignado, COALESCE(conductor, '')"
+
+# Consultas frecuentes y los índices que les sirven; verificar_planes_consulta() avisa si un
+# cambio de esquema o de consulta las deja recorriendo la tabla completa
+PLANES_ESPERADOS = (
+    ("SELECT 1 FROM movimientos WHERE placa = ? AND estado = 'activo'", ('ABC123',),
+     ('idx_movimientos_activos_placa', 'idx_placa')),
+    ("SELECT * FROM movimientos WHERE estado = 'activo'", (), ('idx_movimientos_estado_entrada',)),
+    ("SELECT * FROM movimientos WHERE hora_entrada BETWEEN ? AND ?",
+     ('2024-01-01 00:00:00', '2024-01-01 23:59:59'), ('idx_movimientos_hora_entrada',)),
+    ("SELECT 1 FROM movimientos m WHERE m.espacio_asignado = ? AND m.estado = 'activo'", (1,),
+     ('idx_movimientos_activos_espacio',)),
+    ("SELECT * FROM movimientos WHERE uid = ?", ('0' * 32,), ('idx_movimientos_uid',)),
+    ("SELECT id FROM movimientos WHERE hora_entrada <= ? AND (hora_entrada < ? OR id < ?) "
+     "ORDER BY hora_entrada DESC, id DESC LIMIT 200", ('2024-01-01 00:00:00', '2024-01-01 00:00:00', 1),
+     ('idx_movimientos_hora_entrada',)),
+    ("SELECT * FROM reportes WHERE fecha BETWEEN ? AND ? ORDER BY fecha", ('2024-01-01', '2024-01-31'),
+     ('sqlite_autoindex_reportes_1',)),
+    ("SELECT COUNT(*) FROM movimientos WHERE hora_entrada >= ? AND estado <> 'duplicado'",
+     ('2024-01-01 00:00:00',), ('idx_movimientos_hora_entrada',)),
+    ("SELECT COUNT(*) FROM movimientos WHERE hora_salida >= ? AND estado <> 'duplicado'",
+     ('2024-01-01 00:00:00',), ('idx_hora_salida',)),
+)
+
+def cerrar_ventana(nombre):
+    """Cierra sólo esa ventana de HighGUI; destroyAllWindows cerraría la de otra vista previa"""
+    try:
+        cv2.destroyWindow(nombre)
+    except cv2.error:
+        # Nunca llegó a abrirse (la cámara falló antes del primer frame)
+        pass
+
 # ******************** BASE DE DATOS ********************
+class PoolSQLite:
+    """Conexiones a la base local: una de lectura por hilo y un único escritor serializado.
+
+    Con WAL los lectores no bloquean al escritor ni entre sí; las escrituras pasan todas por
+    la misma conexión bajo un lock, así que nunca compiten por el bloqueo del archivo.
+    """
+    def __init__(self, db_path, perfil):
+        self.db_path = db_path
+        self.perfil = perfil
+        self.lock_escritura = threading.RLock()
+        self.lock_lectores = threading.Lock()
+        self.local = threading.local()
+        self.lectores = []
+        # Cambia con el perfil o al restaurar: los lectores viejos se reabren en su próximo uso
+        self.generacion = 0
+        self.escritor = self._conectar()
+
+    def _conectar(self, solo_lectura=False):
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False,
+            timeout=int(self.perfil['busy_timeout']) / 1000
+        )
+        aplicar_perfil_sqlite(conn, self.perfil)
+        if solo_lectura:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _lector(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.generacion == self.generacion:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = self._conectar(solo_lectura=True)
+        self.local.conn = conn
+        self.local.generacion = self.generacion
+        with self.lock_lectores:
+            # Las conexiones de hilos que ya terminaron se cierran aquí
+            vivos = []
+            for hilo, lector in self.lectores:
+                if hilo.is_alive() and lector is not conn:
+                    vivos.append((hilo, lector))
+                elif not hilo.is_alive():
+                    lector.close()
+            vivos.append((threading.current_thread(), conn))
+            self.lectores = vivos
+        return conn
+
+    @contextmanager
+    def lectura(self):
+        yield self._lector().cursor()
+
+    @contextmanager
+    def escritura(self):
+        """Una transacción del escritor; si algo falla no queda nada a medias"""
+        with self.lock_escritura:
+            cursor = self.escritor.cursor()
+            # IMMEDIATE toma el bloqueo de escritura al inicio: otra app sobre el mismo
+            # archivo no puede ocupar el mismo espacio entre nuestro SELECT y el UPDATE
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+                self.escritor.commit()
+            except Exception:
+                self.escritor.rollback()
+                raise
+
+    def _cerrar_lectores(self):
+        with self.lock_lectores:
+            for _, lector in self.lectores:
+                lector.close()
+            self.lectores = []
+        self.generacion += 1
+
+    def aplicar_perfil(self, perfil):
+        with self.lock_escritura:
+            # Para salir de WAL el escritor tiene que ser la única conexión abierta
+            self._cerrar_lectores()
+            aplicar_perfil_sqlite(self.escritor, perfil)
+            self.perfil = perfil
+
+    def cerrar(self):
+        with self.lock_escritura:
+            self._cerrar_lectores()
+            if self.escritor is not None:
+                self.escritor.close()
+                self.escritor = None
+
+    def reabrir(self):
+        with self.lock_escritura:
+            self.escritor = self._conectar()
+
+
 class DatabaseManager:
-    def __init__(self, config):
+    def __init__(self, config, db_path=LOCAL_DB, conectar_mysql=None):
         self.config = config
-        self.conn = None
-        self.conn_local = sqlite3.connect(LOCAL_DB, check_same_thread=False)
-        self.cursor_local = self.conn_local.cursor()
-        self.pending_sync = []
+        # Conexiones persistentes al servidor central; conectar_mysql permite usar un stub
+        self.pool_mysql = MySQLPool(
+            config.get_mysql_config(), conectar=conectar_mysql,
+            on_estado=self._estado_mysql, **config.get_pool_mysql()
+        )
+        self.db_path = db_path
+        self.nodo_id = config.get_nodo_id()
+        self.perfil_sqlite = config.get_perfil_sqlite()
+        # El hilo de Tk, los workers y la sincronización leen en paralelo; las escrituras se serializan
+        self.pool = PoolSQLite(db_path, self.perfil_sqlite)
+        self.servidor_preparado = False
+        # Espacios libres sin SQL; se actualiza al confirmar cada transacción que los cambia
+        self.ocupacion = OccupancyIndex()
+        # Vehículos adentro por placa; la lista de la pantalla recibe sólo lo que cambia
+        self.activos = ActiveVehicles()
+        # Movimientos cerrados viejos en tablas por mes; la tabla principal queda chica
+        self.archivo = MovementArchive(self, config.get_dias_archivo())
+        # Totales por hora, día y mes que se actualizan con cada ingreso y salida
+        self.resumenes = ReportRollups(self)
+        self._al_confirmar = []
         self._initialize_db()
+        self.recargar_ocupacion()
+        self.recargar_activos()
         
     def _initialize_db(self):
+        self.migrar()
+        self.archivo.preparar()
+        with self.escritura() as cursor:
+            self._asegurar_placa_unica(cursor)
+            self._datos_iniciales(cursor)
+        for problema in self.verificar_planes_consulta():
+            logging.warning(f"Plan de consulta inesperado: {problema}")
+    
+    # ---- Migraciones del esquema local ----
+    def _migraciones(self):
+        """(versión, descripción, función); PRAGMA user_version guarda la última aplicada"""
+        return [
+            (1, "Esquema inicial", self._migracion_esquema_inicial),
+            (2, "Outbox, uid, sync_version y nodo en movimientos", self._migracion_outbox),
+            (3, "Zonas de espacios", self._migracion_zonas),
+            (4, "Índices de vehículos activos y por hora de entrada", self._migracion_indices_activos),
+            (5, "Catálogo del archivo mensual de movimientos", self._migracion_archivo),
+            (6, "Resúmenes por hora, día y mes", self._migracion_resumenes),
+        ]
+    
+    def version_esquema(self):
+        with self.lectura() as cursor:
+            return cursor.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrar(self):
+        """Lleva la base a la última versión; cada migración corre en su propia transacción"""
+        version = self.version_esquema()
+        for numero, descripcion, migracion in self._migraciones():
+            if numero <= version:
+                continue
+            with self.escritura() as cursor:
+                migracion(cursor)
+                # user_version está en la cabecera del archivo y se confirma con la transacción
+                cursor.execute(f"PRAGMA user_version = {numero}")
+            logging.info(f"Base local migrada a la versión {numero}: {descripcion}")
+    
+    def _migracion_esquema_inicial(self, cursor):
         # Tabla de movimientos (entradas/salidas)
-        self.cursor_local.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS movimientos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 placa TEXT,
@@ -212,7 +667,7 @@ class DatabaseManager:
         ''')
         
         # Tabla de espacios
-        self.cursor_local.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS espacios (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 numero INTEGER UNIQUE NOT NULL,
@@ -221,7 +676,7 @@ class DatabaseManager:
         ''')
         
         # Tabla de usuarios
-        self.cursor_local.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS usuarios (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT UNIQUE NOT NULL,
@@ -231,7 +686,7 @@ class DatabaseManager:
         ''')
         
         # Tabla de reportes
-        self.cursor_local.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS reportes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 fecha TEXT NOT NULL UNIQUE,
@@ -243,179 +698,435 @@ class DatabaseManager:
         ''')
         
         # Crear índices
-        self.cursor_local.execute('CREATE INDEX IF NOT EXISTS idx_placa ON movimientos(placa)')
-        self.cursor_local.execute('CREATE INDEX IF NOT EXISTS idx_hora_salida ON movimientos(hora_salida)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_placa ON movimientos(placa)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_hora_salida ON movimientos(hora_salida)')
+    
+    def _migracion_outbox(self, cursor):
+        # Cambios pendientes de enviar al servidor, en el orden en que ocurrieron
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabla TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                creado TEXT NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                ultimo_error TEXT
+            )
+        ''')
         
+        # Hasta qué seq del outbox llegó cada consumidor
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS outbox_consumidores (
+                nombre TEXT PRIMARY KEY,
+                ultimo_seq INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO outbox_consumidores (nombre) VALUES (?)", (CONSUMIDOR_MYSQL,))
+        
+        # Hasta qué seq de cada puerta remota se aplicaron sus cambios (replicación entre puertas)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS replicacion_cursores (
+                nodo TEXT PRIMARY KEY,
+                ultimo_seq INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Columnas que se agregaron con la sincronización; las bases ya migradas a mano las tienen
+        nueva_uid = self._agregar_columna(cursor, 'movimientos', 'uid', 'TEXT')
+        self._agregar_columna(cursor, 'movimientos', 'sync_version', 'INTEGER NOT NULL DEFAULT 1')
+        self._agregar_columna(cursor, 'movimientos', 'nodo', 'TEXT')
+        cursor.execute("UPDATE movimientos SET nodo = ? WHERE nodo IS NULL", (self.nodo_id,))
+        cursor.execute("UPDATE movimientos SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_movimientos_uid ON movimientos(uid)')
+        
+        if nueva_uid:
+            # Lo que no se sincronizó antes del outbox se encola una vez, para no perderlo
+            cursor.execute("SELECT uid FROM movimientos WHERE pendiente_sync = 1 ORDER BY id")
+            for (uid,) in cursor.fetchall():
+                self._encolar_cambio(cursor, 'movimientos', uid)
+            cursor.execute("SELECT fecha FROM reportes WHERE pendiente_sync = 1 ORDER BY fecha")
+            for (fecha,) in cursor.fetchall():
+                self._encolar_cambio(cursor, 'reportes', fecha)
+    
+    def _migracion_zonas(self, cursor):
+        self._agregar_columna(cursor, 'espacios', 'zona', f"TEXT NOT NULL DEFAULT '{ZONA_DEFECTO}'")
+    
+    def _migracion_indices_activos(self, cursor):
+        # Bases viejas pueden tener la misma placa activa dos veces en esta puerta: queda la primera.
+        # Sólo se corrigen los ingresos propios; los de otras puertas los corrige su dueño
+        cursor.execute(
+            "UPDATE movimientos SET estado = 'duplicado', pendiente_sync = 1, sync_version = sync_version + 1 "
+            "WHERE estado = 'activo' AND nodo = ? AND id NOT IN ("
+            "SELECT MIN(id) FROM movimientos WHERE estado = 'activo' AND nodo = ? GROUP BY placa)",
+            (self.nodo_id, self.nodo_id)
+        )
+        if cursor.rowcount:
+            logging.warning(f"{cursor.rowcount} ingresos duplicados marcados como 'duplicado'")
+            cursor.execute("SELECT uid FROM movimientos WHERE estado = 'duplicado' AND pendiente_sync = 1")
+            for (uid,) in cursor.fetchall():
+                self._encolar_cambio(cursor, 'movimientos', uid)
+            self._recalcular_ocupacion(cursor)
+        # Sin UNIQUE: con varias puertas la réplica puede traer el reingreso de una placa antes que
+        # la salida anterior registrada en una tercera puerta. Los ingresos propios los cubre el
+        # índice de _asegurar_placa_unica, y _resolver_conflictos corrige lo que venga de afuera
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_movimientos_activos_placa ON movimientos(placa) WHERE estado = 'activo'"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_movimientos_activos_espacio "
+            "ON movimientos(espacio_asignado) WHERE estado = 'activo'"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_estado_entrada ON movimientos(estado, hora_entrada)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_movimientos_hora_entrada ON movimientos(hora_entrada)")
+    
+    def _migracion_archivo(self, cursor):
+        # Un mes por fila; la tabla movimientos_AAAA_MM se crea al archivar el primer movimiento
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archivo_meses (
+                mes TEXT PRIMARY KEY,
+                tabla TEXT NOT NULL,
+                filas INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+    
+    def _migracion_resumenes(self, cursor):
+        # inicio es el prefijo de la fecha: 'AAAA-MM-DD HH' (hora), 'AAAA-MM-DD' (día), 'AAAA-MM' (mes)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resumenes (
+                periodo TEXT NOT NULL,
+                inicio TEXT NOT NULL,
+                tipo_vehiculo TEXT NOT NULL,
+                zona TEXT NOT NULL,
+                ingresos INTEGER NOT NULL DEFAULT 0,
+                egresos INTEGER NOT NULL DEFAULT 0,
+                total_cobrado REAL NOT NULL DEFAULT 0,
+                minutos REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (periodo, inicio, tipo_vehiculo, zona)
+            ) WITHOUT ROWID
+        ''')
+        self.resumenes.reconstruir(cursor)
+    
+    def _asegurar_placa_unica(self, cursor):
+        """Índice UNIQUE parcial: una placa activa a lo sumo una vez entre los ingresos de esta puerta.
+
+        Lleva el nodo escrito en la condición, así que se revisa en cada arranque y se rehace si
+        cambió nodo_id. Los movimientos replicados traen el nodo de su puerta y quedan afuera:
+        esos los corrige _resolver_conflictos.
+        """
+        nodo = self.nodo_id.replace("'", "''")
+        sql = (
+            f"CREATE UNIQUE INDEX {INDICE_PLACA_UNICA} ON movimientos(placa) "
+            f"WHERE estado = 'activo' AND nodo = '{nodo}'"
+        )
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (INDICE_PLACA_UNICA,))
+        fila = cursor.fetchone()
+        if fila is not None and fila[0] == sql:
+            return
+        cursor.execute(f"DROP INDEX IF EXISTS {INDICE_PLACA_UNICA}")
+        # Si esta puerta ya tiene la misma placa activa dos veces queda la primera
+        cursor.execute(
+            "SELECT uid, placa FROM movimientos WHERE estado = 'activo' AND nodo = ? AND id NOT IN ("
+            "SELECT MIN(id) FROM movimientos WHERE estado = 'activo' AND nodo = ? GROUP BY placa)",
+            (self.nodo_id, self.nodo_id)
+        )
+        duplicados = cursor.fetchall()
+        for uid, placa in duplicados:
+            logging.warning(f"Placa {placa} activa dos veces en esta puerta: se anula el ingreso {uid}")
+            antes = self.resumenes.fila(cursor, uid)
+            cursor.execute(
+                "UPDATE movimientos SET estado = 'duplicado', pendiente_sync = 1, "
+                "sync_version = sync_version + 1 WHERE uid = ?",
+                (uid,)
+            )
+            self.resumenes.aplicar(cursor, antes, self.resumenes.fila(cursor, uid))
+            self._encolar_cambio(cursor, 'movimientos', uid)
+        if duplicados:
+            self._recalcular_ocupacion(cursor)
+        cursor.execute(sql)
+    
+    def verificar_planes_consulta(self):
+        """EXPLAIN QUERY PLAN de las consultas frecuentes; devuelve las que no usan el índice esperado"""
+        with self.lectura() as cursor:
+            esquema = [fila[0] for fila in cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+                "ORDER BY type = 'index'"
+            )]
+        # Se planifica sobre una copia vacía del esquema: con pocas filas (o las estadísticas
+        # de una base recién creada) SQLite prefiere recorrer la tabla y el chequeo no diría nada
+        problemas = []
+        with closing(sqlite3.connect(':memory:')) as conn:
+            for sql in esquema:
+                conn.execute(sql)
+            for consulta, params, indices in PLANES_ESPERADOS:
+                plan = " | ".join(fila[-1] for fila in conn.execute(f"EXPLAIN QUERY PLAN {consulta}", params))
+                if not any(f"INDEX {indice}" in plan for indice in indices):
+                    problemas.append(f"{consulta} -> {plan} (se esperaba {' o '.join(indices)})")
+        return problemas
+    
+    def _datos_iniciales(self, cursor):
         # Crear usuario admin por defecto si no existe
-        self.cursor_local.execute("SELECT * FROM usuarios WHERE username = 'admin'")
-        if not self.cursor_local.fetchone():
+        cursor.execute("SELECT * FROM usuarios WHERE username = 'admin'")
+        if not cursor.fetchone():
             password_hash = hashlib.sha256("admin123".encode()).hexdigest()
-            self.cursor_local.execute(
+            cursor.execute(
                 "INSERT INTO usuarios (username, password, rol) VALUES (?, ?, ?)", 
                 ('admin', password_hash, 'administrador')
             )
         
         # Crear espacios iniciales si no existen
-        self.cursor_local.execute("SELECT COUNT(*) FROM espacios")
-        count = self.cursor_local.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM espacios")
+        count = cursor.fetchone()[0]
         
         if count == 0:
-            max_espacios = self.config.get_max_espacios()
-            for i in range(1, max_espacios + 1):
-                self.cursor_local.execute("INSERT INTO espacios (numero, ocupado) VALUES (?, ?)", (i, False))
-        
-        self.conn_local.commit()
+            numero = 1
+            for zona, cantidad in self.config.get_zonas().items():
+                for _ in range(cantidad):
+                    cursor.execute(
+                        "INSERT INTO espacios (numero, ocupado, zona) VALUES (?, ?, ?)", (numero, False, zona)
+                    )
+                    numero += 1
     
-    def conectar_mysql(self):
-        if self.config.get_modo_offline():
-            return False
-            
-        try:
-            db_config = self.config.get_mysql_config()
-            self.conn = mysql.connector.connect(
-                host=db_config['host'],
-                user=db_config['user'],
-                password=db_config['password'],
-                database=db_config['database']
-            )
-            return True
-        except mysql.connector.Error as err:
-            logging.error(f"Error al conectar con MySQL: {err}")
+    def _agregar_columna(self, cursor, tabla, columna, definicion):
+        """ALTER TABLE ... ADD COLUMN si la columna no existe; True si se agregó"""
+        cursor.execute(f"PRAGMA table_info({tabla})")
+        if columna in [fila[1] for fila in cursor.fetchall()]:
             return False
+        cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+        return True
+    
+    def aplicar_perfil_sqlite(self, perfil):
+        """Cambia los pragmas de las conexiones abiertas sin reiniciar la aplicación"""
+        perfil = validar_perfil_sqlite(perfil)
+        self.pool.aplicar_perfil(perfil)
+        self.perfil_sqlite = perfil
+    
+    def mantenimiento(self):
+        """Checkpoint del WAL y PRAGMA optimize; devuelve las páginas del WAL pendientes"""
+        with self.pool.lock_escritura:
+            escritor = self.pool.escritor
+            pendientes = 0
+            if self.perfil_sqlite['journal_mode'] == 'WAL':
+                # PASSIVE no espera a los lectores: lo que no se pueda copiar queda para la próxima vez
+                _, paginas_wal, copiadas = escritor.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+                pendientes = max(paginas_wal - copiadas, 0)
+            escritor.execute("PRAGMA optimize")
+        return pendientes
+    
+    def _estado_mysql(self, estado):
+        if estado == ABIERTO:
+            logging.warning("Servidor MySQL no disponible: se trabaja en modo offline hasta que vuelva")
+    
+    def modo_offline(self):
+        """Offline elegido por el operador o porque el circuito hacia MySQL está abierto"""
+        return self.config.get_modo_offline() or not self.pool_mysql.disponible()
     
     def execute_query(self, query, params=(), local_only=False):
         try:
-            if not local_only and self.conectar_mysql():
-                cursor = self.conn.cursor()
-                cursor.execute(query, params)
-                self.conn.commit()
+            if not local_only and not self.modo_offline():
+                with self.pool_mysql.conexion() as conn:
+                    # buffered: el resultado queda en el cursor y la conexión vuelve al pool
+                    cursor = conn.cursor(buffered=True)
+                    cursor.execute(query, params)
+                    conn.commit()
                 return cursor
                 
-            cursor = self.conn_local.cursor()
-            cursor.execute(query, params)
-            self.conn_local.commit()
+            if query.lstrip()[:6].upper() == "SELECT":
+                with self.lectura() as cursor:
+                    cursor.execute(query, params)
+            else:
+                with self.escritura() as cursor:
+                    cursor.execute(query, params)
             return cursor
         except Exception as e:
             logging.error(f"Error en base de datos: {e}")
             raise
     
-    def registrar_ingreso(self, placa, tipo_vehiculo, conductor=None):
-        # Verificar si el vehículo ya está registrado
-        cursor = self.execute_query(
-            "SELECT * FROM movimientos WHERE placa = ? AND estado = 'activo'", 
-            (placa,),
-            local_only=True
-        )
-        if cursor.fetchone():
-            return False, "El vehículo ya está ingresado."
-        
-        # Buscar espacio libre
-        cursor = self.execute_query(
-            "SELECT * FROM espacios WHERE ocupado = 0 LIMIT 1",
-            local_only=True
-        )
-        espacio = cursor.fetchone()
-
-        if not espacio:
-            return False, "No hay espacios disponibles."
-        
-        espacio_id = espacio[0]
-        # Asignar espacio al vehículo
-        self.execute_query(
-            "UPDATE espacios SET ocupado = 1 WHERE id = ?", 
-            (espacio_id,),
-            local_only=True
+    def lectura(self):
+        """Cursor de la conexión de lectura de este hilo: no espera a las escrituras en curso"""
+        return self.pool.lectura()
+    
+    @contextmanager
+    def escritura(self):
+        """Varias sentencias locales con un solo commit; si algo falla no queda nada a medias"""
+        # El lock se mantiene hasta aplicar las acciones de al_confirmar: ningún otro escritor
+        # ve el índice de ocupación atrasado respecto de la tabla
+        with self.pool.lock_escritura:
+            try:
+                with self.pool.escritura() as cursor:
+                    yield cursor
+            except Exception as e:
+                self._al_confirmar = []
+                logging.error(f"Error en base de datos: {e}")
+                raise
+            acciones, self._al_confirmar = self._al_confirmar, []
+            for accion in acciones:
+                accion()
+    
+    def al_confirmar(self, accion):
+        """Ejecuta accion() sólo si la transacción en curso se confirma"""
+        if accion not in self._al_confirmar:
+            self._al_confirmar.append(accion)
+    
+    def recargar_ocupacion(self, cursor=None):
+        if cursor is None:
+            with self.lectura() as cursor:
+                filas = cursor.execute("SELECT id, numero, zona, ocupado FROM espacios").fetchall()
+        else:
+            filas = cursor.execute("SELECT id, numero, zona, ocupado FROM espacios").fetchall()
+        self.ocupacion.cargar(filas)
+    
+    def recargar_activos(self, cursor=None):
+        consulta = (
+            f"SELECT {COLUMNAS_ACTIVOS} FROM movimientos WHERE estado = 'activo' "
+            "ORDER BY hora_entrada, nodo, uid"
         )
-        
-        # Registrar el vehículo
-        hora_ingreso = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.execute_query(
-            "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, espacio_asignado, conductor) VALUES (?, ?, ?, ?, ?)", 
-            (placa, tipo_vehiculo, hora_ingreso, espacio_id, conductor),
-            local_only=True
+        if cursor is None:
+            with self.lectura() as cursor:
+                filas = cursor.execute(consulta).fetchall()
+        else:
+            filas = cursor.execute(consulta).fetchall()
+        self.activos.cargar(filas)
+    
+    def _refrescar_activo(self, cursor, placa):
+        """Al confirmar, la placa queda en los activos con su movimiento activo, o sale si no tiene"""
+        # Con la misma placa activa en dos puertas vale la que gana en _resolver_conflictos
+        cursor.execute(
+            f"SELECT {COLUMNAS_ACTIVOS} FROM movimientos WHERE placa = ? AND estado = 'activo' "
+            "ORDER BY hora_entrada, nodo, uid LIMIT 1",
+            (placa,)
         )
-        
-        # Actualizar reporte diario
-        fecha = datetime.now().strftime('%Y-%m-%d')
-        cursor = self.execute_query("SELECT * FROM reportes WHERE fecha = ?", (fecha,), local_only=True)
-        if not cursor.fetchone():
-            self.execute_query(
-                "INSERT INTO reportes (fecha, ingresos) VALUES (?, 1)", 
-                (fecha,),
-                local_only=True
+        fila = cursor.fetchone()
+        self.al_confirmar(lambda: self.activos.poner(placa, fila))
+    
+    def reconciliar_ocupacion(self):
+        """Compara el índice con la tabla espacios y lo corrige; devuelve cuántos espacios diferían"""
+        with self.pool.lock_escritura:
+            with self.lectura() as cursor:
+                filas = cursor.execute("SELECT id, numero, zona, ocupado FROM espacios").fetchall()
+            diferencias = self.ocupacion.diferencias(filas)
+            if diferencias:
+                # Otro proceso escribió en el mismo archivo, o se cambió la tabla a mano
+                logging.warning(f"Índice de ocupación desactualizado en {len(diferencias)} espacios, se recarga")
+                self.ocupacion.cargar(filas)
+        return len(diferencias)
+    
+    def _tomar_espacio(self, cursor, zona):
+        """Ocupa el siguiente espacio libre dentro de la transacción; None si no hay"""
+        for intento in range(2):
+            espacio = self.ocupacion.siguiente_libre(zona)
+            if espacio is not None:
+                # ocupado = 0 en el WHERE: si otro proceso lo tomó, el índice estaba atrasado
+                cursor.execute("UPDATE espacios SET ocupado = 1 WHERE id = ? AND ocupado = 0", (espacio[0],))
+                if cursor.rowcount == 1:
+                    self.al_confirmar(lambda: self.ocupacion.ocupar(espacio[0]))
+                    return espacio
+            if intento == 0:
+                # Sin libres o con uno ya tomado: otro proceso pudo haber liberado u ocupado espacios
+                self.recargar_ocupacion(cursor)
+        return None
+    
+    transaccion = escritura
+    
+    def registrar_ingreso(self, placa, tipo_vehiculo, conductor=None, zona=None):
+        try:
+            return self._registrar_ingreso(placa, tipo_vehiculo, conductor, zona)
+        except sqlite3.IntegrityError:
+            # Otro programa sobre el mismo archivo la ingresó primero: lo frena el índice único
+            return False, "El vehículo ya está ingresado."
+    
+    def _registrar_ingreso(self, placa, tipo_vehiculo, conductor, zona):
+        ahora = datetime.now()
+        with self.transaccion() as cursor:
+            # Verificar si el vehículo ya está registrado
+            cursor.execute("SELECT 1 FROM movimientos WHERE placa = ? AND estado = 'activo'", (placa,))
+            if cursor.fetchone():
+                return False, "El vehículo ya está ingresado."
+            
+            # Buscar y asignar espacio libre
+            espacio = self._tomar_espacio(cursor, zona)
+            if not espacio:
+                return False, "No hay espacios disponibles."
+            espacio_id = espacio[0]
+            
+            # Registrar el vehículo
+            uid = uuid.uuid4().hex
+            cursor.execute(
+                "INSERT INTO movimientos (uid, nodo, placa, tipo_vehiculo, hora_entrada, espacio_asignado, conductor) VALUES (?, ?, ?, ?, ?, ?, ?)", 
+                (uid, self.nodo_id, placa, tipo_vehiculo, ahora.strftime('%Y-%m-%d %H:%M:%S'), espacio_id, conductor)
             )
-        else:
-            self.execute_query(
-                "UPDATE reportes SET ingresos = ingresos + 1 WHERE fecha = ?", 
-                (fecha,),
-                local_only=True
+            fila = (placa, tipo_vehiculo, ahora.strftime('%Y-%m-%d %H:%M:%S'), espacio_id, conductor or '')
+            self.al_confirmar(lambda: self.activos.poner(placa, fila))
+            self.resumenes.aplicar(cursor, None, self.resumenes.fila(cursor, uid))
+            
+            # Actualizar reporte diario
+            fecha = ahora.strftime('%Y-%m-%d')
+            cursor.execute(
+                "INSERT INTO reportes (fecha, ingresos) VALUES (?, 1) "
+                "ON CONFLICT(fecha) DO UPDATE SET ingresos = ingresos + 1, pendiente_sync = 1",
+                (fecha,)
             )
+            
+            self._encolar_cambio(cursor, 'movimientos', uid)
+            self._encolar_cambio(cursor, 'reportes', fecha)
         
-        self.add_pending_sync("ingreso", placa)
         return True, f"Vehículo {placa} registrado con éxito. Espacio: {espacio[1]}"
     
     def registrar_salida(self, placa):
-        cursor = self.execute_query(
-            "SELECT * FROM movimientos WHERE placa = ? AND estado = 'activo'", 
-            (placa,),
-            local_only=True
-        )
-        vehiculo = cursor.fetchone()
-        
-        if not vehiculo:
-            return False, f"El vehículo con placa {placa} no está registrado."
-        
-        hora_salida = datetime.now()
-        hora_ingreso = datetime.strptime(vehiculo[3], '%Y-%m-%d %H:%M:%S')
-        tiempo_estacionado = (hora_salida - hora_ingreso).total_seconds() / 60  # tiempo en minutos
-        espacio_id = vehiculo[5]
-        
-        # Calcular tarifa según tipo de vehículo
         tarifas = self.config.get_tarifas()
-        tipo_vehiculo = vehiculo[2].lower()
-        tarifa_por_hora = tarifas.get(tipo_vehiculo, 2.00)
-        
-        # Calcular el total a cobrar (tiempo en horas * tarifa)
-        horas = tiempo_estacionado / 60
-        if horas < 1:
-            horas = 1  # Mínimo una hora
-        total_cobrado = horas * tarifa_por_hora
-        
-        # Actualizar registro del vehículo
-        self.execute_query(
-            "UPDATE movimientos SET hora_salida = ?, tiempo_estacionado = ?, estado = 'salido', tarifa = ?, total_cobrado = ? WHERE id = ?", 
-            (hora_salida.strftime('%Y-%m-%d %H:%M:%S'), tiempo_estacionado, tarifa_por_hora, total_cobrado, vehiculo[0]),
-            local_only=True
-        )
-        
-        # Liberar el espacio
-        self.execute_query(
-            "UPDATE espacios SET ocupado = 0 WHERE id = ?", 
-            (espacio_id,),
-            local_only=True
-        )
-        
-        # Actualizar reporte diario
-        fecha = datetime.now().strftime('%Y-%m-%d')
-        cursor = self.execute_query("SELECT * FROM reportes WHERE fecha = ?", (fecha,), local_only=True)
-        if not cursor.fetchone():
-            self.execute_query(
-                "INSERT INTO reportes (fecha, egresos, total_cobrado) VALUES (?, 1, ?)", 
-                (fecha, total_cobrado),
-                local_only=True
+        with self.transaccion() as cursor:
+            cursor.execute(
+                "SELECT id, tipo_vehiculo, hora_entrada, espacio_asignado, uid FROM movimientos WHERE placa = ? AND estado = 'activo' "
+                "ORDER BY hora_entrada, nodo, uid LIMIT 1", 
+                (placa,)
             )
-        else:
-            self.execute_query(
-                "UPDATE reportes SET egresos = egresos + 1, total_cobrado = total_cobrado + ? WHERE fecha = ?", 
-                (total_cobrado, fecha),
-                local_only=True
+            vehiculo = cursor.fetchone()
+            
+            if not vehiculo:
+                return False, f"El vehículo con placa {placa} no está registrado."
+            
+            movimiento_id, tipo, hora_entrada, espacio_id, uid = vehiculo
+            hora_salida = datetime.now()
+            hora_ingreso = datetime.strptime(hora_entrada, '%Y-%m-%d %H:%M:%S')
+            tiempo_estacionado = (hora_salida - hora_ingreso).total_seconds() / 60  # tiempo en minutos
+            
+            # Calcular tarifa según tipo de vehículo
+            tarifa_por_hora = tarifas.get(tipo.lower(), 2.00)
+            
+            # Calcular el total a cobrar (tiempo en horas * tarifa)
+            horas = tiempo_estacionado / 60
+            if horas < 1:
+                horas = 1  # Mínimo una hora
+            total_cobrado = horas * tarifa_por_hora
+            
+            # Actualizar registro del vehículo
+            antes = self.resumenes.fila(cursor, uid)
+            cursor.execute(
+                "UPDATE movimientos SET hora_salida = ?, tiempo_estacionado = ?, estado = 'salido', tarifa = ?, total_cobrado = ?, pendiente_sync = 1, sync_version = sync_version + 1 WHERE id = ?", 
+                (hora_salida.strftime('%Y-%m-%d %H:%M:%S'), tiempo_estacionado, tarifa_por_hora, total_cobrado, movimiento_id)
             )
-        
-        self.add_pending_sync("salida", placa)
+            self.resumenes.aplicar(cursor, antes, self.resumenes.fila(cursor, uid))
+            
+            # Liberar el espacio
+            cursor.execute("UPDATE espacios SET ocupado = 0 WHERE id = ?", (espacio_id,))
+            self.al_confirmar(lambda: self.ocupacion.liberar(espacio_id))
+            self._refrescar_activo(cursor, placa)
+            
+            # Actualizar reporte diario
+            fecha = hora_salida.strftime('%Y-%m-%d')
+            cursor.execute(
+                "INSERT INTO reportes (fecha, egresos, total_cobrado) VALUES (?, 1, ?) "
+                "ON CONFLICT(fecha) DO UPDATE SET egresos = egresos + 1, "
+                "total_cobrado = total_cobrado + excluded.total_cobrado, pendiente_sync = 1",
+                (fecha, total_cobrado)
+            )
+            
+            self._encolar_cambio(cursor, 'movimientos', uid)
+            self._encolar_cambio(cursor, 'reportes', fecha)
         
         return True, {
             "placa": placa,
-            "tipo": vehiculo[2],
+            "tipo": tipo,
             "ingreso": hora_ingreso.strftime('%Y-%m-%d %H:%M:%S'),
             "salida": hora_salida.strftime('%Y-%m-%d %H:%M:%S'),
             "tiempo": f"{tiempo_estacionado:.2f} minutos",
@@ -442,31 +1153,144 @@ class DatabaseManager:
         # Guardar imagen de rostro asociada al usuario (opcional)
         pass
     
-    def get_espacios_disponibles(self):
-        cursor = self.execute_query(
-            "SELECT COUNT(*) FROM espacios WHERE ocupado = 0",
-            local_only=True
-        )
-        return cursor.fetchone()[0]
+    def get_espacios_disponibles(self, zona=None):
+        return self.ocupacion.libres(zona)
+    
+    def get_espacios_por_zona(self):
+        """{zona: (libres, total)}"""
+        return {
+            zona: (libres, self.ocupacion.total(zona))
+            for zona, libres in self.ocupacion.libres_por_zona().items()
+        }
+    
+    # ---- Panel de estado ----
+    def version_datos(self):
+        """PRAGMA data_version de la conexión de lectura de este hilo.
+
+        Cambia con cada commit de otra conexión (el escritor de esta app u otro programa) y
+        no lee ninguna tabla: sirve para saber si vale la pena volver a consultar.
+        """
+        with self.lectura() as cursor:
+            return cursor.execute("PRAGMA data_version").fetchone()[0]
+    
+    def estado_panel(self, ahora=None, ventana_min=PANEL_VENTANA_MIN):
+        """Lo que muestra el panel de estado; cada consulta es un rango corto de un índice"""
+        ahora = ahora or datetime.now()
+        desde = (ahora - timedelta(minutes=ventana_min)).strftime('%Y-%m-%d %H:%M:%S')
+        hoy = ahora.strftime('%Y-%m-%d')
+        with self.lectura() as cursor:
+            # Lo de la ventana siempre está en la tabla principal: el archivo sólo tiene meses viejos
+            entradas = cursor.execute(
+                "SELECT COUNT(*) FROM movimientos WHERE hora_entrada >= ? AND estado <> 'duplicado'", (desde,)
+            ).fetchone()[0]
+            salidas = cursor.execute(
+                "SELECT COUNT(*) FROM movimientos WHERE hora_salida >= ? AND estado <> 'duplicado'", (desde,)
+            ).fetchone()[0]
+            ingresos, egresos, cobrado, _ = self.resumenes.consultar(cursor, 'dia', hoy, hoy, ())[0]
+        return {
+            'libres': self.ocupacion.libres(),
+            'total': self.ocupacion.total(),
+            'zonas': self.get_espacios_por_zona(),
+            'entradas_min': entradas / ventana_min,
+            'salidas_min': salidas / ventana_min,
+            'ingresos_hoy': ingresos or 0,
+            'egresos_hoy': egresos or 0,
+            'cobrado_hoy': cobrado or 0.0,
+            'pendientes_sync': self.pendientes_sync(),
+            'offline': self.modo_offline(),
+        }
     
     def get_reporte_rango(self, fecha_inicio, fecha_fin):
-        cursor = self.execute_query(
-            "SELECT * FROM reportes WHERE fecha BETWEEN ? AND ? ORDER BY fecha",
-            (fecha_inicio, fecha_fin),
-            local_only=True
-        )
-        return cursor.fetchall()
+        """[(fecha, ingresos, egresos, total_cobrado)] por día, desde los resúmenes"""
+        with self.lectura() as cursor:
+            return [
+                (fecha, ingresos, egresos, total)
+                for fecha, ingresos, egresos, total, _ in self.resumenes.consultar(cursor, 'dia', fecha_inicio, fecha_fin)
+            ]
+    
+    def get_resumen_rango(self, fecha_inicio, fecha_fin):
+        """Cobrado por tipo de vehículo y zona, estadía promedio y movimiento por hora del día"""
+        with self.lectura() as cursor:
+            return {
+                'por_tipo': self.resumenes.consultar(cursor, 'dia', fecha_inicio, fecha_fin, ('tipo_vehiculo',)),
+                'por_zona': self.resumenes.consultar(cursor, 'dia', fecha_inicio, fecha_fin, ('zona',)),
+                'por_hora': self.resumenes.por_hora_del_dia(cursor, fecha_inicio, fecha_fin),
+            }
+    
+    def reconstruir_resumenes(self):
+        """Rehace los resúmenes desde los movimientos (por ejemplo después de corregirlos a mano)"""
+        with self.escritura() as cursor:
+            return self.resumenes.reconstruir(cursor)
     
     def get_vehiculos_por_fecha(self, fecha):
         fecha_inicio = f"{fecha} 00:00:00"
         fecha_fin = f"{fecha} 23:59:59"
         
-        cursor = self.execute_query(
-            "SELECT * FROM movimientos WHERE hora_entrada BETWEEN ? AND ?",
-            (fecha_inicio, fecha_fin),
-            local_only=True
-        )
-        return cursor.fetchall()
+        with self.lectura() as cursor:
+            # Un día de hace meses puede estar en el archivo; fuente() une sólo los meses del rango
+            cursor.execute(
+                f"SELECT * FROM {self.archivo.fuente(cursor, fecha_inicio, fecha_fin)} "
+                "WHERE hora_entrada BETWEEN ? AND ? ORDER BY hora_entrada",
+                (fecha_inicio, fecha_fin)
+            )
+            return cursor.fetchall()
+    
+    def _consulta_historial(self, cursor, filtros, columnas, despues=None):
+        """(sql, params) de los movimientos filtrados en orden (hora_entrada, id) descendente.
+
+        Una rama por tabla (la principal y los meses archivados del rango) con el ORDER BY en
+        el compuesto: SQLite mezcla las ramas recorriendo el índice por hora_entrada de cada
+        una y con LIMIT se detiene apenas junta las filas pedidas, sin ordenar el resto.
+        """
+        condiciones, params = ["hora_entrada IS NOT NULL"], []
+        desde = f"{filtros['desde']} 00:00:00" if filtros.get('desde') else None
+        hasta = f"{filtros['hasta']} 23:59:59" if filtros.get('hasta') else None
+        if despues is not None:
+            # Keyset: las filas que siguen a (hora_entrada, id) en orden descendente
+            condiciones.append("hora_entrada <= ? AND (hora_entrada < ? OR id < ?)")
+            params += [despues[0], despues[0], despues[1]]
+            hasta = min(hasta, despues[0]) if hasta else despues[0]
+        if desde:
+            condiciones.append("hora_entrada >= ?")
+            params.append(desde)
+        if hasta:
+            condiciones.append("hora_entrada <= ?")
+            params.append(hasta)
+        if filtros.get('placa'):
+            # Por prefijo, como rango para que sirva el índice por placa
+            condiciones.append("placa >= ? AND placa < ?")
+            params += [filtros['placa'], filtros['placa'] + '\uffff']
+        for filtro, columna in (('tipo', 'tipo_vehiculo'), ('estado', 'estado')):
+            if filtros.get(filtro):
+                condiciones.append(f"{columna} = ?")
+                params.append(filtros[filtro])
+        where = " AND ".join(condiciones)
+        lista = ", ".join(columnas)
+        # Los meses archivados posteriores a la clave no pueden tener filas que sigan
+        tablas = self.archivo.tablas(cursor, desde, hasta)
+        sql = " UNION ALL ".join(f"SELECT {lista} FROM {tabla} WHERE {where}" for tabla in tablas)
+        return sql + " ORDER BY hora_entrada DESC, id DESC", params * len(tablas)
+    
+    def historial_pagina(self, filtros, despues=None, limite=HISTORIAL_BLOQUE):
+        """Hasta `limite` movimientos (HISTORIAL_COLUMNAS) después de la clave (hora_entrada, id)"""
+        with self.lectura() as cursor:
+            sql, params = self._consulta_historial(cursor, filtros, HISTORIAL_COLUMNAS, despues)
+            cursor.execute(f"{sql} LIMIT ?", params + [limite])
+            return cursor.fetchall()
+    
+    def historial_indice(self, filtros, cada=HISTORIAL_BLOQUE, cancelacion=None):
+        """(total, claves de límite de bloque) de los movimientos filtrados; recorre sólo el índice"""
+        inicio = time.perf_counter()
+        with self.lectura() as cursor:
+            sql, params = self._consulta_historial(cursor, filtros, ('hora_entrada', 'id'))
+            cursor.execute(sql, params)
+            total, claves = indice_por_bloques(cursor, cada, cancelacion)
+        logging.info(f"Índice del historial: {total} movimientos en {time.perf_counter() - inicio:.2f}s")
+        return total, claves
+    
+    def archivar_movimientos(self):
+        """Pasa al archivo mensual los movimientos cerrados más viejos que [ARCHIVO] dias"""
+        return self.archivo.archivar()
     
     def verificar_usuario(self, username, password):
         password_hash = hashlib.sha256(password.encode()).hexdigest()
@@ -517,61 +1341,276 @@ class DatabaseManager:
             logging.error(f"Error al eliminar usuario: {e}")
             return False
     
-    def add_pending_sync(self, tipo, placa):
-        if self.config.get_modo_offline():
-            self.pending_sync.append({
-                'tipo': tipo,
-                'placa': placa,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            })
-    
-    def sincronizar_datos(self):
-        if self.config.get_modo_offline() or not self.pending_sync:
+    def _encolar_cambio(self, cursor, tabla, clave):
+        """Agrega al outbox la fila completa, dentro de la transacción que la modificó"""
+        cursor.execute(f"SELECT * FROM {tabla} WHERE {CLAVES_SYNC[tabla]} = ?", (clave,))
+        columnas = [descripcion[0] for descripcion in cursor.description]
+        fila = dict(zip(columnas, cursor.fetchone()))
+        cursor.execute(
+            "INSERT INTO outbox (tabla, clave, payload, creado) VALUES (?, ?, ?, ?)",
+            (tabla, clave, json.dumps(fila), datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        )
+    
+    def pendientes_sync(self, consumidor=CONSUMIDOR_MYSQL):
+        """Entradas del outbox que el consumidor todavía no confirmó"""
+        with self.lectura() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM outbox WHERE seq > "
+                "(SELECT ultimo_seq FROM outbox_consumidores WHERE nombre = ?)",
+                (consumidor,)
+            )
+            return cursor.fetchone()[0]
+    
+    def _preparar_servidor(self, conn):
+        if self.servidor_preparado:
+            return
+        cursor = conn.cursor()
+        for sentencia in ESQUEMA_MYSQL:
+            cursor.execute(sentencia)
+        conn.commit()
+        self.servidor_preparado = True
+    
+    def sincronizar_datos(self, lote=SYNC_LOTE):
+        """Vacía el outbox hacia MySQL en orden de seq, un lote por transacción.
+
+        Cada lote se confirma en el servidor antes de avanzar el cursor local (el checkpoint):
+        si la app se cae entre los dos pasos el lote se reenvía, y como son upserts de la fila
+        completa el resultado es el mismo (entrega al menos una vez, efecto exactamente una vez).
+        """
+        if self.modo_offline():
             return False
-        
         try:
-            for operacion in self.pending_sync:
-                if operacion['tipo'] == "ingreso":
-                    cursor = self.execute_query(
-                        "SELECT * FROM movimientos WHERE placa = ? AND estado = 'activo'", 
-                        (operacion['placa'],),
-                        local_only=True
-                    )
-                    vehiculo = cursor.fetchone()
-                    
-                    if vehiculo:
-                        self.execute_query(
-                            "INSERT INTO movimientos (placa, tipo_vehiculo, hora_entrada, espacio_asignado, conductor) VALUES (%s, %s, %s, %s, %s)",
-                            (vehiculo[1], vehiculo[2], vehiculo[3], vehiculo[5], vehiculo[6])
-                        )
-                
-                elif operacion['tipo'] == "salida":
-                    cursor = self.execute_query(
-                        "SELECT * FROM movimientos WHERE placa = ? AND estado = 'salido' ORDER BY id DESC LIMIT 1", 
-                        (operacion['placa'],),
-                        local_only=True
-                    )
-                    vehiculo = cursor.fetchone()
-                    
-                    if vehiculo:
-                        self.execute_query(
-                            "UPDATE movimientos SET hora_salida = %s, tiempo_estacionado = %s, estado = 'salido', tarifa = %s, total_cobrado = %s WHERE placa = %s AND estado = 'activo'",
-                            (vehiculo[4], vehiculo[8], vehiculo[9], vehiculo[10], vehiculo[1]))
-            
-            # Marcar como sincronizados en la base local
-            self.execute_query("UPDATE movimientos SET pendiente_sync = 0 WHERE pendiente_sync = 1", local_only=True)
-            self.execute_query("UPDATE reportes SET pendiente_sync = 0 WHERE pendiente_sync = 1", local_only=True)
-            
-            self.pending_sync = []
-            return True
+            return self._enviar_outbox(lote)
         except Exception as e:
+            # También la base local puede fallar (un lector cerrado por aplicar_perfil o al
+            # restaurar): el hilo de sincronización no debe morir por eso
             logging.error(f"Error durante la sincronización: {e}")
             return False
     
+    def _enviar_outbox(self, lote):
+        enviadas = 0
+        inicio = time.perf_counter()
+        while True:
+            entradas = self.leer_outbox(CONSUMIDOR_MYSQL, lote)
+            if not entradas:
+                if enviadas:
+                    logging.info(f"Sincronizadas {enviadas} filas en {time.perf_counter() - inicio:.2f}s")
+                return True
+            
+            # Varios cambios de la misma fila en el lote: basta con enviar el último
+            filas = {}
+            for _, tabla, clave, payload in entradas:
+                filas[(tabla, clave)] = json.loads(payload)
+            por_tabla = {}
+            for (tabla, _), fila in filas.items():
+                por_tabla.setdefault(tabla, []).append(valores_sync(tabla, fila, self.nodo_id))
+            
+            try:
+                with self.pool_mysql.conexion() as conn:
+                    self._preparar_servidor(conn)
+                    cursor_mysql = conn.cursor()
+                    for tabla, valores in por_tabla.items():
+                        cursor_mysql.executemany(sentencia_upsert_mysql(tabla), valores)
+                    conn.commit()
+            except Exception as e:
+                logging.error(f"Error durante la sincronización: {e}")
+                with self.escritura() as cursor:
+                    cursor.execute(
+                        "UPDATE outbox SET intentos = intentos + 1, ultimo_error = ? WHERE seq BETWEEN ? AND ?",
+                        (str(e), entradas[0][0], entradas[-1][0])
+                    )
+                return False
+            
+            self.confirmar_outbox(entradas[-1][0])
+            enviadas += len(filas)
+    
+    def leer_outbox(self, consumidor, lote):
+        """[(seq, tabla, clave, payload)] que el consumidor todavía no confirmó, en orden"""
+        with self.lectura() as cursor:
+            cursor.execute(
+                "SELECT seq, tabla, clave, payload FROM outbox WHERE seq > "
+                "(SELECT ultimo_seq FROM outbox_consumidores WHERE nombre = ?) ORDER BY seq LIMIT ?",
+                (consumidor, lote)
+            )
+            return cursor.fetchall()
+    
+    def registrar_consumidor(self, nombre):
+        """Da de alta un consumidor del outbox que empieza con una foto de los vehículos activos.
+
+        Lo anterior puede haberse purgado ya, así que en lugar de empezar en seq 0 se encolan
+        otra vez los movimientos activos; para MySQL es un reenvío idempotente.
+        """
+        with self.escritura() as cursor:
+            cursor.execute("SELECT 1 FROM outbox_consumidores WHERE nombre = ?", (nombre,))
+            if cursor.fetchone():
+                return False
+            cursor.execute(
+                "INSERT INTO outbox_consumidores (nombre, ultimo_seq) "
+                "VALUES (?, (SELECT COALESCE(MAX(seq), 0) FROM outbox))",
+                (nombre,)
+            )
+            cursor.execute("SELECT uid FROM movimientos WHERE estado = 'activo' ORDER BY id")
+            for (uid,) in cursor.fetchall():
+                self._encolar_cambio(cursor, 'movimientos', uid)
+        return True
+    
+    def confirmar_outbox(self, ultimo_seq, consumidor=CONSUMIDOR_MYSQL):
+        with self.escritura() as cursor:
+            cursor.execute(
+                "UPDATE outbox_consumidores SET ultimo_seq = ? WHERE nombre = ?",
+                (ultimo_seq, consumidor)
+            )
+            # Lo que ya confirmaron todos los consumidores no se necesita más
+            cursor.execute("DELETE FROM outbox WHERE seq <= (SELECT MIN(ultimo_seq) FROM outbox_consumidores)")
+            if consumidor != CONSUMIDOR_MYSQL:
+                return
+            # Una fila queda sincronizada sólo si no tiene cambios posteriores esperando en el outbox
+            cursor.execute(
+                "UPDATE movimientos SET pendiente_sync = 0 WHERE pendiente_sync = 1 AND uid NOT IN "
+                "(SELECT clave FROM outbox WHERE tabla = 'movimientos' AND seq > ?)",
+                (ultimo_seq,)
+            )
+            cursor.execute(
+                "UPDATE reportes SET pendiente_sync = 0 WHERE pendiente_sync = 1 AND fecha NOT IN "
+                "(SELECT clave FROM outbox WHERE tabla = 'reportes' AND seq > ?)",
+                (ultimo_seq,)
+            )
+    
+    # ---- Replicación entre puertas ----
+    def cursores_replicacion(self):
+        with self.lectura() as cursor:
+            cursor.execute("SELECT nodo, ultimo_seq FROM replicacion_cursores")
+            return dict(cursor.fetchall())
+    
+    def aplicar_cambios_remotos(self, cambios):
+        """Aplica [(nodo, seq, tabla, payload)] de otras puertas y resuelve los conflictos.
+
+        Una fila remota reemplaza a la local sólo si gana en _version_fila, así que aplicar
+        el mismo cambio dos veces, o en otro orden entre puertas, deja lo mismo.
+        """
+        with self.escritura() as cursor:
+            cursores = {}
+            placas = set()  # las que pueden haber entrado, salido o cambiado de espacio
+            for nodo, seq, tabla, payload in cambios:
+                cursores[nodo] = max(seq, cursores.get(nodo, 0))
+                if tabla != 'movimientos':
+                    continue
+                remota = json.loads(payload)
+                cursor.execute("SELECT * FROM movimientos WHERE uid = ?", (remota['uid'],))
+                actual = cursor.fetchone()
+                archivada = None
+                if actual is None:
+                    # Un cambio tardío sobre un movimiento que aquí ya se archivó
+                    archivada = self.archivo.buscar(cursor, remota['uid'], remota.get('hora_entrada'))
+                    if archivada is not None:
+                        actual = archivada[1]
+                local = None
+                if actual is not None:
+                    local = dict(zip([d[0] for d in cursor.description], actual))
+                    if _version_fila(remota) <= _version_fila(local):
+                        continue
+                    placas.add(local['placa'])
+                placas.add(remota.get('placa'))
+                if archivada is not None:
+                    # Vuelve a la tabla principal con la versión nueva; el próximo archivado lo devuelve
+                    self.archivo.desarchivar(cursor, archivada[0], remota['uid'])
+                columnas = [c for c in COLUMNAS_SYNC['movimientos']]
+                cursor.execute(
+                    f"INSERT INTO movimientos ({', '.join(columnas)}, pendiente_sync) "
+                    f"VALUES ({', '.join(['?'] * len(columnas))}, 0) "
+                    f"ON CONFLICT(uid) DO UPDATE SET "
+                    + ", ".join(f"{c} = excluded.{c}" for c in columnas if c != 'uid'),
+                    tuple(remota.get(c) for c in columnas)
+                )
+                self.resumenes.aplicar(cursor, local, self.resumenes.fila(cursor, remota['uid']))
+            for nodo, seq in cursores.items():
+                cursor.execute(
+                    "INSERT INTO replicacion_cursores (nodo, ultimo_seq) VALUES (?, ?) "
+                    "ON CONFLICT(nodo) DO UPDATE SET ultimo_seq = MAX(ultimo_seq, excluded.ultimo_seq)",
+                    (nodo, seq)
+                )
+            placas |= self._resolver_conflictos(cursor)
+            for placa in placas - {None}:
+                self._refrescar_activo(cursor, placa)
+    
+    def _resolver_conflictos(self, cursor):
+        """La misma placa activa en dos puertas o un espacio asignado dos veces.
+
+        Gana el movimiento con menor (hora_entrada, nodo, uid); el perdedor sólo lo corrige la
+        puerta que lo creó, con una versión nueva que se replica a las demás. Así todas las
+        puertas llegan al mismo estado sin ponerse de acuerdo. Devuelve las placas corregidas.
+        """
+        corregidas = set()
+        self._recalcular_ocupacion(cursor)
+        cursor.execute(
+            "SELECT placa FROM movimientos WHERE estado = 'activo' GROUP BY placa HAVING COUNT(*) > 1"
+        )
+        for (placa,) in cursor.fetchall():
+            cursor.execute(
+                "SELECT uid, nodo FROM movimientos WHERE placa = ? AND estado = 'activo' "
+                "ORDER BY hora_entrada, nodo, uid",
+                (placa,)
+            )
+            for uid, nodo in cursor.fetchall()[1:]:
+                if nodo != self.nodo_id:
+                    continue
+                logging.warning(f"Placa {placa} ingresada también en otra puerta: se anula el ingreso {uid}")
+                antes = self.resumenes.fila(cursor, uid)
+                cursor.execute(
+                    "UPDATE movimientos SET estado = 'duplicado', pendiente_sync = 1, "
+                    "sync_version = sync_version + 1 WHERE uid = ?",
+                    (uid,)
+                )
+                self.resumenes.aplicar(cursor, antes, self.resumenes.fila(cursor, uid))
+                self._encolar_cambio(cursor, 'movimientos', uid)
+                corregidas.add(placa)
+        
+        self._recalcular_ocupacion(cursor)
+        cursor.execute(
+            "SELECT espacio_asignado FROM movimientos WHERE estado = 'activo' "
+            "GROUP BY espacio_asignado HAVING COUNT(*) > 1"
+        )
+        for (espacio_id,) in cursor.fetchall():
+            cursor.execute(
+                "SELECT uid, nodo, placa FROM movimientos WHERE espacio_asignado = ? AND estado = 'activo' "
+                "ORDER BY hora_entrada, nodo, uid",
+                (espacio_id,)
+            )
+            for uid, nodo, placa in cursor.fetchall()[1:]:
+                if nodo != self.nodo_id:
+                    continue
+                cursor.execute("SELECT id FROM espacios WHERE ocupado = 0 ORDER BY numero LIMIT 1")
+                libre = cursor.fetchone()
+                if not libre:
+                    logging.error(f"Espacio {espacio_id} asignado dos veces y no hay otro libre para {placa}")
+                    continue
+                logging.warning(f"Espacio {espacio_id} asignado también en otra puerta: {placa} pasa al espacio {libre[0]}")
+                cursor.execute("UPDATE espacios SET ocupado = 1 WHERE id = ?", (libre[0],))
+                antes = self.resumenes.fila(cursor, uid)
+                cursor.execute(
+                    "UPDATE movimientos SET espacio_asignado = ?, pendiente_sync = 1, "
+                    "sync_version = sync_version + 1 WHERE uid = ?",
+                    (libre[0], uid)
+                )
+                # El espacio nuevo puede ser de otra zona
+                self.resumenes.aplicar(cursor, antes, self.resumenes.fila(cursor, uid))
+                self._encolar_cambio(cursor, 'movimientos', uid)
+                corregidas.add(placa)
+        return corregidas
+    
+    def _recalcular_ocupacion(self, cursor):
+        # Con varias puertas la ocupación se deriva de los movimientos activos de todas
+        cursor.execute(
+            "UPDATE espacios SET ocupado = EXISTS ("
+            "SELECT 1 FROM movimientos m WHERE m.espacio_asignado = espacios.id AND m.estado = 'activo')"
+        )
+        self.al_confirmar(self.recargar_ocupacion)
+    
     def crear_respaldo(self, archivo):
         try:
             backup_conn = sqlite3.connect(archivo)
-            self.conn_local.backup(backup_conn)
+            with self.pool.lock_escritura:
+                self.pool.escritor.backup(backup_conn)
             backup_conn.close()
             return True
         except Exception as e:
@@ -580,22 +1619,30 @@ class DatabaseManager:
     
     def restaurar_respaldo(self, archivo):
         try:
-            if self.conn_local:
-                self.conn_local.close()
-            
-            shutil.copyfile(archivo, LOCAL_DB)
-            self.conn_local = sqlite3.connect(LOCAL_DB, check_same_thread=False)
-            self.cursor_local = self.conn_local.cursor()
+            with self.pool.lock_escritura:
+                self.pool.cerrar()
+                shutil.copyfile(archivo, self.db_path)
+                self.pool.reabrir()
+                # Un respaldo de una versión anterior se pone al día antes de usarlo
+                self.migrar()
+                self.archivo.preparar()
+                self.recargar_ocupacion()
+                self.recargar_activos()
             return True
         except Exception as e:
             logging.error(f"Error al restaurar respaldo: {e}")
             return False
     
     def cerrar(self):
-        if self.conn_local:
-            self.conn_local.close()
-        if self.conn:
-            self.conn.close()
+        # Con el lock: otro hilo puede estar a mitad de una transacción en el escritor
+        with self.pool.lock_escritura:
+            if self.pool.escritor is not None:
+                try:
+                    self.pool.escritor.execute("PRAGMA optimize")
+                except sqlite3.Error as e:
+                    logging.error(f"Error al optimizar la base local: {e}")
+                self.pool.cerrar()
+        self.pool_mysql.cerrar()
 
 # ******************** INTERFAZ GRÁFICA ********************
 class ParkingApp(tk.Tk):
@@ -608,23 +1655,56 @@ class ParkingApp(tk.Tk):
         # Configuración
         self.config = Config()
         pytesseract.pytesseract.tesseract_cmd = self.config.get_tesseract_path()
-        
+        PlateRecognizer.set_ocr_backend(
+            crear_ocr_backend(self.config.get_ocr_backend(), self.config.get_tesseract_path())
+        )
+
         # Base de datos
         self.db = DatabaseManager(self.config)
         
+        # Cámaras compartidas: se abren una vez y quedan listas para login, placas y registro facial
+        self.camaras = CameraManager(self.config.get_fuentes_camaras())
+        self.camaras.precalentar()
+        self.suscripcion_placas = None
+        
+        # Cámara, OCR, base de datos y PDF corren fuera del hilo de Tk
+        self.tareas = TaskExecutor(self, max_workers=4, on_estado=self.mostrar_tareas)
+        
         # Variables de sesión
         self.usuario_actual = None
         self.rol_usuario = None
         self.intentos_login = 0
+        self.pipeline_placas = None
         
         # Iniciar con pantalla de login
         self.mostrar_login()
         
+        # Los hilos periódicos terminan al cerrar la ventana, antes de que se cierre la base
+        self.detener_hilos = threading.Event()
+        
         # Iniciar hilo de sincronización
-        self.sync_thread = threading.Thread(target=self.sincronizacion_periodica, daemon=True)
+        self.sync_thread = threading.Thread(target=self.sincronizacion_periodica, name="sincronizacion", daemon=True)
         self.sync_thread.start()
+        
+        # Iniciar hilo de mantenimiento de la base local
+        self.mantenimiento_thread = threading.Thread(target=self.mantenimiento_periodico, name="mantenimiento", daemon=True)
+        self.mantenimiento_thread.start()
+        
+        # Replicación con las otras puertas del mismo estacionamiento
+        self.replicador = None
+        replicacion = self.config.get_replicacion()
+        if replicacion is not None:
+            try:
+                self.replicador = Replicador(self.db, crear_registro(replicacion['registro'], self.db))
+                self.intervalo_replicacion = int(replicacion['intervalo'] * 1000)
+                self.after(self.intervalo_replicacion, self.replicacion_periodica)
+            except Exception as e:
+                logging.error(f"No se pudo iniciar la replicación: {e}")
     
     def mostrar_login(self):
+        if self.pipeline_placas is not None:
+            self.detener_captura_automatica()
+        
         for widget in self.winfo_children():
             widget.destroy()
         
@@ -651,6 +1731,7 @@ class ParkingApp(tk.Tk):
         
         ttk.Button(frame_login, text=offline_text, command=self.toggle_offline).pack(pady=5)
         
+        self._crear_barra_tareas()
         self.entry_usuario.focus_set()
         self.bind("<Return>", lambda event: self.login())
     
@@ -677,19 +1758,70 @@ class ParkingApp(tk.Tk):
             else:
                 messagebox.showerror("Error", f"Credenciales incorrectas. Intentos: {self.intentos_login}/3")
     
+    def enviar_tarea(self, clave, funcion, *args, al_terminar=None, descripcion=None, **kwargs):
+        """Envía trabajo lento al ejecutor; avisa al operador si la misma operación ya está en curso"""
+        try:
+            return self.tareas.submit(
+                clave, funcion, *args,
+                al_terminar=al_terminar,
+                al_fallar=lambda e: messagebox.showerror("Error", str(e)),
+                descripcion=descripcion,
+                **kwargs
+            )
+        except TareaRechazada as e:
+            messagebox.showwarning("Operación en curso", str(e))
+            return None
+    
+    def _crear_barra_tareas(self):
+        """Las tareas en curso y un botón para cancelar las que lo permiten (las de cámara)"""
+        barra = ttk.Frame(self)
+        barra.pack(side=tk.BOTTOM, fill=tk.X)
+        self.btn_cancelar_tareas = ttk.Button(barra, text="Cancelar", command=self.cancelar_tareas)
+        self.btn_cancelar_tareas.pack(side=tk.RIGHT)
+        self.lbl_tareas = ttk.Label(barra, text="", anchor=tk.W, foreground="blue")
+        self.lbl_tareas.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.mostrar_tareas(self.tareas.en_curso())
+    
+    def cancelar_tareas(self):
+        for clave in self.tareas.cancelables():
+            self.tareas.cancelar(clave)
+        self.mostrar_tareas(self.tareas.en_curso())
+    
+    def mostrar_tareas(self, en_curso):
+        lbl_tareas = getattr(self, 'lbl_tareas', None)
+        if lbl_tareas is None or not lbl_tareas.winfo_exists():
+            return
+        lbl_tareas.config(text=f" En curso: {', '.join(en_curso)}" if en_curso else "")
+        self.btn_cancelar_tareas.config(state=tk.NORMAL if self.tareas.cancelables() else tk.DISABLED)
+    
     def login_facial(self):
+        self.enviar_tarea(
+            CLAVE_VISTA_PREVIA, self._reconocer_rostro,
+            al_terminar=self._login_facial_terminado,
+            descripcion="Reconocimiento facial",
+            cancelable=True
+        )
+    
+    def _login_facial_terminado(self, usuario):
+        if usuario is None:
+            return
+        self.usuario_actual = usuario[0]
+        self.rol_usuario = usuario[3]
+        messagebox.showinfo("Éxito", f"Bienvenido, {usuario[1]}!")
+        self.mostrar_dashboard()
+    
+    def _reconocer_rostro(self, cancelacion):
+        """Corre en un worker: devuelve el usuario reconocido o None si se canceló"""
         # Inicializar reconocedor facial
         face_recognizer = FaceRecognizer(self.config.config.get('SETTINGS', 'modelo_lbph'))
         
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            messagebox.showerror("Error", "No se pudo acceder a la cámara")
-            return
+        cap = self._abrir_camara(self.config.get_camara_rostros())
         try:
-            while True:
+            while not cancelacion.is_set():
                 ret, frame = cap.read()
                 if not ret:
                     break
+                frame = frame.copy()
                 
                 # Detectar rostros
                 faces, gray = face_recognizer.detect_faces(frame)
@@ -704,18 +1836,37 @@ class ParkingApp(tk.Tk):
                     if confidence < 50:  # Umbral de confianza
                         usuario = self.db.get_user_by_id(label)
                         if usuario:
-                            self.usuario_actual = usuario[0]
-                            self.rol_usuario = usuario[3]
-                            messagebox.showinfo("Éxito", f"Bienvenido, {usuario[1]}!")
-                            self.mostrar_dashboard()
-                            return
-                cv2.imshow("Reconocimiento Facial (Presione 'q' para salir)", frame)
+                            return usuario
+                cv2.imshow(VENTANA_ROSTRO_LOGIN, frame)
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
         finally:
             cap.release()
-            cv2.destroyAllWindows()
+            cerrar_ventana(VENTANA_ROSTRO_LOGIN)
+        return None
+
+    def _abrir_camara(self, nombre):
+        """Suscripción a una cámara compartida; lanza RuntimeError si no entrega frames"""
+        try:
+            cap = self.camaras.suscribir(nombre)
+        except KeyError as e:
+            raise RuntimeError(str(e))
+        if not cap.isOpened():
+            # La cámara puede estar terminando de abrir: se espera el primer frame
+            ret, _ = cap.read()
+            if not ret:
+                cap.release()
+                raise RuntimeError("No se pudo acceder a la cámara")
+        return cap
 
+    def suscribir_camara(self, nombre):
+        """Como _abrir_camara, pero avisa al operador y devuelve None si falla"""
+        try:
+            return self._abrir_camara(nombre)
+        except RuntimeError as e:
+            messagebox.showerror("Error", str(e))
+            return None
+    
     def toggle_offline(self):
         is_offline = self.config.toggle_offline_mode()
         if is_offline:
@@ -749,8 +1900,13 @@ class ParkingApp(tk.Tk):
         
         self.statusbar = ttk.Label(self, text="", relief=tk.SUNKEN, anchor=tk.W)
         self.statusbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self._crear_barra_tareas()
         
-        self.actualizar_estado()
+        # Se redibuja sólo si cambió algo, y a lo sumo refrescos_panel veces por segundo
+        self.panel_estado = StatusPanel(
+            self, self.db, self.config.get_refrescos_panel(), al_mostrar=self._mostrar_estado
+        )
+        self.panel_estado.pack(side=tk.BOTTOM, fill=tk.X)
     
     def configurar_tab_vehiculos(self):
         frame_registro = ttk.LabelFrame(self.tab_vehiculos, text="Registro Automático de Vehículos")
@@ -759,15 +1915,30 @@ class ParkingApp(tk.Tk):
         frame_ocupacion = ttk.LabelFrame(self.tab_vehiculos, text="Estado del Estacionamiento")
         frame_ocupacion.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
+        frame_camara = ttk.Frame(frame_registro)
+        frame_camara.pack(pady=5)
+        ttk.Label(frame_camara, text="Cámara:").pack(side=tk.LEFT, padx=5)
+        self.combo_camara_placas = ttk.Combobox(frame_camara, width=12, values=self.camaras.nombres(), state="readonly")
+        self.combo_camara_placas.pack(side=tk.LEFT, padx=5)
+        self.combo_camara_placas.set(self.camaras.nombres()[0])
+        
         # Botón para capturar placa automáticamente
         ttk.Button(frame_registro, text="Capturar Placa con Cámara", command=self.capturar_placa).pack(pady=10)
         
+        frame_auto = ttk.Frame(frame_registro)
+        frame_auto.pack(pady=5)
+        self.btn_captura_auto = ttk.Button(frame_auto, text="Captura Automática", command=self.toggle_captura_automatica)
+        self.btn_captura_auto.pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_auto, text="Reproducir Video...", command=self.reproducir_video_placas).pack(side=tk.LEFT, padx=5)
+        self.lbl_captura_auto = ttk.Label(frame_registro, text="")
+        self.lbl_captura_auto.pack(pady=2)
+        
         ttk.Label(frame_registro, text="Placa:").pack(pady=5)
         self.entry_placa = ttk.Entry(frame_registro, width=15)
         self.entry_placa.pack(pady=5)
         
         ttk.Label(frame_registro, text="Tipo de vehículo:").pack(pady=5)
-        self.combo_tipo = ttk.Combobox(frame_registro, width=15, values=["Auto", "Moto", "Camioneta"])
+        self.combo_tipo = ttk.Combobox(frame_registro, width=15, values=list(TIPOS_VEHICULO))
         self.combo_tipo.pack(pady=5)
         self.combo_tipo.current(0)
         
@@ -781,33 +1952,15 @@ class ParkingApp(tk.Tk):
         # Tabla de vehículos actuales
         ttk.Label(frame_registro, text="Vehículos Actualmente en el Estacionamiento:", font=("Arial", 10, "bold")).pack(pady=5)
         
-        self.tree_vehiculos = ttk.Treeview(frame_registro, columns=("Placa", "Tipo", "Ingreso", "Espacio", "Conductor"), show="headings")
-        self.tree_vehiculos.pack(fill=tk.BOTH, expand=True, pady=5)
-        
-        scrollbar = ttk.Scrollbar(frame_registro, orient=tk.VERTICAL, command=self.tree_vehiculos.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree_vehiculos.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree_vehiculos.heading("Placa", text="Placa")
-        self.tree_vehiculos.heading("Tipo", text="Tipo")
-        self.tree_vehiculos.heading("Ingreso", text="Hora de Ingreso")
-        self.tree_vehiculos.heading("Espacio", text="Espacio")
-        self.tree_vehiculos.heading("Conductor", text="Conductor")
-        
-        self.tree_vehiculos.column("Placa", width=100)
-        self.tree_vehiculos.column("Tipo", width=80)
-        self.tree_vehiculos.column("Ingreso", width=150)
-        self.tree_vehiculos.column("Espacio", width=60)
-        self.tree_vehiculos.column("Conductor", width=150)
+        # Se llena una vez y después aplica los ingresos y salidas que publica la base
+        self.lista_vehiculos = VehicleList(frame_registro, self.db.activos)
+        self.lista_vehiculos.pack(fill=tk.BOTH, expand=True, pady=5)
         
         ttk.Button(frame_registro, text="Refrescar Lista", command=self.actualizar_lista_vehiculos).pack(pady=5)
         
-        # Visualización de espacios
-        self.frame_espacios = ttk.Frame(frame_ocupacion)
-        self.frame_espacios.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        self.actualizar_espacios()
-        self.actualizar_lista_vehiculos()
+        # Visualización de espacios: se dibuja una vez y se recolorea con cada cambio de ocupación
+        self.mapa_espacios = SpaceMap(frame_ocupacion, self.db.ocupacion)
+        self.mapa_espacios.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
     
     def configurar_tab_reportes(self):
         frame_fechas = ttk.Frame(self.tab_reportes)
@@ -824,6 +1977,7 @@ class ParkingApp(tk.Tk):
         ttk.Button(frame_fechas, text="Generar Reporte", command=self.generar_reporte).grid(row=0, column=4, padx=20, pady=5)
         ttk.Button(frame_fechas, text="Exportar a PDF", command=self.exportar_pdf).grid(row=0, column=5, padx=5, pady=5)
         ttk.Button(frame_fechas, text="Exportar a CSV", command=self.exportar_csv).grid(row=0, column=6, padx=5, pady=5)
+        ttk.Button(frame_fechas, text="Historial", command=self.ver_historial_rango).grid(row=0, column=7, padx=5, pady=5)
         
         frame_reporte = ttk.LabelFrame(self.tab_reportes, text="Reporte")
         frame_reporte.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -846,6 +2000,9 @@ class ParkingApp(tk.Tk):
         self.tree_reporte.column("Total", width=120)
         
         ttk.Button(frame_reporte, text="Ver Detalles", command=self.ver_detalles_dia).pack(side=tk.BOTTOM, padx=5, pady=5)
+        
+        self.label_resumen_reporte = ttk.Label(self.tab_reportes, text="", justify=tk.LEFT)
+        self.label_resumen_reporte.pack(fill=tk.X, padx=10, pady=(0, 10))
     
     def configurar_tab_config(self):
         config_notebook = ttk.Notebook(self.tab_config)
@@ -856,12 +2013,16 @@ class ParkingApp(tk.Tk):
         tab_usuarios = ttk.Frame(config_notebook)
         tab_backup = ttk.Frame(config_notebook)
         tab_face_reg = ttk.Frame(config_notebook)
+        tab_camara = ttk.Frame(config_notebook)
+        tab_sqlite = ttk.Frame(config_notebook)
 
         config_notebook.add(tab_general, text="General")
         config_notebook.add(tab_tarifas, text="Tarifas")
         config_notebook.add(tab_usuarios, text="Usuarios")
         config_notebook.add(tab_backup, text="Respaldo")
         config_notebook.add(tab_face_reg, text="Registro Facial")
+        config_notebook.add(tab_camara, text="Cámara")
+        config_notebook.add(tab_sqlite, text="Base de Datos")
         
         # Configuración General
         ttk.Label(tab_general, text="Configuración General", font=("Arial", 12, "bold")).pack(pady=10)
@@ -888,8 +2049,87 @@ class ParkingApp(tk.Tk):
         self.entry_rutareportes = ttk.Entry(frame_config, width=40)
         self.entry_rutareportes.grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
         self.entry_rutareportes.insert(0, self.config.get_ruta_reportes())
-        
+
+        ttk.Label(frame_config, text="Motor OCR:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        self.combo_ocr = ttk.Combobox(frame_config, width=15, values=["auto"] + list(OCR_BACKENDS), state="readonly")
+        self.combo_ocr.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
+        self.combo_ocr.set(self.config.get_ocr_backend())
+
         ttk.Button(tab_general, text="Guardar Configuración", command=self.guardar_config_general).pack(pady=20)
+
+        # Configuración de la cámara de placas
+        ttk.Label(tab_camara, text="Cámaras y Región de Interés", font=("Arial", 12, "bold")).pack(pady=10)
+
+        frame_camara = ttk.Frame(tab_camara)
+        frame_camara.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        ttk.Label(frame_camara, text="Cámara:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        self.combo_camara_config = ttk.Combobox(frame_camara, width=15, values=self.camaras.nombres())
+        self.combo_camara_config.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
+        self.combo_camara_config.bind("<<ComboboxSelected>>", self.cargar_config_camara)
+
+        ttk.Label(frame_camara, text="Fuente (índice, video o URL):").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
+        self.entry_fuente_camara = ttk.Entry(frame_camara, width=40)
+        self.entry_fuente_camara.grid(row=1, column=1, sticky=tk.W, padx=5, pady=5)
+
+        ttk.Label(frame_camara, text="ROI (x,y,ancho,alto en fracciones):").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        self.entry_roi = ttk.Entry(frame_camara, width=25)
+        self.entry_roi.grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
+
+        ttk.Label(frame_camara, text="Ancho mínimo de placa (fracción):").grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
+        self.entry_placa_ancho_min = ttk.Entry(frame_camara, width=10)
+        self.entry_placa_ancho_min.grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
+
+        ttk.Label(frame_camara, text="Ancho máximo de placa (fracción):").grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        self.entry_placa_ancho_max = ttk.Entry(frame_camara, width=10)
+        self.entry_placa_ancho_max.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
+
+        self.combo_camara_config.set(self.camaras.nombres()[0])
+        self.cargar_config_camara()
+
+        ttk.Button(frame_camara, text="Guardar Cámara", command=self.guardar_config_camara).grid(row=5, column=0, pady=20)
+        ttk.Button(frame_camara, text="Calibrar ROI", command=self.calibrar_roi).grid(row=5, column=1, sticky=tk.W, pady=20)
+        
+        # Configuración de la base local
+        ttk.Label(tab_sqlite, text="Almacenamiento Local (SQLite)", font=("Arial", 12, "bold")).pack(pady=10)
+
+        frame_sqlite = ttk.Frame(tab_sqlite)
+        frame_sqlite.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        ttk.Label(frame_sqlite, text="Perfil:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        self.combo_perfil_sqlite = ttk.Combobox(frame_sqlite, width=15, values=list(PERFILES_SQLITE) + ["personalizado"], state="readonly")
+        self.combo_perfil_sqlite.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
+        self.combo_perfil_sqlite.set(self.config.get_nombre_perfil_sqlite())
+        self.combo_perfil_sqlite.bind("<<ComboboxSelected>>", self.seleccionar_perfil_sqlite)
+
+        self.entries_sqlite = {}
+        etiquetas = [
+            ('journal_mode', "Journal mode:"),
+            ('synchronous', "Synchronous:"),
+            ('mmap_size', "mmap_size (bytes):"),
+            ('cache_size', "cache_size (negativo = KiB):"),
+            ('temp_store', "temp_store:"),
+            ('busy_timeout', "busy_timeout (ms):"),
+        ]
+        perfil = self.config.get_perfil_sqlite()
+        for fila, (clave, texto) in enumerate(etiquetas, start=1):
+            ttk.Label(frame_sqlite, text=texto).grid(row=fila, column=0, sticky=tk.W, padx=5, pady=5)
+            if clave in VALORES_PRAGMA:
+                entry = ttk.Combobox(frame_sqlite, width=15, values=VALORES_PRAGMA[clave], state="readonly")
+                entry.set(perfil[clave])
+            else:
+                entry = ttk.Entry(frame_sqlite, width=15)
+                entry.insert(0, perfil[clave])
+            entry.grid(row=fila, column=1, sticky=tk.W, padx=5, pady=5)
+            self.entries_sqlite[clave] = entry
+
+        ttk.Label(frame_sqlite, text="Checkpoint y optimize cada (s, 0 = nunca):").grid(row=7, column=0, sticky=tk.W, padx=5, pady=5)
+        self.entry_mantenimiento_bd = ttk.Entry(frame_sqlite, width=10)
+        self.entry_mantenimiento_bd.grid(row=7, column=1, sticky=tk.W, padx=5, pady=5)
+        self.entry_mantenimiento_bd.insert(0, self.config.get_intervalo_mantenimiento())
+
+        ttk.Button(frame_sqlite, text="Guardar Perfil", command=self.guardar_config_sqlite).grid(row=8, column=0, pady=20)
+        ttk.Button(frame_sqlite, text="Ejecutar Mantenimiento", command=self.ejecutar_mantenimiento_bd).grid(row=8, column=1, sticky=tk.W, pady=20)
         
         # Configuración de Tarifas
         ttk.Label(tab_tarifas, text="Configuración de Tarifas", font=("Arial", 12, "bold")).pack(pady=10)
@@ -977,6 +2217,10 @@ class ParkingApp(tk.Tk):
         ttk.Label(frame_backup, text="Restaurar desde respaldo:").grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=10)
         
         ttk.Button(frame_backup, text="Restaurar Respaldo", command=self.restaurar_respaldo).grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
+        
+        ttk.Label(frame_backup, text="Recalcular los resúmenes de reportes desde los movimientos:").grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=10)
+        
+        ttk.Button(frame_backup, text="Reconstruir Resúmenes", command=self.reconstruir_resumenes).grid(row=5, column=0, sticky=tk.W, padx=5, pady=5)
 
         #Configuracion de Reconocimiento Facial 
         ttk.Label(tab_face_reg, text="Registro de Rostros", font=("Arial", 12, "bold")).pack(pady=10)
@@ -992,29 +2236,38 @@ class ParkingApp(tk.Tk):
         
     def capturar_placa(self):
         """Captura una imagen de la cámara y procesa la placa"""
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            messagebox.showerror("Error", "No se pudo acceder a la cámara")
-            return
+        self.enviar_tarea(
+            CLAVE_VISTA_PREVIA, self._capturar_y_leer_placa, self.combo_camara_placas.get(),
+            al_terminar=self._placa_capturada,
+            descripcion="Captura de placa",
+            cancelable=True
+        )
+    
+    def _capturar_y_leer_placa(self, nombre_camara, cancelacion):
+        """Corre en un worker: vista previa, captura con ESPACIO y OCR"""
+        cap = self._abrir_camara(nombre_camara)
             
-        filename = "placa_temp.jpg"
+        frame_capturado = None
         try:
-            while True:
+            while not cancelacion.is_set():
                 ret, frame = cap.read()
                 if not ret:
                     break
-                cv2.imshow("Captura de Placa (Presione ESPACIO para capturar)", frame)
+                cv2.imshow(VENTANA_PLACA, frame)
                 key = cv2.waitKey(1)
                 if key % 256 == 32:  # Tecla ESPACIO
-                    cv2.imwrite(filename, frame)
+                    frame_capturado = frame
                     break
         finally:
             cap.release()
-            cv2.destroyAllWindows()
+            cerrar_ventana(VENTANA_PLACA)
         
-        placa = PlateRecognizer.read_plate(filename)
-        os.remove(filename)
+        if frame_capturado is None:
+            raise RuntimeError("No se capturó ninguna imagen de la cámara")
         
+        return PlateRecognizer.read_plate(frame_capturado, self.config.get_camara(nombre_camara))
+    
+    def _placa_capturada(self, placa):
         if placa and len(placa) >= 6:  # Validación básica de placa
             self.entry_placa.delete(0, tk.END)
             self.entry_placa.insert(0, placa)
@@ -1022,6 +2275,121 @@ class ParkingApp(tk.Tk):
         else:
             messagebox.showerror("Error", "No se pudo detectar la placa. Por favor ingrésela manualmente.")
 
+    def toggle_captura_automatica(self):
+        """Inicia o detiene la captura continua de placas desde la cámara"""
+        if self.pipeline_placas is not None:
+            self.detener_captura_automatica()
+        else:
+            self.iniciar_captura_automatica(self.combo_camara_placas.get())
+    
+    def reproducir_video_placas(self):
+        """Procesa un video grabado con el mismo pipeline que la cámara"""
+        archivo = filedialog.askopenfilename(
+            filetypes=[("Videos", "*.mp4 *.avi *.mkv"), ("Todos los archivos", "*.*")],
+            title="Seleccionar video"
+        )
+        if archivo:
+            self.iniciar_captura_automatica(self.combo_camara_placas.get(), video=archivo)
+    
+    def iniciar_captura_automatica(self, camara, calibrador=None, video=None):
+        """Captura continua desde una cámara compartida, o desde un archivo de video si se indica"""
+        self.detener_captura_automatica()
+        
+        if video is not None:
+            fuente = video
+        else:
+            self.suscripcion_placas = self.suscribir_camara(camara)
+            if self.suscripcion_placas is None:
+                return
+            fuente = self.suscripcion_placas
+        
+        nombre_backend = self.config.get_ocr_backend()
+        tesseract_path = self.config.get_tesseract_path()
+        self.pipeline_placas = PlateCapturePipeline(
+            fuente,
+            backend_factory=lambda: crear_ocr_backend(nombre_backend, tesseract_path),
+            perfil=self.config.get_camara(camara),
+            calibrador=calibrador
+        )
+        self.pipeline_placas.start()
+        self.btn_captura_auto.config(text="Detener Captura Automática")
+        self.after(100, self.revisar_captura_automatica)
+    
+    def detener_captura_automatica(self):
+        if self.pipeline_placas is None:
+            return
+        self.pipeline_placas.stop()
+        self.pipeline_placas = None
+        if self.suscripcion_placas is not None:
+            self.suscripcion_placas.release()
+            self.suscripcion_placas = None
+        if self.btn_captura_auto.winfo_exists():
+            self.btn_captura_auto.config(text="Captura Automática")
+    
+    def revisar_captura_automatica(self):
+        """Consume en el hilo de Tk las placas leídas por el pipeline"""
+        pipeline = self.pipeline_placas
+        if pipeline is None or not self.lbl_captura_auto.winfo_exists():
+            return
+        
+        terminado = False
+        while True:
+            try:
+                resultado = pipeline.resultados.get_nowait()
+            except queue.Empty:
+                break
+            if resultado is PlateCapturePipeline.FIN:
+                terminado = True
+                break
+            placa = resultado["placa"]
+            if len(placa) >= 6:  # Validación básica de placa
+                self.entry_placa.delete(0, tk.END)
+                self.entry_placa.insert(0, placa)
+        
+        if pipeline.calibrador is not None and pipeline.calibrador.listo():
+            self.finalizar_calibracion(pipeline.calibrador)
+            return
+        
+        stats = pipeline.stats()
+        self.lbl_captura_auto.config(
+            text=f"FPS: {stats['fps']:.1f} | Cola frames: {stats['cola_frames']} | "
+                 f"Cola candidatos: {stats['cola_candidatos']} | Lecturas: {stats['lecturas']}"
+        )
+        
+        if terminado:
+            if pipeline.calibrador is not None:
+                self.finalizar_calibracion(pipeline.calibrador)
+            else:
+                self.detener_captura_automatica()
+        else:
+            self.after(100, self.revisar_captura_automatica)
+    
+    def calibrar_roi(self):
+        """Lee placas de la cámara a pantalla completa y aprende dónde aparecen"""
+        if not messagebox.askyesno(
+            "Calibrar ROI",
+            "Se usará la captura automática sobre el frame completo hasta reunir 20 lecturas.\n"
+            "Haga pasar vehículos por la entrada. ¿Desea continuar?"
+        ):
+            return
+        nombre = self.combo_camara_config.get()
+        self.iniciar_captura_automatica(nombre, calibrador=CalibradorROI(nombre))
+        self.lbl_captura_auto.config(text="Calibrando ROI...")
+    
+    def finalizar_calibracion(self, calibrador):
+        self.detener_captura_automatica()
+        perfil = calibrador.calcular()
+        if perfil is None:
+            messagebox.showerror("Error", "No hubo lecturas suficientes para calibrar el ROI")
+            return
+        self.config.set_roi_camara(perfil)
+        if self.entry_roi.winfo_exists() and self.combo_camara_config.get() == perfil.nombre:
+            self.cargar_config_camara()
+        messagebox.showinfo(
+            "Éxito",
+            f"ROI calibrado con {len(calibrador.muestras)} lecturas: {formatear_roi(perfil.roi)}"
+        )
+    
     def capturar_rostro(self):
         """Captura imágenes del rostro para un usuario seleccionado"""
         usuario = self.combo_usuario_rostro.get()
@@ -1034,19 +2402,28 @@ class ParkingApp(tk.Tk):
         if not os.path.exists(carpeta_usuario):
             os.makedirs(carpeta_usuario)
         
+        messagebox.showinfo("Instrucciones", "Presione ESPACIO para capturar una imagen del rostro. Presione ESC para salir.")
+        self.enviar_tarea(
+            CLAVE_VISTA_PREVIA, self._capturar_rostros, usuario, carpeta_usuario,
+            al_terminar=self._rostros_capturados,
+            descripcion="Captura de rostro",
+            cancelable=True
+        )
+    
+    def _capturar_rostros(self, usuario, carpeta_usuario, cancelacion):
+        """Corre en un worker: guarda el rostro cada vez que se presiona ESPACIO; devuelve (usuario, cantidad)"""
         face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            messagebox.showerror("Error", "No se pudo acceder a la cámara")
-            return
+        cap = self._abrir_camara(self.config.get_camara_rostros())
         
         count = 0
-        messagebox.showinfo("Instrucciones", "Presione ESPACIO para capturar una imagen del rostro. Presione ESC para salir.")
+        # Desde el worker no se abren messagebox: los avisos se escriben sobre la vista previa
+        aviso = ""
         try:
-            while True:
+            while not cancelacion.is_set():
                 ret, frame = cap.read()
                 if not ret:
                     break
+                frame = frame.copy()
                 
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
@@ -1054,25 +2431,34 @@ class ParkingApp(tk.Tk):
                 for (x, y, w, h) in faces:
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                 
-                cv2.imshow("Captura de Rostro", frame)
+                # Las fuentes de HighGUI no tienen acentos
+                cv2.putText(frame, aviso or f"Imagenes capturadas: {count}", (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255) if aviso else (0, 255, 0), 2)
+                cv2.imshow(VENTANA_ROSTRO, frame)
                 key = cv2.waitKey(1)
                 
                 if key == 27:  # ESC
                     break
                 elif key == 32:  # ESPACIO
                     if len(faces) == 0:
-                        messagebox.showwarning("Advertencia", "No se detectó ningún rostro. Intente nuevamente.")
+                        aviso = "No se detecto ningun rostro. Intente nuevamente."
                         continue
+                    aviso = ""
                     for (x, y, w, h) in faces:
                         rostro = gray[y:y+h, x:x+w]
                         rostro = cv2.resize(rostro, (200, 200))
                         archivo = os.path.join(carpeta_usuario, f"{usuario}_{count}.jpg")
                         cv2.imwrite(archivo, rostro)
                         count += 1
-                        messagebox.showinfo("Captura", f"Imagen {count} capturada")
         finally:
             cap.release()
-            cv2.destroyAllWindows()
+            cerrar_ventana(VENTANA_ROSTRO)
+        return usuario, count
+    
+    def _rostros_capturados(self, resultado):
+        usuario, count = resultado
+        if count:
+            messagebox.showinfo("Captura", f"{count} imágenes del rostro de {usuario} capturadas")
     
     def entrenar_modelo_facial(self):
         """Entrena el modelo LBPH con las imágenes capturadas"""
@@ -1133,15 +2519,22 @@ class ParkingApp(tk.Tk):
             messagebox.showerror("Error", "Formato de placa inválido. Ej: ABC-123, AB-1234, M1A-234")
             return
 
-        result, mensaje = self.db.registrar_ingreso(placa, tipo, conductor)
+        # La placa es la clave: una segunda entrada o salida de la misma placa se rechaza mientras corre
+        self.enviar_tarea(
+            placa, self.db.registrar_ingreso, placa, tipo, conductor,
+            al_terminar=lambda resultado: self._entrada_registrada(placa, tipo, conductor, resultado),
+            descripcion=f"Entrada {placa}"
+        )
+    
+    def _entrada_registrada(self, placa, tipo, conductor, resultado):
+        result, mensaje = resultado
         
         if result:
             messagebox.showinfo("Éxito", mensaje)
-            self.entry_placa.delete(0, tk.END)
-            self.entry_conductor.delete(0, tk.END)
-            self.combo_tipo.current(0)
-            self.actualizar_lista_vehiculos()
-            self.actualizar_espacios()
+            if self.entry_placa.get().upper() == placa:
+                self.entry_placa.delete(0, tk.END)
+                self.entry_conductor.delete(0, tk.END)
+                self.combo_tipo.current(0)
             self.actualizar_estado()
             self.generar_ticket_ingreso(placa, tipo, conductor)
         else:
@@ -1155,14 +2548,20 @@ class ParkingApp(tk.Tk):
             messagebox.showerror("Error", "Debe ingresar la placa del vehículo")
             return
         
-        result, datos = self.db.registrar_salida(placa)
+        self.enviar_tarea(
+            placa, self.db.registrar_salida, placa,
+            al_terminar=lambda resultado: self._salida_registrada(placa, resultado),
+            descripcion=f"Salida {placa}"
+        )
+    
+    def _salida_registrada(self, placa, resultado):
+        result, datos = resultado
         
         if result:
             messagebox.showinfo("Éxito", f"Vehículo {placa} ha salido del estacionamiento")
             self.mostrar_factura(datos)
-            self.entry_placa.delete(0, tk.END)
-            self.actualizar_lista_vehiculos()
-            self.actualizar_espacios()
+            if self.entry_placa.get().upper() == placa:
+                self.entry_placa.delete(0, tk.END)
             self.actualizar_estado()
         else:
             messagebox.showerror("Error", datos)
@@ -1229,6 +2628,14 @@ class ParkingApp(tk.Tk):
             messagebox.showerror("Error", f"Error al generar el comprobante: {str(e)}")
     
     def generar_ticket_ingreso(self, placa, tipo, conductor):
+        self.enviar_tarea(
+            ("ticket", placa), self.crear_ticket_ingreso, placa, tipo, conductor,
+            al_terminar=webbrowser.open,
+            descripcion=f"Ticket {placa}"
+        )
+    
+    def crear_ticket_ingreso(self, placa, tipo, conductor):
+        """Genera el PDF del ticket (en un worker) y devuelve su ruta"""
         try:
             dir_tickets = os.path.join(self.config.get_ruta_reportes(), 'tickets')
             if not os.path.exists(dir_tickets):
@@ -1258,55 +2665,36 @@ class ParkingApp(tk.Tk):
             pdf.cell(190, 10, 'Conserve este ticket para la salida del vehículo', 0, 1, 'C')
             
             pdf.output(archivo)
-            webbrowser.open(archivo)
+            return archivo
         except Exception as e:
-            messagebox.showerror("Error", f"Error al generar el ticket: {str(e)}")
+            raise RuntimeError(f"Error al generar el ticket: {str(e)}")
     
     def actualizar_lista_vehiculos(self):
-        for item in self.tree_vehiculos.get_children():
-            self.tree_vehiculos.delete(item)
-        
-        vehiculos = self.db.get_vehiculos_activos()
-        
-        for vehiculo in vehiculos:
-            self.tree_vehiculos.insert("", tk.END, values=(
-                vehiculo[1], vehiculo[2], vehiculo[3], vehiculo[5], vehiculo[6] or ""
-            ))
-    
-    def actualizar_espacios(self):
-        for widget in self.frame_espacios.winfo_children():
-            widget.destroy()
-        
-        max_espacios = self.config.get_max_espacios()
-        
-        cursor = self.db.execute_query(
-            "SELECT id, numero, ocupado FROM espacios ORDER BY numero",
-            local_only=True
-        )
-        espacios = cursor.fetchall()
-        
-        row, col = 0, 0
-        for espacio in espacios:
-            id_espacio, numero, ocupado = espacio
-            
-            color = "#FF6B6B" if ocupado else "#4CAF50"
-            
-            btn = tk.Button(self.frame_espacios, text=str(numero), width=4, height=2, bg=color)
-            btn.grid(row=row, column=col, padx=2, pady=2)
-            
-            col += 1
-            if col > 9:
-                col = 0
-                row += 1
+        """Relee los activos de la base; la lista aplica sólo las diferencias"""
+        # Hace falta sólo si otro programa escribió en el mismo archivo
+        self.db.recargar_activos()
     
     def actualizar_estado(self):
-        espacios_disponibles = self.db.get_espacios_disponibles()
-        total_espacios = self.config.get_max_espacios()
+        """Pide redibujar el panel y la barra de estado; varios pedidos seguidos son un solo redibujo"""
+        panel = getattr(self, 'panel_estado', None)
+        if panel is not None and panel.winfo_exists():
+            panel.avisar()
+    
+    def _mostrar_estado(self, estado):
+        zonas = estado['zonas']
+        detalle_zonas = ""
+        if len(zonas) > 1:
+            detalle_zonas = " (" + ", ".join(f"{zona}: {libres}/{total}" for zona, (libres, total) in zonas.items()) + ")"
         
-        modo = "OFFLINE" if self.config.get_modo_offline() else "ONLINE"
+        if self.config.get_modo_offline():
+            modo = "OFFLINE"
+        elif estado['offline']:
+            modo = "OFFLINE (sin conexión al servidor)"
+        else:
+            modo = "ONLINE"
         
         self.statusbar.config(
-            text=f" Modo: {modo} | Espacios disponibles: {espacios_disponibles}/{total_espacios} | Usuario: {self.rol_usuario}"
+            text=f" Modo: {modo} | Espacios disponibles: {estado['libres']}/{estado['total']}{detalle_zonas} | Usuario: {self.rol_usuario}"
         )
     
     def generar_reporte(self):
@@ -1324,10 +2712,20 @@ class ParkingApp(tk.Tk):
             messagebox.showerror("Error", "Formato de fecha inválido")
             return
         
+        self.enviar_tarea(
+            "reporte", self._consultar_reporte, fecha_inicio, fecha_fin,
+            al_terminar=self._mostrar_reporte,
+            descripcion="Reporte"
+        )
+    
+    def _consultar_reporte(self, fecha_inicio, fecha_fin):
+        return self.db.get_reporte_rango(fecha_inicio, fecha_fin), self.db.get_resumen_rango(fecha_inicio, fecha_fin)
+    
+    def _mostrar_reporte(self, resultado):
+        reportes, resumen = resultado
         for item in self.tree_reporte.get_children():
             self.tree_reporte.delete(item)
-        
-        reportes = self.db.get_reporte_rango(fecha_inicio, fecha_fin)
+        self.label_resumen_reporte.config(text="")
         
         if not reportes:
             messagebox.showinfo("Información", "No hay reportes en el rango de fechas seleccionado")
@@ -1335,7 +2733,7 @@ class ParkingApp(tk.Tk):
         
         total_general = 0
         for reporte in reportes:
-            id_reporte, fecha, ingresos, egresos, total, _ = reporte
+            fecha, ingresos, egresos, total = reporte
             total_general += total if total else 0
             
             self.tree_reporte.insert("", tk.END, values=(
@@ -1343,6 +2741,23 @@ class ParkingApp(tk.Tk):
             ))
         
         self.tree_reporte.insert("", tk.END, values=("TOTAL", "", "", f"s/.{total_general:.2f}"))
+        
+        lineas = [
+            "Por tipo: " + ", ".join(
+                f"{tipo or '-'} {egresos} salidas s/.{total:.2f}" for tipo, _, egresos, total, _ in resumen['por_tipo']
+            ),
+            "Por zona: " + ", ".join(
+                f"{zona} {ingresos} ingresos s/.{total:.2f}" for zona, ingresos, _, total, _ in resumen['por_zona']
+            ),
+        ]
+        egresos = sum(fila[2] for fila in resumen['por_tipo'])
+        minutos = sum(fila[4] for fila in resumen['por_tipo'])
+        if egresos:
+            lineas.append(f"Estadía promedio: {minutos / egresos:.0f} minutos")
+        if resumen['por_hora']:
+            hora, ingresos, _ = max(resumen['por_hora'], key=lambda fila: fila[1])
+            lineas.append(f"Hora pico: {hora}:00 ({ingresos} ingresos)")
+        self.label_resumen_reporte.config(text="\n".join(lineas))
     
     def ver_detalles_dia(self):
         seleccion = self.tree_reporte.selection()
@@ -1357,50 +2772,32 @@ class ParkingApp(tk.Tk):
             messagebox.showerror("Error", "Debe seleccionar un día específico, no el total")
             return
         
-        vehiculos = self.db.get_vehiculos_por_fecha(fecha)
-        
-        if not vehiculos:
-            messagebox.showinfo("Información", f"No hay vehículos registrados para el {fecha}")
-            return
-        
-        ventana_detalles = tk.Toplevel(self)
-        ventana_detalles.title(f"Detalles del {fecha}")
-        ventana_detalles.geometry("800x400")
-        
-        frame_principal = ttk.Frame(ventana_detalles)
-        frame_principal.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        tree_vehiculos = ttk.Treeview(frame_principal, columns=("Placa", "Tipo", "Ingreso", "Salida", "Espacio", "Conductor", "Total"), show="headings")
-        tree_vehiculos.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        scrollbar = ttk.Scrollbar(frame_principal, orient=tk.VERTICAL, command=tree_vehiculos.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        tree_vehiculos.configure(yscrollcommand=scrollbar.set)
-        
-        tree_vehiculos.heading("Placa", text="Placa")
-        tree_vehiculos.heading("Tipo", text="Tipo")
-        tree_vehiculos.heading("Ingreso", text="Hora Ingreso")
-        tree_vehiculos.heading("Salida", text="Hora Salida")
-        tree_vehiculos.heading("Espacio", text="Espacio")
-        tree_vehiculos.heading("Conductor", text="Conductor")
-        tree_vehiculos.heading("Total", text="Total")
-        
-        tree_vehiculos.column("Placa", width=80)
-        tree_vehiculos.column("Tipo", width=60)
-        tree_vehiculos.column("Ingreso", width=120)
-        tree_vehiculos.column("Salida", width=120)
-        tree_vehiculos.column("Espacio", width=60)
-        tree_vehiculos.column("Conductor", width=150)
-        tree_vehiculos.column("Total", width=80)
-        
-        for vehiculo in vehiculos:
-            tree_vehiculos.insert("", tk.END, values=(
-                vehiculo[1], vehiculo[2], vehiculo[3], 
-                vehiculo[4] if vehiculo[4] else "", 
-                vehiculo[5] if vehiculo[5] else "", 
-                vehiculo[6] if vehiculo[6] else "", 
-                f"S/.{vehiculo[10]:.2f}" if vehiculo[10] else ""
-            ))
+        self.ver_historial({'desde': fecha, 'hasta': fecha}, f"Detalles del {fecha}")
+    
+    def ver_historial(self, filtros=None, titulo="Historial de movimientos"):
+        # Sólo se consulta lo que se ve: la ventana abre igual con un día o con años de historia
+        ventana_historial = tk.Toplevel(self)
+        ventana_historial.title(titulo)
+        ventana_historial.geometry("900x500")
+        
+        VirtualHistory(
+            ventana_historial, self.tareas,
+            columnas=[("Placa", 80), ("Tipo", 70), ("Hora Ingreso", 130), ("Hora Salida", 130),
+                      ("Espacio", 60), ("Conductor", 150), ("Total", 80), ("Estado", 70)],
+            pagina=self.db.historial_pagina,
+            indice=self.db.historial_indice,
+            clave=lambda fila: (fila[3], fila[0]),
+            formatear=lambda fila: (
+                fila[1], fila[2] or "", fila[3], fila[4] or "", fila[5] or "", fila[6] or "",
+                f"S/.{fila[7]:.2f}" if fila[7] else "", fila[8]
+            ),
+            tipos=TIPOS_VEHICULO,
+            estados=ESTADOS_MOVIMIENTO,
+            filtros=filtros
+        ).pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    
+    def ver_historial_rango(self):
+        self.ver_historial({'desde': self.date_inicio.get(), 'hasta': self.date_fin.get()})
     
     def exportar_pdf(self):
         if not self.tree_reporte.get_children():
@@ -1409,7 +2806,20 @@ class ParkingApp(tk.Tk):
         
         fecha_inicio = self.date_inicio.get()
         fecha_fin = self.date_fin.get()
+        # Los widgets sólo se leen en el hilo de Tk; el PDF se arma en un worker
+        filas = [self.tree_reporte.item(item, 'values') for item in self.tree_reporte.get_children()]
         
+        self.enviar_tarea(
+            "exportar_pdf", self.crear_pdf_reporte, filas, fecha_inicio, fecha_fin,
+            al_terminar=self._pdf_exportado,
+            descripcion="Exportar PDF"
+        )
+    
+    def _pdf_exportado(self, archivo):
+        webbrowser.open(archivo)
+        messagebox.showinfo("Éxito", f"Reporte exportado como {archivo}")
+    
+    def crear_pdf_reporte(self, filas, fecha_inicio, fecha_fin):
         try:
             ruta_reportes = self.config.get_ruta_reportes()
             if not os.path.exists(ruta_reportes):
@@ -1434,8 +2844,7 @@ class ParkingApp(tk.Tk):
             pdf.cell(47.5, 10, 'Total Cobrado', 1, 1, 'C')
             
             pdf.set_font('Arial', '', 12)
-            for item in self.tree_reporte.get_children():
-                valores = self.tree_reporte.item(item, 'values')
+            for valores in filas:
                 pdf.cell(47.5, 10, str(valores[0]), 1, 0, 'C')
                 pdf.cell(47.5, 10, str(valores[1]), 1, 0, 'C')
                 pdf.cell(47.5, 10, str(valores[2]), 1, 0, 'C')
@@ -1446,11 +2855,9 @@ class ParkingApp(tk.Tk):
             pdf.cell(190, 10, f"Generado el {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 1, 'R')
             
             pdf.output(archivo)
-            webbrowser.open(archivo)
-            
-            messagebox.showinfo("Éxito", f"Reporte exportado como {archivo}")
+            return archivo
         except Exception as e:
-            messagebox.showerror("Error", f"Error al exportar el reporte: {str(e)}")
+            raise RuntimeError(f"Error al exportar el reporte: {str(e)}")
     
     def exportar_csv(self):
         if not self.tree_reporte.get_children():
@@ -1492,16 +2899,101 @@ class ParkingApp(tk.Tk):
             
             self.config.update_config('SETTINGS', 'max_espacios', max_espacios)
             self.config.update_config('SETTINGS', 'ruta_reportes', self.entry_rutareportes.get())
-            
+            self.config.update_config('SETTINGS', 'ocr_backend', self.combo_ocr.get())
+
+            pytesseract.pytesseract.tesseract_cmd = self.config.get_tesseract_path()
+            PlateRecognizer.set_ocr_backend(
+                crear_ocr_backend(self.config.get_ocr_backend(), self.config.get_tesseract_path())
+            )
+
             messagebox.showinfo("Éxito", "Configuración guardada correctamente")
             
-            self.actualizar_espacios()
             self.actualizar_estado()
         except ValueError as e:
             messagebox.showerror("Error", f"Valor inválido: {str(e)}")
         except Exception as e:
             messagebox.showerror("Error", f"Error al guardar configuración: {str(e)}")
     
+    def cargar_config_camara(self, event=None):
+        nombre = self.combo_camara_config.get()
+        perfil = self.config.get_camara(nombre)
+        fuente = self.config.get_fuentes_camaras().get(nombre, '0')
+        campos = [
+            (self.entry_fuente_camara, fuente),
+            (self.entry_roi, formatear_roi(perfil.roi)),
+            (self.entry_placa_ancho_min, f"{perfil.placa_ancho_min:g}"),
+            (self.entry_placa_ancho_max, f"{perfil.placa_ancho_max:g}"),
+        ]
+        for entry, valor in campos:
+            entry.delete(0, tk.END)
+            entry.insert(0, valor)
+    
+    def guardar_config_camara(self):
+        try:
+            nombre = self.combo_camara_config.get().strip().lower()
+            if not re.fullmatch(r'[a-z0-9_]+', nombre):
+                raise ValueError("El nombre de la cámara sólo puede tener letras, números y '_'")
+            fuente = self.entry_fuente_camara.get().strip()
+            if not fuente:
+                raise ValueError("Debe indicar la fuente de la cámara")
+            ancho_min = float(self.entry_placa_ancho_min.get())
+            ancho_max = float(self.entry_placa_ancho_max.get())
+            if not 0 < ancho_min < ancho_max <= 1:
+                raise ValueError("Los anchos de placa deben cumplir 0 < mínimo < máximo <= 1")
+            perfil = PerfilCamara(
+                nombre,
+                roi=parsear_roi(self.entry_roi.get()),
+                placa_ancho_min=ancho_min,
+                placa_ancho_max=ancho_max
+            )
+            self.config.set_roi_camara(perfil, fuente)
+            
+            # Una cámara nueva o con otra fuente se abre ya, para que esté lista al usarla
+            self.camaras.configurar(self.config.get_fuentes_camaras())
+            self.camaras.precalentar([nombre])
+            self.combo_camara_config.config(values=self.camaras.nombres())
+            self.combo_camara_placas.config(values=self.camaras.nombres())
+            messagebox.showinfo("Éxito", "Configuración de la cámara guardada correctamente")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Valor inválido: {str(e)}")
+    
+    def seleccionar_perfil_sqlite(self, event=None):
+        perfil = PERFILES_SQLITE.get(self.combo_perfil_sqlite.get())
+        if perfil is None:
+            return
+        for clave, entry in self.entries_sqlite.items():
+            if isinstance(entry, ttk.Combobox):
+                entry.set(perfil[clave])
+            else:
+                entry.delete(0, tk.END)
+                entry.insert(0, perfil[clave])
+    
+    def guardar_config_sqlite(self):
+        try:
+            perfil = validar_perfil_sqlite({clave: entry.get() for clave, entry in self.entries_sqlite.items()})
+            intervalo = int(self.entry_mantenimiento_bd.get())
+            if intervalo < 0:
+                raise ValueError("El intervalo de mantenimiento no puede ser negativo")
+            nombre = next((n for n, p in PERFILES_SQLITE.items() if p == perfil), "personalizado")
+            
+            self.db.aplicar_perfil_sqlite(perfil)
+            self.config.set_perfil_sqlite(nombre, perfil, intervalo)
+            self.combo_perfil_sqlite.set(nombre)
+            messagebox.showinfo("Éxito", "Perfil de la base de datos aplicado correctamente")
+        except ValueError as e:
+            messagebox.showerror("Error", f"Valor inválido: {str(e)}")
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"No se pudo aplicar el perfil: {str(e)}")
+    
+    def ejecutar_mantenimiento_bd(self):
+        self.enviar_tarea(
+            "mantenimiento_bd", self.db.mantenimiento,
+            al_terminar=lambda pendientes: messagebox.showinfo(
+                "Mantenimiento", f"Mantenimiento completado. Páginas WAL pendientes: {pendientes}"
+            ),
+            descripcion="Mantenimiento de la base"
+        )
+    
     def guardar_tarifas(self):
         try:
             tarifa_auto = float(self.entry_tarifa_auto.get())
@@ -1631,15 +3123,65 @@ class ParkingApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("Error", f"Error al restaurar respaldo: {str(e)}")
     
+    def reconstruir_resumenes(self):
+        self.enviar_tarea(
+            "resumenes", self.db.reconstruir_resumenes,
+            al_terminar=lambda filas: messagebox.showinfo("Éxito", f"Resúmenes reconstruidos ({filas} filas)"),
+            descripcion="Reconstruir resúmenes"
+        )
+    
     def sincronizacion_periodica(self):
-        while True:
-            time.sleep(SYNC_INTERVAL)
+        while not self.detener_hilos.wait(SYNC_INTERVAL):
             if self.db.sincronizar_datos():
                 logging.info("Sincronización completada exitosamente")
             else:
                 logging.warning("No se pudo completar la sincronización")
     
+    def replicacion_periodica(self):
+        try:
+            self.tareas.submit(
+                "replicacion", self.replicador.sincronizar,
+                # Lo recibido se ve solo: el mapa, la lista y el panel de estado siguen a la base
+                descripcion="Replicación"
+            )
+        except TareaRechazada:
+            # La vuelta anterior sigue en curso
+            pass
+        self.after(self.intervalo_replicacion, self.replicacion_periodica)
+    
+    def mantenimiento_periodico(self):
+        while True:
+            # Se relee en cada vuelta para que un cambio en la pestaña de configuración aplique sin reiniciar
+            intervalo = self.config.get_intervalo_mantenimiento()
+            if self.detener_hilos.wait(intervalo if intervalo > 0 else SYNC_INTERVAL):
+                return
+            if intervalo <= 0:
+                continue
+            try:
+                archivados = self.db.archivar_movimientos()
+                pendientes = self.db.mantenimiento()
+                self.db.reconciliar_ocupacion()
+                logging.info(
+                    f"Mantenimiento de la base local completado ({pendientes} páginas WAL pendientes, "
+                    f"{archivados} movimientos archivados)"
+                )
+            except Exception as e:
+                logging.error(f"Error en el mantenimiento de la base local: {e}")
+    
     def on_close(self):
+        if self.pipeline_placas is not None:
+            self.pipeline_placas.stop()
+        en_curso = self.tareas.shutdown(wait=True)
+        if en_curso:
+            logging.warning(f"Se cierra con tareas todavía en curso: {', '.join(en_curso)}")
+        self.camaras.cerrar()
+        PlateRecognizer.set_ocr_backend(None)
+        # Sincronización y mantenimiento no pasan por el ejecutor: se los espera aparte
+        self.detener_hilos.set()
+        for hilo in (self.sync_thread, self.mantenimiento_thread):
+            hilo.join(timeout=ESPERA_CIERRE_S)
+            if hilo.is_alive():
+                logging.warning(f"El hilo {hilo.name} sigue en curso al cerrar la base")
         self.db.cerrar()
         self.destroy()
 
@@ -0,0 +1,36 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# Los módulos de la app están en la carpeta de arriba, sin paquete
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# sistemaParking llama a basicConfig al importarse y escribiría en el estacionamiento.log de
+# la carpeta actual; con un handler ya puesto esa llamada no hace nada. pytest captura igual.
+logging.basicConfig(handlers=[logging.NullHandler()])
+
+from sistemaParking import Config, DatabaseManager
+
+
+def crear_config(nodo='prueba', espacios=10):
+    config = Config()
+    config.config['SETTINGS']['max_espacios'] = str(espacios)
+    config.config['SETTINGS']['nodo_id'] = nodo
+    config.config['SETTINGS']['modo_offline'] = 'True'
+    return config
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    # Config lee y escribe configs.ini en la carpeta actual: que sea una temporal
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def db(carpeta):
+    db = DatabaseManager(crear_config(), db_path=str(carpeta / 'estacionamiento.db'))
+    yield db
+    db.cerrar()
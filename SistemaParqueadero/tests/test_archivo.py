@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta
+
+
+def test_puerta_offline_archiva_sin_perder_pendientes(db):
+    db.registrar_ingreso('ABC123', 'Auto')
+    db.registrar_salida('ABC123')
+    pendientes = db.pendientes_sync()
+    assert pendientes > 0
+
+    # Sin servidor nada se confirma: igual tiene que archivar, el outbox guarda la fila completa
+    movidas = db.archivo.archivar(datetime.now() + timedelta(days=db.archivo.dias + 1))
+
+    assert movidas == 1
+    assert db.pendientes_sync() == pendientes
+    with db.lectura() as cursor:
+        assert cursor.execute("SELECT COUNT(*) FROM movimientos").fetchone()[0] == 0
+        assert cursor.execute("SELECT SUM(filas) FROM archivo_meses").fetchone()[0] == 1
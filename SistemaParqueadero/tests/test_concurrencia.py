@@ -0,0 +1,55 @@
+import logging
+import threading
+from datetime import datetime
+
+PUERTAS = 4
+VUELTAS = 25
+LECTORES = 2
+
+
+def test_puertas_y_lecturas_sobre_la_misma_base(db, caplog):
+    caplog.set_level(logging.WARNING)
+    errores = []
+    fallidos = []
+    terminado = threading.Event()
+    hoy = datetime.now().strftime('%Y-%m-%d')
+
+    def puerta(n):
+        try:
+            for i in range(VUELTAS):
+                placa = f"P{n}X{i:03d}"
+                for resultado in (db.registrar_ingreso(placa, 'Auto'), db.registrar_salida(placa)):
+                    if not resultado[0]:
+                        fallidos.append((placa, resultado[1]))
+        except Exception as e:
+            errores.append(e)
+
+    def lector():
+        try:
+            while not terminado.is_set():
+                db.get_vehiculos_activos()
+                db.get_reporte_rango(hoy, hoy)
+                db.get_espacios_disponibles()
+        except Exception as e:
+            errores.append(e)
+
+    lectores = [threading.Thread(target=lector) for _ in range(LECTORES)]
+    puertas = [threading.Thread(target=puerta, args=(n,)) for n in range(PUERTAS)]
+    for hilo in lectores + puertas:
+        hilo.start()
+    for hilo in puertas:
+        hilo.join()
+    terminado.set()
+    for hilo in lectores:
+        hilo.join()
+
+    assert errores == []
+    assert fallidos == []
+    assert "locked" not in caplog.text
+    # Cada puerta deja libre lo que ocupó: índice, tabla y reporte tienen que coincidir
+    assert db.get_vehiculos_activos() == []
+    assert db.get_espacios_disponibles() == 10
+    assert db.reconciliar_ocupacion() == 0
+    with db.lectura() as cursor:
+        assert cursor.execute("SELECT SUM(ocupado) FROM espacios").fetchone()[0] == 0
+    assert db.get_reporte_rango(hoy, hoy)[0][1:3] == (PUERTAS * VUELTAS, PUERTAS * VUELTAS)
@@ -0,0 +1,110 @@
+import queue
+
+import pytest
+
+from listaVehiculos import VehicleList, LISTA_ORDEN_DEFECTO
+
+
+class ArbolFalso:
+    """Lo que VehicleList usa de un Treeview, sin Tk: las filas en el orden de pantalla"""
+    def __init__(self):
+        self.filas = []
+        self.seleccion = ()
+
+    def insert(self, padre, posicion, iid, values):
+        self.filas.insert(len(self.filas) if posicion == "end" else posicion, iid)
+
+    def exists(self, iid):
+        return iid in self.filas
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.filas.remove(iid)
+
+    def get_children(self):
+        return tuple(self.filas)
+
+    def selection(self):
+        return self.seleccion
+
+    def selection_set(self, iids):
+        self.seleccion = tuple(iids)
+
+    def heading(self, *args, **kwargs):
+        pass
+
+
+class EtiquetaFalsa:
+    def configure(self, text):
+        self.text = text
+
+
+class ActivosFalsos:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def vehiculos(self):
+        return dict(self.filas)
+
+
+@pytest.fixture
+def lista():
+    # Sin display: se arma el objeto sin pasar por ttk.Frame.__init__
+    lista = VehicleList.__new__(VehicleList)
+    lista.activos = ActivosFalsos({
+        'CCC333': ('CCC333', 'Moto', '2024-01-01 09:00:00', 3, 'Ana'),
+        'AAA111': ('AAA111', 'Auto', '2024-01-01 10:00:00', 1, None),
+        'BBB222': ('BBB222', 'Auto', '2024-01-01 08:00:00', 2, 'Luis'),
+    })
+    lista.filas = {}
+    lista.orden = []
+    lista.columna = LISTA_ORDEN_DEFECTO
+    lista.descendente = False
+    lista.filtro = ""
+    lista.pendientes = queue.Queue()
+    lista.tree = ArbolFalso()
+    lista.label_total = EtiquetaFalsa()
+    lista.recargar()
+    return lista
+
+
+def test_orden_por_hora_de_ingreso(lista):
+    assert lista.tree.get_children() == ('BBB222', 'CCC333', 'AAA111')
+    assert lista.label_total.text == "3 vehículos"
+
+
+def test_ordenar_invierte_y_cambia_de_columna(lista):
+    lista.ordenar(LISTA_ORDEN_DEFECTO)
+    assert lista.tree.get_children() == ('AAA111', 'CCC333', 'BBB222')
+    lista.ordenar(0)
+    assert lista.tree.get_children() == ('AAA111', 'BBB222', 'CCC333')
+    # Los None van al final, sin compararse con texto
+    lista.ordenar(4)
+    assert lista.tree.get_children() == ('CCC333', 'BBB222', 'AAA111')
+
+
+def test_aplicar_inserta_en_su_posicion(lista):
+    lista.aplicar({'DDD444': ('DDD444', 'Auto', '2024-01-01 08:30:00', 4, None)})
+    assert lista.tree.get_children() == ('BBB222', 'DDD444', 'CCC333', 'AAA111')
+
+    lista.ordenar(LISTA_ORDEN_DEFECTO)
+    lista.aplicar({'EEE555': ('EEE555', 'Auto', '2024-01-01 09:30:00', 5, None), 'CCC333': None})
+    assert lista.tree.get_children() == ('AAA111', 'EEE555', 'DDD444', 'BBB222')
+    assert [placa for _, placa in lista.orden] == ['BBB222', 'DDD444', 'EEE555', 'AAA111']
+
+
+def test_aplicar_mueve_una_fila_que_cambio(lista):
+    lista.aplicar({'AAA111': ('AAA111', 'Auto', '2024-01-01 07:00:00', 1, None)})
+    assert lista.tree.get_children() == ('AAA111', 'BBB222', 'CCC333')
+
+
+def test_filtro(lista):
+    lista.filtrar(" auto ")
+    assert lista.tree.get_children() == ('BBB222', 'AAA111')
+    assert lista.label_total.text == "2 de 3 vehículos"
+
+    # Lo que no pasa el filtro se guarda igual y aparece al quitarlo
+    lista.aplicar({'DDD444': ('DDD444', 'Moto', '2024-01-01 07:00:00', 4, None)})
+    assert lista.tree.get_children() == ('BBB222', 'AAA111')
+    lista.filtrar("")
+    assert lista.tree.get_children() == ('DDD444', 'BBB222', 'CCC333', 'AAA111')
@@ -0,0 +1,93 @@
+import pytest
+
+from indiceOcupacion import OccupancyIndex, ZONA_DEFECTO
+
+
+@pytest.fixture
+def indice():
+    # (id, numero, zona, ocupado): los ids no siguen al número a propósito
+    indice = OccupancyIndex()
+    indice.cargar([
+        (1, 3, 'norte', 0),
+        (2, 1, 'norte', 0),
+        (3, 2, 'norte', 1),
+        (4, 1, 'sur', 0),
+        (5, 2, None, 0),
+    ])
+    return indice
+
+
+def test_cargar_cuenta_libres_por_zona(indice):
+    assert indice.total() == 5
+    assert indice.total('norte') == 3
+    assert indice.libres() == 4
+    assert indice.libres_por_zona() == {ZONA_DEFECTO: 1, 'norte': 2, 'sur': 1}
+    assert not indice.esta_libre(3)
+    assert not indice.esta_libre(99)
+
+
+def test_siguiente_libre_es_el_de_menor_numero(indice):
+    assert indice.siguiente_libre('norte') == (2, 1)
+    assert indice.siguiente_libre('sur') == (4, 1)
+    assert indice.siguiente_libre('oeste') is None
+    # Sin zona recorre las zonas en orden alfabético
+    assert indice.siguiente_libre() == (5, 2)
+
+
+def test_ocupar_y_liberar(indice):
+    indice.ocupar(2)
+    assert indice.siguiente_libre('norte') == (1, 3)
+    assert indice.libres('norte') == 1
+    indice.ocupar(2)
+    assert indice.libres('norte') == 1
+
+    indice.liberar(2)
+    indice.liberar(2)
+    assert indice.siguiente_libre('norte') == (2, 1)
+    assert indice.libres('norte') == 2
+
+    # Ocupar todo vacía el heap aunque tenga entradas viejas
+    for espacio_id in (1, 2):
+        indice.ocupar(espacio_id)
+    assert indice.siguiente_libre('norte') is None
+    assert indice.libres('norte') == 0
+
+
+def test_observadores_reciben_solo_lo_que_cambio(indice):
+    avisos = []
+    indice.observar(lambda ids, estructura: avisos.append((ids, estructura)))
+    indice.ocupar(1)
+    indice.ocupar(1)
+    indice.liberar(3)
+    assert avisos == [({1}, False), ({3}, False)]
+
+    avisos.clear()
+    indice.cargar([(1, 3, 'norte', 1), (2, 1, 'norte', 1), (3, 2, 'norte', 0), (4, 1, 'sur', 0), (5, 2, None, 0)])
+    assert avisos == [({2}, False)]
+
+    avisos.clear()
+    indice.cargar([(1, 3, 'norte', 1), (2, 1, 'norte', 1), (3, 2, 'norte', 0), (4, 1, 'sur', 0)])
+    # Un espacio que ya no existe no tiene estado: estructura avisa que hay que releer todo
+    assert avisos == [(set(), True)]
+
+
+def test_observador_que_falla_no_corta_el_cambio(indice):
+    avisos = []
+
+    def falla(ids, estructura):
+        raise RuntimeError("observador roto")
+
+    indice.observar(falla)
+    indice.observar(lambda ids, estructura: avisos.append(ids))
+    indice.ocupar(4)
+    assert avisos == [{4}]
+    assert not indice.esta_libre(4)
+
+    indice.dejar_de_observar(falla)
+    indice.liberar(4)
+    assert avisos == [{4}, {4}]
+
+
+def test_diferencias_con_la_tabla(indice):
+    filas = [(1, 3, 'norte', 1), (2, 1, 'norte', 0), (3, 2, 'norte', 1), (6, 4, 'sur', 0)]
+    assert indice.diferencias(filas) == [(1, True), (6, False)]
@@ -0,0 +1,85 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from conftest import crear_config
+from sistemaParking import DatabaseManager, INDICE_PLACA_UNICA, PLANES_ESPERADOS
+
+
+@pytest.fixture
+def esquema(db):
+    """El esquema completo, migraciones incluidas, copiado a una base en :memory:"""
+    with db.lectura() as cursor:
+        sentencias = [fila[0] for fila in cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY type = 'index'"
+        )]
+    conn = sqlite3.connect(':memory:')
+    for sql in sentencias:
+        conn.execute(sql)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("consulta, params, indices", PLANES_ESPERADOS,
+                         ids=[f"plan{i}" for i in range(len(PLANES_ESPERADOS))])
+def test_consulta_usa_su_indice(esquema, consulta, params, indices):
+    plan = " | ".join(fila[-1] for fila in esquema.execute(f"EXPLAIN QUERY PLAN {consulta}", params))
+    assert any(f"INDEX {indice}" in plan for indice in indices), plan
+
+
+def test_verificar_planes_sin_problemas(db):
+    assert db.verificar_planes_consulta() == []
+
+
+def test_placa_activa_unica_en_esta_puerta(db):
+    insertar = (
+        "INSERT INTO movimientos (uid, nodo, placa, tipo_vehiculo, hora_entrada, espacio_asignado) "
+        "VALUES (lower(hex(randomblob(16))), ?, 'ABC123', 'Auto', '2024-01-01 08:00:00', 1)"
+    )
+    with db.escritura() as cursor:
+        cursor.execute(insertar, ('prueba',))
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.escritura() as cursor:
+            cursor.execute(insertar, ('prueba',))
+    # Los ingresos replicados de otra puerta no los frena el índice
+    with db.escritura() as cursor:
+        cursor.execute(insertar, ('otra',))
+
+
+def test_registrar_ingreso_repetido(db):
+    ok, _ = db.registrar_ingreso('ABC123', 'Auto')
+    assert ok
+    ok, mensaje = db.registrar_ingreso('ABC123', 'Auto')
+    assert not ok
+    assert mensaje == "El vehículo ya está ingresado."
+
+
+def test_indice_se_rehace_al_cambiar_nodo(carpeta):
+    ruta = str(carpeta / 'estacionamiento.db')
+    DatabaseManager(crear_config('vieja'), db_path=ruta).cerrar()
+    with closing(sqlite3.connect(ruta)) as conn:
+        # La misma placa dos veces con el nodo nuevo, como si se hubiera cargado a mano
+        conn.execute(f"DROP INDEX {INDICE_PLACA_UNICA}")
+        for espacio in (1, 2):
+            conn.execute(
+                "INSERT INTO movimientos (uid, nodo, placa, tipo_vehiculo, hora_entrada, espacio_asignado) "
+                "VALUES (lower(hex(randomblob(16))), 'nueva', 'ABC123', 'Auto', '2024-01-01 08:00:00', ?)",
+                (espacio,)
+            )
+        conn.commit()
+
+    db = DatabaseManager(crear_config('nueva'), db_path=ruta)
+    try:
+        with db.lectura() as cursor:
+            sql = cursor.execute(
+                "SELECT sql FROM sqlite_master WHERE name = ?", (INDICE_PLACA_UNICA,)
+            ).fetchone()[0]
+            estados = [fila[0] for fila in cursor.execute(
+                "SELECT estado FROM movimientos WHERE placa = 'ABC123' ORDER BY id"
+            )]
+        assert "nodo = 'nueva'" in sql
+        assert estados == ['activo', 'duplicado']
+    finally:
+        db.cerrar()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from reconocimientoPlacas import PlateVoteAggregator
+
+BBOX = (10, 10, 60, 20)
+
+
+def recorte(brillo):
+    # Recortes lisos: la firma cambia tanto como el brillo
+    return np.full((20, 60, 3), brillo, dtype=np.uint8)
+
+
+def lectura(placa, confianza=90.0, **dudosos):
+    """[(caracter, confianza)]; dudosos = {posicion: (caracter, confianza)} como p1=('8', 40)"""
+    chars = [(c, confianza) for c in placa]
+    for clave, valor in dudosos.items():
+        chars[int(clave[1:])] = valor
+    return chars
+
+
+@pytest.fixture
+def emitidas():
+    return []
+
+
+@pytest.fixture
+def agregador(emitidas):
+    return PlateVoteAggregator(frames_perdida=3, on_placa=emitidas.append)
+
+
+def test_gana_el_caracter_con_mas_confianza(agregador, emitidas):
+    for frame_id, (brillo, chars) in enumerate([
+        (0, lectura("ABC123")),
+        (60, lectura("ABC123", p1=('8', 40.0))),
+        (120, lectura("ABC123")),
+    ]):
+        track_id = agregador.observar(frame_id, recorte(brillo), BBOX)
+        assert track_id == 1
+        agregador.agregar_lectura(track_id, chars)
+    assert emitidas == []
+
+    agregador.flush()
+    assert [r["placa"] for r in emitidas] == ["ABC123"]
+    assert emitidas[0]["lecturas"] == 3
+    assert emitidas[0]["frames"] == 3
+    assert 0.9 < emitidas[0]["confianza"] < 1.0
+
+
+def test_la_longitud_mas_votada_decide(agregador, emitidas):
+    for frame_id, chars in enumerate([lectura("ABC1234"), lectura("ABC123"), lectura("ABC123")]):
+        agregador.agregar_lectura(agregador.observar(frame_id, recorte(frame_id * 60), BBOX), chars)
+    agregador.flush()
+    assert [r["placa"] for r in emitidas] == ["ABC123"]
+
+
+def test_recorte_parecido_no_pide_ocr(agregador):
+    assert agregador.observar(0, recorte(100), BBOX) == 1
+    assert agregador.observar(1, recorte(105), BBOX) is None
+    assert (agregador.ocr_solicitados, agregador.ocr_omitidos) == (1, 1)
+
+
+def test_emite_al_perder_el_vehiculo(agregador, emitidas):
+    agregador.agregar_lectura(agregador.observar(0, recorte(0), BBOX), lectura("XYZ987"))
+    agregador.observar(2, None, None)
+    assert emitidas == []
+    agregador.observar(4, None, None)
+    assert [r["placa"] for r in emitidas] == ["XYZ987"]
+
+
+def test_espera_lecturas_pendientes_antes_de_emitir(agregador, emitidas):
+    track_id = agregador.observar(0, recorte(0), BBOX)
+    agregador.flush()
+    assert emitidas == []
+    agregador.agregar_lectura(track_id, lectura("XYZ987"))
+    assert [r["placa"] for r in emitidas] == ["XYZ987"]
+
+
+def test_otra_posicion_es_otro_vehiculo(agregador, emitidas):
+    agregador.agregar_lectura(agregador.observar(0, recorte(0), BBOX), lectura("AAA111"))
+    assert agregador.observar(1, recorte(0), (200, 10, 60, 20)) == 2
+    assert [r["placa"] for r in emitidas] == ["AAA111"]
+
+
+def test_placa_corta_no_se_emite(agregador, emitidas):
+    agregador.agregar_lectura(agregador.observar(0, recorte(0), BBOX), lectura("AB1"))
+    agregador.flush()
+    assert emitidas == []
+    assert agregador.total_emitidas == 0
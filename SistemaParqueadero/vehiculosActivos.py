@@ -0,0 +1,71 @@
+import logging
+import threading
+
+# ******************** VEHÍCULOS ACTIVOS ********************
+class ActiveVehicles:
+    """Vehículos dentro del estacionamiento en memoria, por placa.
+
+    Cada fila es (placa, tipo, hora_entrada, espacio, conductor). DatabaseManager aplica aquí
+    cada ingreso, salida y cambio replicado ya confirmado, y los observadores reciben sólo las
+    placas que cambiaron: la lista de la pantalla no vuelve a leer movimientos en cada evento.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.por_placa = {}
+        self.observadores = []
+
+    def observar(self, funcion):
+        """funcion(cambios) después de cada cambio, en el hilo que lo hizo.
+
+        cambios = {placa: fila}; fila None quiere decir que la placa ya no está adentro.
+        """
+        with self.lock:
+            self.observadores.append(funcion)
+
+    def dejar_de_observar(self, funcion):
+        with self.lock:
+            if funcion in self.observadores:
+                self.observadores.remove(funcion)
+
+    def _notificar(self, cambios):
+        # Fuera del lock: un observador puede consultar el modelo
+        with self.lock:
+            observadores = list(self.observadores)
+        for funcion in observadores:
+            try:
+                funcion(cambios)
+            except Exception as e:
+                logging.error(f"Error al notificar un cambio de vehículos activos: {e}")
+
+    def cargar(self, filas):
+        """Reemplaza todo y avisa sólo las diferencias; con una placa repetida queda la primera fila"""
+        nuevos = {}
+        for fila in filas:
+            nuevos.setdefault(fila[0], tuple(fila))
+        with self.lock:
+            anteriores, self.por_placa = self.por_placa, nuevos
+        cambios = {placa: None for placa in anteriores if placa not in nuevos}
+        cambios.update({placa: fila for placa, fila in nuevos.items() if anteriores.get(placa) != fila})
+        if cambios:
+            self._notificar(cambios)
+
+    def poner(self, placa, fila):
+        """fila del movimiento activo de la placa, o None si salió"""
+        fila = tuple(fila) if fila is not None else None
+        with self.lock:
+            if self.por_placa.get(placa) == fila:
+                return
+            if fila is None:
+                del self.por_placa[placa]
+            else:
+                self.por_placa[placa] = fila
+        self._notificar({placa: fila})
+
+    def vehiculos(self):
+        """{placa: fila} de los que están adentro"""
+        with self.lock:
+            return dict(self.por_placa)
+
+    def total(self):
+        with self.lock:
+            return len(self.por_placa)